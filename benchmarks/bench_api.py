@@ -0,0 +1,102 @@
+"""
+Time /predict_aqi polling through Flask's test client: first request of the hour, cached 200s and 304s.
+
+A small model is registered in a local feature store and OpenWeather is stubbed, so only the
+API's own work is measured. The legacy row (DataFrame -> to_dict -> jsonify) serializes the same
+forecast the way the handler did before conditional responses.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_api --calls 2000
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+import joblib
+import pandas as pd
+from xgboost import XGBRegressor
+
+from benchmarks.synthetic_data import generate_aqi_history
+from benchmarks.run_benchmarks import measure
+from benchmarks.stubs import use_local_feature_store, openweather_stub
+
+QUERY = "/predict_aqi?lat=24.8607&lon=67.0011"
+
+
+def register_small_model(seed):
+    from src.training.preprocess import add_features, preprocess_data_with_lags
+
+    data = generate_aqi_history(n_cities=1, years=0.3, seed=seed).drop(columns=["location"], errors="ignore")
+    data["date"] = pd.to_datetime(data["date"])
+    X, y, _ = preprocess_data_with_lags(add_features(data).dropna().reset_index(drop=True))
+    model_path = os.path.join(tempfile.mkdtemp(prefix="aqi_bench_api_"), "xgb_model.pkl")
+    joblib.dump(XGBRegressor(n_estimators=50, random_state=seed).fit(X, y), model_path)
+    use_local_feature_store(model_path=model_path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=1000, help="requests per timing")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write results JSON here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    register_small_model(args.seed)
+    from flask import jsonify
+    from src.app.dashboard import app, api_forecast
+
+    client = app.test_client()
+    with openweather_stub():
+        first = client.get(QUERY)
+        etag = first.headers["ETag"]
+        predictions = first.get_json()
+
+        def cold():
+            api_forecast.cache_clear()
+            client.get(QUERY)
+
+        def polls(headers):
+            for _ in range(args.calls):
+                client.get(QUERY, headers=headers)
+
+        def legacy_serialization():
+            with app.app_context():
+                for _ in range(args.calls):
+                    jsonify(pd.DataFrame(predictions).to_dict(orient="records")).get_data()
+
+        def serialization():
+            from src.app.responses import render
+            for _ in range(args.calls):
+                render(predictions)
+
+        results = {
+            "first_request_of_hour": measure("first_request_of_hour", cold, rows=1, repeat=args.repeat),
+            "cached_200": measure("cached_200", polls, setup=lambda: ({},), rows=args.calls, repeat=args.repeat),
+            "not_modified_304": measure("not_modified_304", polls, setup=lambda: ({"If-None-Match": etag},),
+                                        rows=args.calls, repeat=args.repeat),
+            "serialize_legacy": measure("serialize_legacy", legacy_serialization, rows=args.calls,
+                                        repeat=args.repeat),
+            "serialize": measure("serialize", serialization, rows=args.calls, repeat=args.repeat),
+        }
+
+    per_call = {name: result["wall_s"] / max(result["rows"], 1) * 1e3 for name, result in results.items()}
+    print(f"\nFirst request of the hour: {per_call['first_request_of_hour']:.2f} ms")
+    print(f"Cached 200:                {per_call['cached_200']:.3f} ms/request")
+    print(f"304 Not Modified:          {per_call['not_modified_304']:.3f} ms/request")
+    print(f"Serialization:             {per_call['serialize'] * 1e3:.1f} us "
+          f"(legacy DataFrame + jsonify {per_call['serialize_legacy'] * 1e3:.1f} us)")
+
+    if args.output:
+        with open(args.output, "w") as file_obj:
+            json.dump({"params": vars(args), "results": results, "per_call_ms": per_call}, file_obj, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Measure what feature pruning buys: training cost and per-request feature building, full vs selected.
+
+Trains a model on synthetic history, runs select_features under the MSE budget, then times
+add_features + train_xgb and the prediction path's feature building with both feature sets.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_feature_selection --years 2 --budget 0.02
+"""
+import sys
+import json
+import argparse
+
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+from benchmarks.synthetic_data import generate_aqi_history, to_openweather_payload
+from benchmarks.run_benchmarks import measure
+from src.training.preprocess import add_features, preprocess_data_with_lags
+from src.training.train_model import train_xgb
+from src.training.feature_spec import FeatureSpec
+from src.training.feature_selection import select_features, IMPORTANCE_METHODS
+
+
+def training_run(data, features):
+    featured = add_features(data.copy(), features=features).dropna().sort_values(by='date').reset_index(drop=True)
+    X, y, _ = preprocess_data_with_lags(featured, features)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    return train_xgb(X_train, y_train, X_test, y_test)
+
+
+def request_features(payload, feature_names, calls):
+    from src.prediction.predict_aqi import create_dataframe, build_forecast_input, LAGGED_COLUMNS
+
+    spec = FeatureSpec(feature_names)
+    for _ in range(calls):
+        frame = create_dataframe(payload)
+        frame['date'] = pd.to_datetime(frame['date'])
+        frame.sort_values('date', inplace=True)
+        for col in LAGGED_COLUMNS:
+            for lag in range(1, spec.serving_lags(col) + 1):
+                frame[f'{col}_lag_{lag}'] = frame[col].shift(lag)
+        recent = frame.dropna().iloc[-1]
+        recent['hour'] = recent['date'].hour
+        build_forecast_input(recent, feature_names)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--budget", type=float, default=0.02)
+    parser.add_argument("--method", choices=IMPORTANCE_METHODS, default="gain")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--calls", type=int, default=200, help="prediction requests per timing")
+    parser.add_argument("--output", help="write results JSON here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    data = generate_aqi_history(n_cities=1, years=args.years, seed=args.seed).drop(columns=["location"],
+                                                                                 errors="ignore")
+    data["date"] = pd.to_datetime(data["date"])
+
+    featured = add_features(data.copy()).dropna().sort_values(by='date').reset_index(drop=True)
+    X, y, _ = preprocess_data_with_lags(featured)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    model = train_xgb(X_train, y_train, X_test, y_test)
+    _, selected, report = select_features(model, X_train, y_train, X_test, y_test, budget=args.budget,
+                                          method=args.method)
+    full = list(X.columns)
+
+    selected_mse = next((candidate["mse"] for candidate in report["candidates"]
+                         if candidate["features"] == len(selected)), report["baseline"]["mse"])
+    print(f"\nSelected {len(selected)} of {len(full)} features (MSE {selected_mse:.4f}, "
+          f"baseline {report['baseline']['mse']:.4f}, budget {args.budget:.1%})\n")
+
+    results = {
+        "training_full": measure("train_full_features", training_run, setup=lambda: (data, None),
+                                 rows=len(data), repeat=args.repeat),
+        "training_selected": measure("train_selected_features", training_run, setup=lambda: (data, selected),
+                                     rows=len(data), repeat=args.repeat),
+    }
+    payload = to_openweather_payload(data.tail(24 * 7))
+    results["request_full"] = measure("request_features_full", request_features,
+                                      setup=lambda: (payload, full, args.calls), rows=args.calls, repeat=args.repeat)
+    results["request_selected"] = measure("request_features_selected", request_features,
+                                          setup=lambda: (payload, selected, args.calls), rows=args.calls,
+                                          repeat=args.repeat)
+
+    training_speedup = results["training_full"]["wall_s"] / results["training_selected"]["wall_s"]
+    request_speedup = results["request_full"]["wall_s"] / results["request_selected"]["wall_s"]
+    print(f"\nTraining speedup (add_features + train_xgb): x{training_speedup:.2f}")
+    print(f"Per-request feature building speedup:        x{request_speedup:.2f} "
+          f"({results['request_full']['wall_s'] / args.calls * 1000:.2f} ms -> "
+          f"{results['request_selected']['wall_s'] / args.calls * 1000:.2f} ms)")
+
+    if args.output:
+        with open(args.output, "w") as file_obj:
+            json.dump({"params": vars(args), "selected": selected, "selection": report, "results": results,
+                       "training_speedup": training_speedup, "request_speedup": request_speedup},
+                      file_obj, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+"""
+Benchmark the grouped multi-series feature engine against a per-location loop.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_grouped_features                      # 1,000 locations x 1 year
+    python -m benchmarks.bench_grouped_features --locations 100 --baseline-locations 100
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_data import POLLUTANT_COLUMNS, generate_aqi_history
+from benchmarks.run_benchmarks import measure
+from src.training.preprocess import remove_outliers, add_features
+from src.training.grouped_features import remove_outliers_grouped, add_features_grouped, sort_series
+
+
+def grouped_engine(data):
+    data = sort_series(data)
+    data = remove_outliers_grouped(data, POLLUTANT_COLUMNS)
+    return add_features_grouped(data, presorted=True)
+
+
+def per_location_loop(data):
+    parts = []
+    for _, series in sort_series(data).groupby('location', sort=False):
+        series = series.reset_index(drop=True)
+        parts.append(add_features(remove_outliers(series, POLLUTANT_COLUMNS)))
+    return pd.concat(parts, ignore_index=True)
+
+
+def verify(grouped, data, locations):
+    """
+    Check that the grouped output equals add_features on each sampled location alone.
+    """
+    mismatches = []
+    for location in locations:
+        series = sort_series(data[data['location'] == location]).reset_index(drop=True)
+        expected = add_features(remove_outliers(series, POLLUTANT_COLUMNS))
+        actual = grouped[grouped['location'] == location].reset_index(drop=True)
+        try:
+            pd.testing.assert_frame_equal(actual, expected, check_exact=True, check_dtype=False)
+        except AssertionError as e:
+            mismatches.append(f"{location}: {str(e).splitlines()[0]}")
+    return mismatches
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--locations", type=int, default=1000)
+    parser.add_argument("--years", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--baseline-locations", type=int, default=100,
+                        help="locations timed with the per-location loop (extrapolated to --locations)")
+    parser.add_argument("--verify", type=int, default=5, help="locations checked for exact equality")
+    parser.add_argument("--output", help="write results JSON here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    start = time.perf_counter()
+    data = generate_aqi_history(n_cities=args.locations, years=args.years, seed=args.seed)
+    data['date'] = pd.to_datetime(data['date'])
+    print(f"Generated {len(data):,} rows ({args.locations} locations x {args.years} years) "
+          f"in {time.perf_counter() - start:.1f}s\n")
+
+    results = {"grouped": measure("grouped_engine", grouped_engine, setup=lambda: (data.copy(),),
+                                  rows=len(data), repeat=args.repeat)}
+
+    baseline_ids = data['location'].drop_duplicates().iloc[:args.baseline_locations]
+    baseline_data = data[data['location'].isin(baseline_ids)]
+    loop = measure("per_location_loop", per_location_loop, setup=lambda: (baseline_data.copy(),),
+                   rows=len(baseline_data), repeat=args.repeat)
+    loop["extrapolated_wall_s"] = loop["wall_s"] * args.locations / max(len(baseline_ids), 1)
+    results["per_location_loop"] = loop
+    speedup = loop["extrapolated_wall_s"] / results["grouped"]["wall_s"]
+    print(f"\nSpeedup vs per-location loop (extrapolated to {args.locations} locations): x{speedup:.1f}")
+
+    grouped = grouped_engine(data.copy())
+    rng = np.random.default_rng(args.seed)
+    sample = rng.choice(data['location'].unique(), size=min(args.verify, args.locations), replace=False)
+    mismatches = verify(grouped, data, sample)
+    print(f"Exact-match check on {len(sample)} locations: {'OK' if not mismatches else mismatches}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as file_obj:
+            json.dump({"params": vars(args), "rows": len(data), "results": results, "speedup": speedup,
+                       "mismatches": mismatches}, file_obj, indent=2)
+    return 0 if not mismatches else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Import cost of the CLI and of each command's module, from `python -X importtime`.
+
+Every target is imported in a fresh interpreter; the heaviest top-level packages it pulls in are
+listed so a new eager import of pandas, XGBoost or Streamlit shows up immediately.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --repeat 5 --output bench_results/import_time.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+# (label, module) imported by `aqi --help` and by each command before it does any work
+TARGETS = [
+    ("aqi --help", "src.cli"),
+    ("ingest", "src.data_ingestion.scheduler"),
+    ("upload", "src.data_ingestion.upload_hopsworks"),
+    ("train", "src.pipeline.run_pipeline"),
+    ("consume", "src.streaming.consumer"),
+    ("score", "src.prediction.predict_aqi"),
+    ("serve --api", "src.app.dashboard"),
+]
+
+
+def parse_importtime(stderr):
+    """
+    Cumulative microseconds per module from `-X importtime` output, plus the total of the top-level imports.
+    """
+    modules = {}
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nesting is shown as two spaces per level after the single separator space
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules[name.strip()] = int(cumulative_us)
+        if depth == 0:
+            total += int(cumulative_us)
+    return modules, total
+
+
+def heaviest_packages(modules, top):
+    """
+    Third-party and stdlib top-level packages by cumulative import time (a package includes its submodules).
+    """
+    packages = [(name, us) for name, us in modules.items() if "." not in name and name != "src"]
+    return sorted(packages, key=lambda item: item[1], reverse=True)[:top]
+
+
+def measure_import(module, repeat):
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], env=env,
+                                   capture_output=True, text=True)
+        wall = time.perf_counter() - started
+        if completed.returncode != 0:
+            return {"error": completed.stderr.strip().splitlines()[-1]}
+        modules, total = parse_importtime(completed.stderr)
+        run = {"wall_s": wall, "import_s": total / 1e6, "modules": len(modules), "_modules": modules}
+        if best is None or run["import_s"] < best["import_s"]:
+            best = run
+    return best
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per target (best is reported)")
+    parser.add_argument("--top", type=int, default=5, help="heaviest packages listed per target")
+    parser.add_argument("--output", help="write results JSON here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = {}
+    print(f"{'command':<14}{'import':>10}{'wall':>10}{'modules':>9}  heaviest packages")
+    for label, module in TARGETS:
+        result = measure_import(module, args.repeat)
+        if "error" in result:
+            print(f"{label:<14}failed: {result['error']}")
+            results[label] = {"module": module, **result}
+            continue
+        heaviest = heaviest_packages(result.pop("_modules"), args.top)
+        result.update(module=module, heaviest={name: us / 1e6 for name, us in heaviest})
+        results[label] = result
+        listing = ", ".join(f"{name} {us / 1e3:.0f}ms" for name, us in heaviest)
+        print(f"{label:<14}{result['import_s'] * 1e3:>8.0f}ms{result['wall_s'] * 1e3:>8.0f}ms"
+              f"{result['modules']:>9}  {listing}")
+
+    if args.output:
+        with open(args.output, "w") as file_obj:
+            json.dump({"params": vars(args), "results": results}, file_obj, indent=2)
+    return 1 if any("error" in result for result in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
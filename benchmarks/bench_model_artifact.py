@@ -0,0 +1,109 @@
+"""
+Compare the pickled XGBRegressor with the compact NumPy artifact: size, cold start and agreement.
+
+Cold start is measured in fresh interpreters (imports + load + one 3-row prediction).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_model_artifact                        # trains a model on synthetic data
+    python -m benchmarks.bench_model_artifact --model-path xgb_model.pkl
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_data import generate_aqi_history
+
+COLD_START = """
+import time, json, sys
+start = time.perf_counter()
+from src.prediction.compact_predictor import load_model
+import numpy as np
+model = load_model(sys.argv[1])
+model.predict(np.load(sys.argv[2]))
+print(json.dumps({"seconds": time.perf_counter() - start, "modules": len(sys.modules)}))
+"""
+
+
+def train_model(rows_years, seed):
+    from xgboost import XGBRegressor
+    from src.training.preprocess import add_features, preprocess_data_with_lags
+
+    data = generate_aqi_history(n_cities=1, years=rows_years, seed=seed).drop(columns=["location"], errors="ignore")
+    data["date"] = pd.to_datetime(data["date"])
+    X, y, _ = preprocess_data_with_lags(add_features(data).dropna().reset_index(drop=True))
+    # The largest configuration in train_xgb's grid
+    return XGBRegressor(n_estimators=200, max_depth=7, learning_rate=0.1, random_state=42).fit(X, y), X
+
+
+def cold_start(path, sample_path, repeat):
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", COLD_START, path, sample_path], env=env, check=True,
+                                capture_output=True, text=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {"seconds": min(run["seconds"] for run in runs), "modules": runs[0]["modules"]}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-path", help="existing joblib model (default: train one on synthetic data)")
+    parser.add_argument("--years", type=float, default=1.0, help="synthetic history used to train the model")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="cold starts per artifact (best is reported)")
+    parser.add_argument("--output", help="write results JSON here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    from src.training.export_model import export_model
+    from src.prediction.compact_predictor import CompactPredictor
+
+    work_dir = tempfile.mkdtemp(prefix="aqi_bench_artifact_")
+    if args.model_path:
+        model = joblib.load(args.model_path)
+        X = pd.DataFrame(np.random.default_rng(args.seed).random((1000, model.n_features_in_)),
+                         columns=model.feature_names_in_)
+    else:
+        model, X = train_model(args.years, args.seed)
+    pickle_path = os.path.join(work_dir, "xgb_model.pkl")
+    joblib.dump(model, pickle_path)
+    compact_path, native_path = export_model(model, pickle_path)
+
+    sample_path = os.path.join(work_dir, "sample.npy")
+    np.save(sample_path, X.iloc[:3].to_numpy(dtype=np.float32))
+
+    expected = model.predict(X)
+    actual = CompactPredictor.load(compact_path).predict(X)
+    results = {
+        "size_bytes": {name: os.path.getsize(path) for name, path in
+                       [("pickle", pickle_path), ("compact", compact_path), ("native", native_path)]},
+        "cold_start": {"pickle": cold_start(pickle_path, sample_path, args.repeat),
+                       "compact": cold_start(compact_path, sample_path, args.repeat)},
+        "max_abs_diff": float(np.abs(expected - actual).max()),
+        "rows_compared": len(X),
+    }
+    sizes = results["size_bytes"]
+    starts = results["cold_start"]
+    print(f"Artifact size: pickle {sizes['pickle'] / 1024:.1f} KiB, compact {sizes['compact'] / 1024:.1f} KiB, "
+          f"native {sizes['native'] / 1024:.1f} KiB")
+    print(f"Cold start:    pickle {starts['pickle']['seconds']:.2f}s ({starts['pickle']['modules']} modules), "
+          f"compact {starts['compact']['seconds']:.2f}s ({starts['compact']['modules']} modules)")
+    print(f"Max |difference| over {len(X):,} rows: {results['max_abs_diff']:.2e}")
+
+    if args.output:
+        with open(args.output, "w") as file_obj:
+            json.dump(results, file_obj, indent=2)
+    return 0 if results["max_abs_diff"] < 1e-3 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from benchmarks.stubs import openweather_history_payload
+
+HISTORY_PATH = "/data/2.5/air_pollution/history"
+
+
+class OpenWeatherStubServer:
+    """
+    Local HTTP stand-in for the OpenWeather air_pollution/history endpoint.
+
+    Answers with synthetic data, optionally adding `latency` seconds per request and failing a
+    `fail_rate` fraction of requests with HTTP 503 to exercise retries and resume.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, fail_rate=0.0, seed=0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.requests = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _should_fail(self):
+        with self._lock:
+            self.requests += 1
+            if self._random.random() < self.fail_rate:
+                self.failures += 1
+                return True
+            return False
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != HISTORY_PATH:
+                    return self._send(404, {"cod": 404, "message": "not found"})
+                if server.latency:
+                    time.sleep(server.latency)
+                if server._should_fail():
+                    return self._send(503, {"cod": 503, "message": "stub failure"})
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                try:
+                    payload = openweather_history_payload(query["lat"], query["lon"], query["start"], query["end"])
+                except (KeyError, ValueError) as e:
+                    return self._send(400, {"cod": 400, "message": str(e)})
+                self._send(200, payload)
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
@@ -0,0 +1,302 @@
+"""
+Benchmark the AQI pipeline stages on synthetic multi-city data.
+
+Usage (from the repository root):
+    python -m benchmarks.run_benchmarks --cities 10 --years 2
+    python -m benchmarks.run_benchmarks --stages add_features,train_xgb --compare bench_results/baseline.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic_data import POLLUTANT_COLUMNS, generate_aqi_history, generate_city_locations
+from benchmarks.stubs import use_local_feature_store, openweather_stub
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_MODEL_PATH = os.path.join(REPO_ROOT, "xgb_model.pkl")
+DEFAULT_OUTPUT_DIR = os.path.join(REPO_ROOT, "bench_results")
+
+
+def current_rss_bytes():
+    """
+    Resident set size of this process, or None when it cannot be read cheaply.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def max_rss_bytes():
+    """
+    Lifetime peak RSS reported by getrusage (kilobytes on Linux, bytes on macOS).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class PeakRSSSampler:
+    """
+    Background thread that samples RSS while a stage runs and keeps the maximum.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = current_rss_bytes()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = current_rss_bytes() or 0
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        rss = current_rss_bytes()
+        if rss is None:
+            # No /proc: fall back to the process-lifetime high-water mark
+            self.peak = max_rss_bytes() or 0
+        elif rss > self.peak:
+            self.peak = rss
+        return False
+
+
+def measure(name, run, setup=None, rows=0, repeat=3):
+    """
+    Time `run(*setup())` `repeat` times; setup work is excluded from the timings.
+    """
+    walls = []
+    peak = 0
+    baseline_rss = current_rss_bytes() or 0
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        with PeakRSSSampler() as sampler:
+            start = time.perf_counter()
+            run(*args)
+            walls.append(time.perf_counter() - start)
+        peak = max(peak, sampler.peak)
+        del args
+    best = min(walls)
+    result = {
+        "wall_s": best,
+        "wall_s_median": float(np.median(walls)),
+        "wall_s_runs": walls,
+        "peak_rss_mb": peak / 2 ** 20,
+        "rss_growth_mb": max(peak - baseline_rss, 0) / 2 ** 20,
+        "rows": rows,
+        "rows_per_s": rows / best if best > 0 else None,
+    }
+    print(f"{name:<28} {best:9.4f}s  peak {result['peak_rss_mb']:8.1f} MB  "
+          f"{(result['rows_per_s'] or 0):12.0f} rows/s")
+    return result
+
+
+def bench_remove_outliers(data, repeat):
+    from src.training.preprocess import remove_outliers
+    return measure("remove_outliers", lambda df: remove_outliers(df, POLLUTANT_COLUMNS),
+                   setup=lambda: (data.copy(),), rows=len(data), repeat=repeat)
+
+
+def bench_add_features(data, repeat):
+    from src.training.preprocess import add_features
+    return measure("add_features", add_features, setup=lambda: (data.copy(),), rows=len(data), repeat=repeat)
+
+
+def bench_preprocess(featured, repeat):
+    from src.training.preprocess import preprocess_data_with_lags
+    return measure("preprocess_data_with_lags", preprocess_data_with_lags,
+                   setup=lambda: (featured.copy(),), rows=len(featured), repeat=repeat)
+
+
+def bench_save_to_csv(data, repeat):
+    from src.data_ingestion.fetch_aqi_data import save_to_csv
+    workdir = tempfile.mkdtemp(prefix="aqi_bench_csv_")
+    file_path = os.path.join(workdir, "historical_aqi.csv")
+    # save_to_csv dedupes on date alone, so it only ever sees one location's history
+    if "location" in data.columns:
+        data = data[data["location"] == data["location"].iat[0]].drop(columns=["location"])
+    # Existing file holds everything but the last day; the new batch overlaps it by a day
+    split = max(len(data) - 24, 1)
+    existing, new_batch = data.iloc[:split], data.iloc[max(split - 24, 0):]
+
+    def setup():
+        existing.to_csv(file_path, index=False)
+        return (new_batch, file_path)
+
+    try:
+        return measure("save_to_csv", save_to_csv, setup=setup, rows=len(data), repeat=repeat)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def bench_train_xgb(featured, repeat, train_rows):
+    from sklearn.model_selection import train_test_split
+    from src.training.preprocess import preprocess_data_with_lags
+    from src.training.train_model import train_xgb
+
+    sample = featured.iloc[-train_rows:].reset_index(drop=True) if train_rows else featured
+    X, y, _ = preprocess_data_with_lags(sample.copy())
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    return measure("train_xgb", train_xgb, setup=lambda: (X_train, y_train, X_test, y_test),
+                   rows=len(X_train), repeat=repeat)
+
+
+def bench_predict(repeat, calls, n_locations):
+    locations = generate_city_locations(n_locations)
+    with openweather_stub():
+        start = time.perf_counter()
+        from src.prediction import predict_aqi
+        predict_aqi.load_serving_model()
+        import_s = time.perf_counter() - start
+        coords = list(zip(locations['lat'], locations['lon']))
+
+        def run():
+            for i in range(calls):
+                lat, lon = coords[i % len(coords)]
+                predict_aqi.predict_next_three_days_aqi(lat, lon)
+
+        result = measure("predict_next_three_days_aqi", run, rows=calls, repeat=repeat)
+    result["import_and_model_load_s"] = import_s
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(current, baseline, threshold):
+    """
+    Print per-stage wall-time ratios against a baseline; return the stages that regressed.
+    """
+    regressions = []
+    print(f"\nComparison against baseline ({baseline['meta'].get('git_revision')}):")
+    for stage, result in current["results"].items():
+        previous = baseline.get("results", {}).get(stage)
+        if not previous:
+            continue
+        ratio = result["wall_s"] / previous["wall_s"] if previous["wall_s"] else float("inf")
+        flag = "REGRESSION" if ratio > 1 + threshold else ""
+        print(f"  {stage:<28} {previous['wall_s']:9.4f}s -> {result['wall_s']:9.4f}s  x{ratio:5.2f} {flag}")
+        if flag:
+            regressions.append(stage)
+    return regressions
+
+
+STAGES = ["remove_outliers", "add_features", "preprocess_data_with_lags", "save_to_csv", "train_xgb",
+          "predict_next_three_days_aqi"]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cities", type=int, default=5, help="number of synthetic cities")
+    parser.add_argument("--years", type=float, default=1.0, help="years of hourly history per city")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage (the fastest is reported)")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated subset of stages")
+    parser.add_argument("--train-rows", type=int, default=20000,
+                        help="cap on rows fed to train_xgb (0 = all rows)")
+    parser.add_argument("--predict-calls", type=int, default=20)
+    parser.add_argument("--model-path", default=DEFAULT_MODEL_PATH, help="model served by the local registry")
+    parser.add_argument("--output", help="result JSON path (default: bench_results/bench_<timestamp>.json)")
+    parser.add_argument("--compare", help="baseline result JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before flagging")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise SystemExit(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    # Every benchmark runs offline against a throwaway local feature store / model registry
+    use_local_feature_store(model_path=args.model_path if os.path.exists(args.model_path) else None)
+
+    start = time.perf_counter()
+    raw = generate_aqi_history(n_cities=args.cities, years=args.years, seed=args.seed)
+    print(f"Generated {len(raw):,} rows for {args.cities} cities x {args.years} years "
+          f"in {time.perf_counter() - start:.2f}s\n")
+
+    data = raw.drop(columns=["location"], errors="ignore")
+    data["date"] = pd.to_datetime(data["date"])
+
+    results = {}
+    featured = None
+    if {"preprocess_data_with_lags", "train_xgb"} & set(stages):
+        from src.training.preprocess import add_features
+        featured = add_features(data.copy()).dropna().reset_index(drop=True)
+
+    if "remove_outliers" in stages:
+        results["remove_outliers"] = bench_remove_outliers(data, args.repeat)
+    if "add_features" in stages:
+        results["add_features"] = bench_add_features(data, args.repeat)
+    if "preprocess_data_with_lags" in stages:
+        results["preprocess_data_with_lags"] = bench_preprocess(featured, args.repeat)
+    if "save_to_csv" in stages:
+        results["save_to_csv"] = bench_save_to_csv(raw, args.repeat)
+    if "train_xgb" in stages:
+        results["train_xgb"] = bench_train_xgb(featured, args.repeat, args.train_rows)
+    if "predict_next_three_days_aqi" in stages:
+        results["predict_next_three_days_aqi"] = bench_predict(args.repeat, args.predict_calls, args.cities)
+
+    from src.app.metrics import registry
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": vars(args),
+            "rows": len(raw),
+        },
+        "results": results,
+        "spans": registry.summary(),
+    }
+
+    output = args.output or os.path.join(DEFAULT_OUTPUT_DIR, f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as file_obj:
+        json.dump(report, file_obj, indent=2, default=str)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as file_obj:
+            baseline = json.load(file_obj)
+        if compare_results(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
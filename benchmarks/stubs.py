@@ -0,0 +1,72 @@
+import json
+import tempfile
+from contextlib import contextmanager
+from unittest import mock
+
+import pandas as pd
+import requests
+
+from benchmarks.synthetic_data import generate_aqi_history, to_openweather_payload
+from src.feature_store import hopsworks_session
+
+
+def use_local_feature_store(feature_data=None, feature_group_name="historical_aqi_data", model_path=None,
+                            model_name="XGB_Model", root=None):
+    """
+    Point the shared Hopsworks session at a throwaway local store and return the session.
+
+    `feature_data` seeds version 1 of the feature group and `model_path` (a .pkl file or a model
+    directory) seeds version 1 of the model, so repo modules can be imported and timed offline.
+    """
+    root = root or tempfile.mkdtemp(prefix="aqi_bench_store_")
+    session = hopsworks_session.configure("local", root=root)
+    if feature_data is not None:
+        primary_key = ["location", "date"] if "location" in feature_data.columns else ["date"]
+        session.create_feature_group(feature_group_name, 1, description="Synthetic AQI data",
+                                     primary_key=primary_key).insert(feature_data)
+    if model_path is not None:
+        session.model_registry().python.create_model(name=model_name).save(model_path)
+    return session
+
+
+class _StubResponse:
+    def __init__(self, payload, status_code=200):
+        self.status_code = status_code
+        self._payload = payload
+        self.text = json.dumps(payload) if status_code != 200 else ""
+
+    def json(self):
+        return self._payload
+
+    def raise_for_status(self):
+        if self.status_code != 200:
+            raise requests.HTTPError(f"{self.status_code} error")
+
+
+def openweather_history_payload(lat, lon, start, end):
+    """
+    Build a deterministic air_pollution/history payload for the hours in [start, end).
+    """
+    start_ts = pd.Timestamp(int(start), unit='s').floor('H')
+    hours = max(int((int(end) - int(start)) // 3600), 1)
+    seed = abs(hash((round(float(lat), 4), round(float(lon), 4)))) % (2 ** 32)
+    frame = generate_aqi_history(n_cities=1, years=hours / (365 * 24), seed=seed,
+                                 start=start_ts.strftime('%Y-%m-%d %H:%M:%S'))
+    return to_openweather_payload(frame)
+
+
+@contextmanager
+def openweather_stub():
+    """
+    Patch requests.get so OpenWeather history calls are answered from the synthetic generator.
+    """
+    calls = []
+
+    def fake_get(url, params=None, **kwargs):
+        params = params or {}
+        calls.append((url, dict(params)))
+        payload = openweather_history_payload(params["lat"], params["lon"], params["start"], params["end"])
+        return _StubResponse(payload)
+
+    with mock.patch.object(requests, "get", fake_get):
+        yield calls
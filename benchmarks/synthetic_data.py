@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+
+# Column order of historical_aqi.csv
+POLLUTANT_COLUMNS = ['co', 'no', 'no2', 'o3', 'so2', 'pm2_5', 'pm10', 'nh3']
+AQI_COLUMNS = ['date', 'aqi'] + POLLUTANT_COLUMNS
+
+# Typical hourly levels (ug/m3) and relative spread, loosely fitted to the Karachi history
+_BASE_LEVELS = {
+    'co': (900.0, 0.45),
+    'no': (2.0, 1.2),
+    'no2': (25.0, 0.5),
+    'o3': (70.0, 0.45),
+    'so2': (10.0, 0.5),
+    'pm2_5': (45.0, 0.55),
+    'pm10': (75.0, 0.5),
+    'nh3': (9.0, 0.45),
+}
+
+# Diurnal phase (hour of the daily peak) per pollutant; traffic pollutants peak at night, ozone at noon
+_PEAK_HOUR = {'co': 21, 'no': 8, 'no2': 20, 'o3': 13, 'so2': 10, 'pm2_5': 22, 'pm10': 22, 'nh3': 6}
+
+# OpenWeather AQI breakpoints (upper bound of index 1..4) per pollutant
+_AQI_BREAKPOINTS = {
+    'so2': (20, 80, 250, 350),
+    'no2': (40, 70, 150, 200),
+    'pm10': (20, 50, 100, 200),
+    'pm2_5': (10, 25, 50, 75),
+    'o3': (60, 100, 140, 180),
+    'co': (4400, 9400, 12400, 15400),
+}
+
+
+def ar1_filter(shocks, phi):
+    """
+    Return the AR(1) series y[t] = phi * y[t-1] + shocks[t], starting from y[-1] = 0.
+    """
+    series = np.empty(len(shocks))
+    level = 0.0
+    for i, shock in enumerate(shocks.tolist()):
+        level = phi * level + shock
+        series[i] = level
+    return series
+
+
+def openweather_aqi_index(frame):
+    """
+    Derive the 1-5 OpenWeather AQI index from pollutant concentrations (worst pollutant wins).
+    """
+    index = np.ones(len(frame), dtype=np.int64)
+    for col, bounds in _AQI_BREAKPOINTS.items():
+        index = np.maximum(index, np.searchsorted(np.asarray(bounds), frame[col].to_numpy(), side='right') + 1)
+    return index
+
+
+def generate_city_locations(n_cities, seed=42):
+    """
+    Return a DataFrame of synthetic locations (location, lat, lon, severity).
+    """
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'location': [f'city_{i:04d}' for i in range(n_cities)],
+        'lat': np.round(rng.uniform(-50.0, 60.0, n_cities), 4),
+        'lon': np.round(rng.uniform(-180.0, 180.0, n_cities), 4),
+        # Multiplier on the base pollutant levels; Karachi-like cities sit around 1.0
+        'severity': np.round(rng.lognormal(mean=0.0, sigma=0.5, size=n_cities), 3),
+    })
+
+
+def generate_aqi_history(n_cities=1, years=1.0, seed=42, start="2023-01-01", include_location=None):
+    """
+    Generate seeded hourly pollutant series for `n_cities` over `years` in the historical_aqi.csv schema.
+
+    Each series combines a per-city severity, a yearly cycle (worse in winter), a diurnal cycle,
+    AR(1) noise and occasional pollution episodes. A `location` column is added when more than one
+    city is generated (or when `include_location` is True).
+    """
+    rng = np.random.default_rng(seed)
+    hours = int(round(years * 365 * 24))
+    dates = pd.date_range(start=start, periods=hours, freq='H')
+    locations = generate_city_locations(n_cities, seed=seed)
+
+    hour_of_day = dates.hour.to_numpy()
+    day_of_year = dates.dayofyear.to_numpy()
+    # Format the shared timestamps once instead of per city
+    date_strings = np.asarray(dates.strftime('%Y-%m-%d %H:%M:%S'), dtype=object)
+    # Winter peak around day 15, summer trough
+    seasonal = 1.0 + 0.35 * np.cos(2 * np.pi * (day_of_year - 15) / 365.25)
+
+    frames = []
+    for city_index, severity in enumerate(locations['severity'].to_numpy()):
+        # AR(1) log-noise shared across pollutants (weather drives all of them), plus episode spikes
+        noise = ar1_filter(rng.normal(0.0, 0.12, hours), 0.92)
+        episodes = (rng.random(hours) < 0.002).astype(float)
+        episodes = np.convolve(episodes, np.exp(-np.arange(48) / 12.0), mode='full')[:hours]
+
+        city = {'date': date_strings}
+        for col in POLLUTANT_COLUMNS:
+            base, spread = _BASE_LEVELS[col]
+            diurnal = 1.0 + 0.3 * np.cos(2 * np.pi * (hour_of_day - _PEAK_HOUR[col]) / 24)
+            own_noise = rng.normal(0.0, spread * 0.3, hours)
+            level = base * severity * seasonal * diurnal * np.exp(noise + own_noise) * (1.0 + 1.5 * episodes)
+            city[col] = np.round(level, 2)
+
+        city_frame = pd.DataFrame(city)
+        city_frame.insert(1, 'aqi', openweather_aqi_index(city_frame))
+        if include_location or (include_location is None and n_cities > 1):
+            city_frame.insert(0, 'location', locations['location'].iat[city_index])
+        frames.append(city_frame)
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def to_openweather_payload(frame):
+    """
+    Render a single-city frame as an OpenWeather air_pollution/history JSON payload.
+    """
+    timestamps = pd.to_datetime(frame['date']).astype('int64') // 10 ** 9
+    components = frame[POLLUTANT_COLUMNS].to_dict(orient='records')
+    return {
+        'coord': {},
+        'list': [
+            {'dt': int(dt), 'main': {'aqi': int(aqi)}, 'components': comp}
+            for dt, aqi, comp in zip(timestamps, frame['aqi'].to_numpy(), components)
+        ],
+    }
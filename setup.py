@@ -19,6 +19,16 @@ setup(
     version='0.0.1',
     author='Areeb',
     author_email='M.AreebBinNadeem@gmail.com',
-    packages=find_packages(),
-    install_requires=get_requirements('requirements.txt')
+    packages=find_packages(exclude=['benchmarks', 'benchmarks.*']),
+    install_requires=get_requirements('requirements.txt'),
+    entry_points={
+        'console_scripts': [
+            'aqi=src.cli:main',
+            'aqi-ingest=src.cli:ingest',
+            'aqi-upload=src.cli:upload',
+            'aqi-train=src.cli:train',
+            'aqi-serve=src.cli:serve_command',
+            'aqi-score=src.cli:score',
+        ],
+    },
 )
@@ -1,20 +1,30 @@
-import sys
-import os
-# Add the parent directory to the Python path
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 import os
+from datetime import datetime
+
 import pandas as pd
-import streamlit as st
-from flask import Flask, request, jsonify
+from functools import lru_cache
+from flask import Flask, Response, request
 from threading import Thread
 from dotenv import load_dotenv
 from src.app.logger import get_logger
 from src.app.exception import AppException
-from src.prediction.predict_aqi import predict_next_three_days_aqi
+from src.app.metrics import render_prometheus, increment
+from src.app.responses import RESPONSE_FORMATS, hour_window, make_etag, dumps_json, render
+from src.app.history import load_history, history_version
+from src.app.downsample import downsample_frame
+from src.data_ingestion.locations import load_locations, DEFAULT_REGISTRY_PATH
+from src.prediction.predict_aqi import predict_next_three_days_aqi, load_serving_model, serving_model_version
+from src.training.feature_spec import LAGGED_COLUMNS
 
 # Load environment variables
 load_dotenv()
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
+# Port of the Flask API started next to the Streamlit dashboard
+API_PORT = int(os.getenv("AQI_API_PORT", "8000"))
+# Points per history chart after downsampling
+CHART_POINTS = int(os.getenv("AQI_CHART_POINTS", "1500"))
+# (location, hour) forecasts kept in memory by the API
+FORECAST_CACHE_SIZE = int(os.getenv("AQI_FORECAST_CACHE_SIZE", "1024"))
 
 # Initialize logger
 logger = get_logger("Dashboard")
@@ -22,85 +32,204 @@ logger = get_logger("Dashboard")
 # Flask Backend
 app = Flask(__name__)
 
+@lru_cache(maxsize=FORECAST_CACHE_SIZE)
+def api_forecast(lat, lon, location, hour):
+    """
+    Forecast for one (location, UTC hour), computed once per process; failures are not cached.
+    """
+    predictions = forecast_for(location, lat, lon, hour)
+    if not predictions:
+        raise AppException("Failed to fetch AQI predictions!", status_code=502)
+    return predictions
+
+
 @app.route("/predict_aqi", methods=["GET"])
 def predict_aqi():
     try:
         lat = request.args.get("lat", type=float)
         lon = request.args.get("lon", type=float)
+        location = request.args.get("location")
+        fmt = request.args.get("format", "json").lower()
 
         if lat is None or lon is None:
             raise AppException("Latitude and Longitude are required!", status_code=400)
+        if fmt not in RESPONSE_FORMATS:
+            raise AppException(f"Unsupported format '{fmt}' (expected one of {list(RESPONSE_FORMATS)}).",
+                               status_code=400)
 
-        logger.info(f"Received request for AQI prediction: lat={lat}, lon={lon}")
-        predictions = predict_next_three_days_aqi(lat, lon)
+        # Forecasts change once per hour (and with a new model), so the validators are known
+        # before anything is computed; the model itself is only loaded to answer a 200
+        refreshed, max_age = hour_window()
+        response = Response(mimetype=RESPONSE_FORMATS[fmt])
+        response.set_etag(make_etag(round(lat, 4), round(lon, 4), location, fmt, refreshed.isoformat(),
+                                    serving_model_version()))
+        response.last_modified = refreshed
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
 
-        if predictions:
-            logger.info(f"Predictions generated successfully for lat={lat}, lon={lon}")
-            return jsonify(predictions)
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains(response.get_etag()[0])
         else:
-            raise AppException("Failed to fetch AQI predictions!", status_code=500)
+            not_modified = request.if_modified_since is not None and request.if_modified_since >= refreshed
+        if not_modified:
+            increment("predict_not_modified")
+            response.status_code = 304
+            return response
+
+        logger.info(f"Received request for AQI prediction: lat={lat}, lon={lon}")
+        predictions = api_forecast(lat, lon, location, refreshed.strftime("%Y-%m-%d %H"))
+        logger.info(f"Predictions generated successfully for lat={lat}, lon={lon}")
+        response.data, _ = render(predictions, fmt)
+        return response
 
     except AppException as e:
         logger.error(f"AppException: {str(e)}")
-        return jsonify({"error": str(e)}), e.status_code
+        return Response(dumps_json({"error": e.message}), status=e.status_code, mimetype="application/json")
     except Exception as e:
         logger.exception("Unexpected error occurred while predicting AQI!")
-        return jsonify({"error": "An unexpected error occurred!"}), 500
+        return Response(dumps_json({"error": "An unexpected error occurred!"}), status=500,
+                        mimetype="application/json")
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Expose stage latency histograms and event counters in Prometheus text format.
+    """
+    return Response(render_prometheus(), mimetype="text/plain; version=0.0.4")
 
 
 # Streamlit Frontend
+def load_model_provider():
+    """
+    Load the serving model once; the page keeps the returned predictor as a cached resource.
+    """
+    load_serving_model()
+    return predict_next_three_days_aqi
+
+
+def forecast_for(location_id, lat, lon, hour):
+    # `hour` only keys the cache: a location's forecast is computed at most once per hour
+    return predict_next_three_days_aqi(lat, lon, location_id)
+
+
+def registry_locations(version):
+    # `version` (the registry's mtime) only keys the cache
+    return load_locations()
+
+
+def history_bounds(location, version):
+    # `version` (the partition's mtime) only keys the cache, as in the two functions below
+    dates = load_history(location, columns=[])["date"]
+    return (dates.min(), dates.max()) if len(dates) else None
+
+
+def history_chart(location, column, start, end, version, points=CHART_POINTS):
+    """
+    `column` between `start` and `end`, LTTB-downsampled to `points` rows; returns (chart data, raw rows).
+    """
+    history = load_history(location, [column], start, pd.Timestamp(end).replace(hour=23, minute=59, second=59))
+    return downsample_frame(history, "date", column, points).set_index("date"), len(history)
+
+
+def recent_daily_aqi(location, version, day, days=14):
+    # `day` (the current UTC date) keys the cache too, so the window moves on at midnight UTC
+    history = load_history(location, ["aqi"], start=pd.Timestamp(day) - pd.Timedelta(days=days))
+    return history.set_index("date")["aqi"].resample("D").mean()
+
+
+def show_alerts(st, predictions):
+    for pred in predictions:
+        aqi = pred["Predicted_AQI"]
+        date = pred["Date"]
+        if aqi == 5:
+            st.error(f"🚨 {date}: AQI = {aqi} (Very Hazardous). Stay indoors and wear a mask!")
+        elif aqi == 4:
+            st.warning(f"⚠️ {date}: AQI = {aqi} (Unhealthy). Limit outdoor activities.")
+        elif aqi == 3:
+            st.warning(f"⚠️ {date}: AQI = {aqi} (Moderate). Sensitive groups should take precautions.")
+        elif aqi == 2:
+            st.info(f"🌬️ {date}: AQI = {aqi} (Good). Air quality is satisfactory.")
+        elif aqi == 1:
+            st.success(f"✅ {date}: AQI = {aqi} (Excellent). Enjoy the clean air!")
+
+
 def streamlit_app():
+    # Imported here so the API alone (`aqi serve --api`) does not load Streamlit
+    import streamlit as st
+
+    # Streamlit reruns this script on every interaction. The model is a per-process resource,
+    # forecasts are cached per (location, hour) and history per partition version, so a rerun
+    # with nothing new does no network I/O and re-reads no files.
+    model_provider = st.cache_resource(show_spinner="Loading the forecast model...")(load_model_provider)
+    cached_forecast = st.cache_data(show_spinner="Fetching AQI predictions...", max_entries=1024)(forecast_for)
+    cached_locations = st.cache_data(show_spinner=False)(registry_locations)
+    cached_bounds = st.cache_data(show_spinner=False, max_entries=256)(history_bounds)
+    cached_chart = st.cache_data(show_spinner="Loading history...", max_entries=256)(history_chart)
+    cached_daily = st.cache_data(show_spinner=False, max_entries=256)(recent_daily_aqi)
+
     try:
         st.title("🌍 Air Quality Index (AQI) Predictor")
         st.markdown("Forecasted AQI data")
-        
-        # Fixed Location: Karachi
+
+        locations = cached_locations(os.path.getmtime(DEFAULT_REGISTRY_PATH))
+        default_index = next((i for i, location in enumerate(locations) if location.default), 0)
         st.sidebar.header("Location Information")
-        st.sidebar.markdown("**City**: Karachi")
-        st.sidebar.markdown("**Latitude**: 24.8607")
-        st.sidebar.markdown("**Longitude**: 67.0011")
-        
-        # Latitude and Longitude for API
-        lat = 24.8607
-        lon = 67.0011
+        location = st.sidebar.selectbox("City", locations, index=default_index,
+                                        format_func=lambda location: location.name or location.id)
+        st.sidebar.markdown(f"**Latitude**: {location.lat}")
+        st.sidebar.markdown(f"**Longitude**: {location.lon}")
+        version = history_version(location)
 
+        # Forecasts run on request only; a requested location keeps showing its (hourly cached)
+        # forecast across reruns, e.g. while the history range is adjusted
+        requested = st.session_state.setdefault("forecast_locations", set())
         if st.sidebar.button("Get AQI Forecast"):
-            with st.spinner("Fetching AQI predictions..."):
-                try:
-                    # Fetch predictions
-                    logger.info(f"Fetching AQI predictions for Karachi (lat={lat}, lon={lon})")
-                    predictions = predict_next_three_days_aqi(lat, lon)
-                    
-                    if predictions:
-                        # Display predictions
-                        st.subheader("Forecasted AQI")
-                        forecast_df = pd.DataFrame(predictions)
-                        st.write(forecast_df)
-
-                        # Generate Alerts
-                        st.subheader("⚠️ Alerts")
-                        for pred in predictions:
-                            aqi = pred["Predicted_AQI"]
-                            date = pred["Date"]
-                            if aqi == 5:
-                                st.error(f"🚨 {date}: AQI = {aqi} (Very Hazardous). Stay indoors and wear a mask!")
-                            elif aqi == 4:
-                                st.warning(f"⚠️ {date}: AQI = {aqi} (Unhealthy). Limit outdoor activities.")
-                            elif aqi == 3:
-                                st.warning(f"⚠️ {date}: AQI = {aqi} (Moderate). Sensitive groups should take precautions.")
-                            elif aqi == 2:
-                                st.info(f"🌬️ {date}: AQI = {aqi} (Good). Air quality is satisfactory.")
-                            elif aqi == 1:
-                                st.success(f"✅ {date}: AQI = {aqi} (Excellent). Enjoy the clean air!")
-                    else:
-                        raise AppException("Failed to fetch AQI predictions. Please try again!")
-                except AppException as e:
-                    logger.error(f"AppException: {str(e)}")
-                    st.error(str(e))
-                except Exception as e:
-                    logger.exception("Unexpected error occurred while fetching AQI predictions!")
-                    st.error("An unexpected error occurred! Please check the logs for more details.")
-        
+            requested.add(location.id)
+
+        if location.id in requested:
+            try:
+                model_provider()
+                hour = datetime.utcnow().strftime("%Y-%m-%d %H")
+                logger.info(f"AQI forecast for {location.id} (lat={location.lat}, lon={location.lon}, hour={hour})")
+                predictions = cached_forecast(location.id, location.lat, location.lon, hour)
+                if not predictions:
+                    raise AppException("Failed to fetch AQI predictions. Please try again!")
+
+                # Display predictions
+                st.subheader("Forecasted AQI")
+                forecast_df = pd.DataFrame(predictions)
+                forecast_series = forecast_df.set_index(pd.to_datetime(forecast_df["Date"]))["Predicted_AQI"]
+                chart = pd.DataFrame({"Forecast": forecast_series})
+                if version is not None:
+                    daily = cached_daily(location, version, hour[:10])
+                    chart = pd.concat([daily.rename("Observed (daily mean)"), chart], axis=1)
+                st.line_chart(chart)
+                st.write(forecast_df)
+
+                # Generate Alerts
+                st.subheader("⚠️ Alerts")
+                show_alerts(st, predictions)
+            except AppException as e:
+                logger.error(f"AppException: {str(e)}")
+                st.error(str(e))
+            except Exception as e:
+                logger.exception("Unexpected error occurred while fetching AQI predictions!")
+                st.error("An unexpected error occurred! Please check the logs for more details.")
+
+        # History from the local Parquet mirror of the location's partition
+        st.subheader("Historical Data")
+        bounds = cached_bounds(location, version) if version is not None else None
+        if bounds is None:
+            st.info(f"No local history for {location.name or location.id} yet; run `aqi ingest` to collect it.")
+        else:
+            column = st.sidebar.selectbox("Series", LAGGED_COLUMNS)
+            first, last = bounds[0].date(), bounds[1].date()
+            start, end = st.sidebar.slider("History range", min_value=first, max_value=last, value=(first, last))
+            chart, rows = cached_chart(location, column, start, end, version)
+            st.line_chart(chart)
+            st.caption(f"{len(chart):,} of {rows:,} hourly readings shown (LTTB downsampling).")
+
         # Footer
         st.sidebar.markdown("---")
         st.sidebar.info("Powered by OpenWeather API and Hopsworks")
@@ -110,11 +239,22 @@ def streamlit_app():
         st.error("An unexpected error occurred! Please check the logs for more details.")
 
 
+def start_api_server():
+    """
+    Run the Flask API next to the dashboard in a daemon thread.
+    """
+    thread = Thread(target=lambda: app.run(host="0.0.0.0", port=API_PORT, debug=False, use_reloader=False),
+                    name="aqi-api", daemon=True)
+    thread.start()
+    return thread
+
+
 if __name__ == "__main__":
     try:
-        # Running Flask in a separate thread
-        thread = Thread(target=lambda: app.run(host="0.0.0.0", port=8000, debug=False, use_reloader=False))
-        thread.start()
+        import streamlit as st
+
+        # Running Flask in a separate thread, started once per server process rather than per rerun
+        st.cache_resource(show_spinner=False)(start_api_server)()
 
         # Launch Streamlit
         streamlit_app()
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets: indices of `threshold` points of (x, y) that keep its visual shape.
+
+    The first and last points are always kept; every bucket in between contributes the point forming
+    the largest triangle with the previously kept point and the next bucket's mean, so peaks and
+    dips survive where plain striding or averaging would flatten them. O(n) time.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # threshold - 2 buckets over points 1..n-2; bucket i is [edges[i], edges[i + 1])
+    edges = np.floor(np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    # Prefix sums give every bucket mean in O(1)
+    x_sums = np.concatenate(([0.0], np.cumsum(x)))
+    y_sums = np.concatenate(([0.0], np.cumsum(y)))
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        count = next_end - end
+        mean_x = (x_sums[next_end] - x_sums[end]) / count
+        mean_y = (y_sums[next_end] - y_sums[end]) / count
+
+        # Twice the triangle area; the constant factor does not change the argmax
+        areas = np.abs((x[previous] - mean_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (mean_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def downsample_frame(frame, x_column, y_column, threshold):
+    """
+    Rows of `frame` kept by LTTB on (x_column, y_column); rows with a missing value are dropped.
+
+    Datetime x values are compared as nanoseconds since the epoch.
+    """
+    frame = frame.dropna(subset=[x_column, y_column])
+    if len(frame) <= threshold:
+        return frame
+    x = frame[x_column]
+    if pd.api.types.is_datetime64_any_dtype(x):
+        x = x.astype("int64")
+    return frame.iloc[lttb(x.to_numpy(), frame[y_column].to_numpy(), threshold)]
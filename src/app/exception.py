@@ -9,17 +9,19 @@ class AppException(Exception):
     Custom Exception Class for the AQI Predictor application.
     """
 
-    def __init__(self, message: str, error: Exception = None):
+    def __init__(self, message: str, error: Exception = None, status_code: int = 500):
         """
         Initialize the custom exception.
         
         Args:
         - message (str): Custom error message.
         - error (Exception): Original exception (if any).
+        - status_code (int): HTTP status returned when the error reaches the API.
         """
         super().__init__(message)
         self.message = message
         self.error = error
+        self.status_code = status_code
 
         # Log the error
         logger.error(self.__str__())
@@ -0,0 +1,83 @@
+import os
+
+import pandas as pd
+from src.data_ingestion.locations import DEFAULT_PARTITION_DIR
+from src.training.feature_spec import LAGGED_COLUMNS
+from src.app.exception import AppException
+from src.app.logger import get_logger
+from src.app.metrics import timed, increment
+
+logger = get_logger(__name__)
+
+# Columnar mirror of the CSV partitions read by the dashboard
+DEFAULT_HISTORY_DIR = os.getenv("AQI_HISTORY_DIR", os.path.join("data", "history"))
+HISTORY_COLUMNS = ["date"] + LAGGED_COLUMNS
+
+
+def history_path(location, history_dir=DEFAULT_HISTORY_DIR):
+    return os.path.join(history_dir, f"{location.id}.parquet")
+
+
+def history_version(location, partition_dir=DEFAULT_PARTITION_DIR):
+    """
+    Modification time of the location's CSV partition (None without history); changes on every ingest.
+    """
+    partition = location.partition_path(partition_dir)
+    return os.path.getmtime(partition) if os.path.exists(partition) else None
+
+
+@timed("history_sync")
+def sync_history(location, partition_dir=DEFAULT_PARTITION_DIR, history_dir=DEFAULT_HISTORY_DIR):
+    """
+    Rebuild the location's Parquet history when its CSV partition is newer; returns the Parquet path
+    (None when the location has no partition yet).
+
+    The mirror is sorted by date with float32 values, so a date range of one column is read without
+    parsing the CSV.
+    """
+    try:
+        partition = location.partition_path(partition_dir)
+        if not os.path.exists(partition):
+            return None
+        path = history_path(location, history_dir)
+        if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(partition):
+            return path
+
+        increment("history_rebuild")
+        data = pd.read_csv(partition, usecols=lambda name: name in HISTORY_COLUMNS)
+        data["date"] = pd.to_datetime(data["date"])
+        data = data.drop_duplicates(subset=["date"], keep="last").sort_values("date", kind="mergesort")
+        value_columns = [col for col in LAGGED_COLUMNS if col in data.columns]
+        data[value_columns] = data[value_columns].astype("float32")
+
+        os.makedirs(history_dir, exist_ok=True)
+        # Written beside the target and swapped in, so concurrent readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        data.reset_index(drop=True).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        logger.info(f"Rebuilt Parquet history for '{location.id}' ({len(data)} rows).")
+        return path
+    except Exception as e:
+        raise AppException(f"Failed to sync the history of location '{location.id}'.", e)
+
+
+@timed("history_load")
+def load_history(location, columns=None, start=None, end=None, partition_dir=DEFAULT_PARTITION_DIR,
+                 history_dir=DEFAULT_HISTORY_DIR):
+    """
+    `date` plus `columns` (None: aqi and all pollutants; []: none) of a location's history between
+    `start` and `end` (inclusive); an empty frame when the location has no history.
+    """
+    columns = ["date"] + [col for col in (LAGGED_COLUMNS if columns is None else columns) if col != "date"]
+    path = sync_history(location, partition_dir, history_dir)
+    if path is None:
+        return pd.DataFrame(columns=columns)
+    try:
+        filters = []
+        if start is not None:
+            filters.append(("date", ">=", pd.Timestamp(start)))
+        if end is not None:
+            filters.append(("date", "<=", pd.Timestamp(end)))
+        return pd.read_parquet(path, columns=columns, filters=filters or None)
+    except Exception as e:
+        raise AppException(f"Failed to read the history of location '{location.id}'.", e)
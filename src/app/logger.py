@@ -2,17 +2,29 @@ import logging
 import os
 from datetime import datetime
 
-# Create logs directory if it doesn't exist
-LOG_DIR = "logs"
-if not os.path.exists(LOG_DIR):
-    os.makedirs(LOG_DIR)
+# Log directory; created on the first log record, not on import
+LOG_DIR = os.getenv("AQI_LOG_DIR", "logs")
 
 # Define log file name
 log_file = os.path.join(LOG_DIR, f"log_{datetime.now().strftime('%Y_%m_%d')}.log")
 
+
+class _LazyFileHandler(logging.FileHandler):
+    """
+    File handler that opens its file (and creates the log directory) only when a record is emitted.
+    """
+
+    def __init__(self, filename):
+        super().__init__(filename, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+
 # Configure logging
 logging.basicConfig(
-    filename=log_file,
+    handlers=[_LazyFileHandler(log_file)],
     format="%(asctime)s - %(levelname)s - %(message)s",
     level=logging.INFO,
 )
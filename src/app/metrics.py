@@ -0,0 +1,203 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+from functools import wraps
+
+# Collection switch. Set AQI_METRICS_ENABLED=0 to turn every span and counter into a no-op.
+_enabled = os.getenv("AQI_METRICS_ENABLED", "1").strip().lower() not in ("0", "false", "no", "off")
+
+# Latency bucket upper bounds (seconds) shared by every stage histogram
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+STAGE_METRIC = "aqi_stage_duration_seconds"
+EVENT_METRIC = "aqi_events_total"
+
+
+class _Histogram:
+    """
+    Cumulative latency histogram for a single stage.
+    """
+
+    __slots__ = ("buckets", "counts", "total", "count", "lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.total += value
+            self.count += 1
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.total, self.count
+
+
+class MetricsRegistry:
+    """
+    Process-wide store of stage histograms and event counters.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, _Histogram(self.buckets))
+        histogram.observe(seconds)
+
+    def increment(self, event, amount=1):
+        with self._lock:
+            self._counters[event] = self._counters.get(event, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def summary(self):
+        """
+        Return {stage: {"count", "sum", "mean"}} for quick inspection and benchmarks.
+        """
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+        result = {}
+        for stage, histogram in histograms:
+            _, total, count = histogram.snapshot()
+            result[stage] = {"count": count, "sum": total, "mean": total / count if count else 0.0}
+        return result
+
+    def render_prometheus(self):
+        """
+        Render all metrics in the Prometheus text exposition format (version 0.0.4).
+        """
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+        lines = [
+            f"# HELP {STAGE_METRIC} Wall time spent in instrumented AQI pipeline stages.",
+            f"# TYPE {STAGE_METRIC} histogram",
+        ]
+        for stage, histogram in histograms:
+            counts, total, count = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{STAGE_METRIC}_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{STAGE_METRIC}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{STAGE_METRIC}_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'{STAGE_METRIC}_count{{stage="{stage}"}} {count}')
+
+        lines.append(f"# HELP {EVENT_METRIC} Count of notable AQI pipeline events (cache hits, model loads, ...).")
+        lines.append(f"# TYPE {EVENT_METRIC} counter")
+        for event, value in counters:
+            lines.append(f'{EVENT_METRIC}{{event="{event}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class _Span:
+    """
+    Context manager that records the wall time of its block into a stage histogram.
+    """
+
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        registry.observe(self.stage, time.perf_counter() - self.start)
+        if exc_type is not None:
+            registry.increment(f"{self.stage}_error")
+        return False
+
+
+class _NullSpan:
+    """
+    Shared no-op span handed out while collection is disabled.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def is_enabled():
+    return _enabled
+
+
+def set_enabled(enabled):
+    """
+    Turn metric collection on or off at runtime.
+    """
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def span(stage):
+    """
+    Time a block of code: `with span("predict_inference"): ...`.
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(stage)
+
+
+def timed(stage):
+    """
+    Decorator recording every call of the wrapped function under `stage`.
+
+    When collection is disabled at import time the function is returned unwrapped,
+    so the hot path pays nothing at all.
+    """
+    def decorator(func):
+        if not _enabled:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def increment(event, amount=1):
+    """
+    Bump an event counter (e.g. "model_cache_hit").
+    """
+    if _enabled:
+        registry.increment(event, amount)
+
+
+def render_prometheus():
+    return registry.render_prometheus()
@@ -0,0 +1,51 @@
+import json
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used without it
+    orjson = None
+
+# ?format= values of /predict_aqi -> mimetype
+RESPONSE_FORMATS = {"json": "application/json", "csv": "text/csv"}
+FORECAST_COLUMNS = ["Date", "Predicted_AQI"]
+
+
+def hour_window(now=None):
+    """
+    Start of the current UTC hour (when forecasts were last refreshed) and the seconds until the next one.
+    """
+    now = now or datetime.now(timezone.utc)
+    start = now.replace(minute=0, second=0, microsecond=0)
+    return start, max(1, int((start + timedelta(hours=1) - now).total_seconds()))
+
+
+def make_etag(*parts):
+    """
+    Strong ETag from the values a response is fully determined by, computed without building it.
+    """
+    return hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:24]
+
+
+def dumps_json(obj):
+    """
+    Compact JSON bytes; orjson when installed (also encodes NumPy scalars and arrays natively).
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def dumps_csv(records, columns=FORECAST_COLUMNS):
+    lines = [",".join(columns)]
+    lines.extend(",".join(str(record[col]) for col in columns) for record in records)
+    return ("\n".join(lines) + "\n").encode()
+
+
+def render(records, fmt="json"):
+    """
+    (body bytes, mimetype) of `records` in one of RESPONSE_FORMATS.
+    """
+    body = dumps_csv(records) if fmt == "csv" else dumps_json(records)
+    return body, RESPONSE_FORMATS[fmt]
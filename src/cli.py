@@ -0,0 +1,95 @@
+"""
+Single entry point for the AQI predictor: `aqi <command> [options]`.
+
+Commands import their implementation only when they run, so `aqi --help` and the light commands
+never load pandas, scikit-learn, XGBoost, Streamlit or Hopsworks.
+"""
+import os
+import sys
+import runpy
+import argparse
+
+# command -> (module whose command line it runs, help)
+MODULE_COMMANDS = {
+    "ingest": ("src.data_ingestion.scheduler", "fetch new hourly readings for every registered location"),
+    "upload": ("src.data_ingestion.upload_hopsworks", "upload every location partition to the feature store"),
+    "train": ("src.pipeline.run_pipeline", "run the cached daily training pipeline"),
+    "train-shards": ("src.training.sharded_training", "train and register the per-location model set"),
+    "select": ("src.training.feature_selection", "rank and prune features of the training data"),
+    "export": ("src.training.export_model", "export a pickled model to the compact serving artifact"),
+    "consume": ("src.streaming.consumer", "fold streamed readings into the serving feature state"),
+    "drift": ("src.monitoring.drift", "check recent ingested data against the model's training baseline"),
+    "score": ("src.prediction.predict_aqi", "forecast the AQI for the next three days at a location"),
+}
+COMMANDS = dict(MODULE_COMMANDS, serve=(None, "run the Streamlit dashboard and forecast API"))
+
+DASHBOARD_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app", "dashboard.py")
+
+
+def run_module(module, command, argv):
+    """
+    Run `module` as `python -m module argv...` would, with `aqi <command>` as the program name.
+    """
+    sys.argv = [f"aqi {command}"] + list(argv)
+    runpy.run_module(module, run_name="__main__", alter_sys=True)
+    return 0
+
+
+def serve(argv):
+    parser = argparse.ArgumentParser(prog="aqi serve", description=COMMANDS["serve"][1])
+    parser.add_argument("--api", action="store_true", help="only run the Flask forecast API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, help="dashboard port (default 8501) or, with --api, API port")
+    parser.add_argument("--api-port", type=int, default=8000, help="API port next to the dashboard")
+    args = parser.parse_args(argv)
+
+    if args.api:
+        from src.app.dashboard import app
+
+        app.run(host=args.host, port=args.port or args.api_port, debug=False, use_reloader=False)
+        return 0
+
+    from streamlit.web import cli as streamlit_cli
+
+    os.environ["AQI_API_PORT"] = str(args.api_port)
+    sys.argv = ["streamlit", "run", DASHBOARD_PATH, "--server.address", args.host,
+                "--server.port", str(args.port or 8501)]
+    return streamlit_cli.main()
+
+
+def parse_args(argv=None):
+    commands = "\n".join(f"  {name:<14}{text}" for name, (_, text) in COMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog="aqi", description="AQI predictor: ingestion, training and serving.",
+        epilog=f"commands:\n{commands}\n\nRun `aqi <command> --help` for the options of a command.",
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=list(COMMANDS), metavar="command", help="one of the commands below")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "serve":
+        return serve(args.args)
+    return run_module(MODULE_COMMANDS[args.command][0], args.command, args.args)
+
+
+def _command(name):
+    def entry_point():
+        return main([name] + sys.argv[1:])
+
+    entry_point.__name__ = name.replace("-", "_")
+    return entry_point
+
+
+# Console scripts for the common commands (`aqi-ingest` is `aqi ingest`)
+ingest = _command("ingest")
+upload = _command("upload")
+train = _command("train")
+serve_command = _command("serve")
+score = _command("score")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
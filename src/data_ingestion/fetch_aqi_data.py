@@ -5,13 +5,30 @@ from datetime import datetime
 from dotenv import load_dotenv
 from src.app.exception import AppException
 from src.app.logger import get_logger
+from src.app.metrics import timed
+from src.data_ingestion.locations import default_location
+from src.monitoring.running_stats import update_location_stats
 
 # Initialize logger
 logger = get_logger(__name__)
 
-def get_historical_aqi(lat, lon, start_date, end_date):
+def to_unix_timestamp(value):
+    """
+    Convert a "%Y-%m-%d" string, datetime or UNIX timestamp to an integer UNIX timestamp.
+    """
+    if isinstance(value, str):
+        return int(datetime.strptime(value, "%Y-%m-%d").timestamp())
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+@timed("ingest_fetch")
+def get_historical_aqi(lat, lon, start_date, end_date, http=None):
     """
     Fetch historical AQI data from the OpenWeather API for the specified coordinates and date range.
+
+    `start_date`/`end_date` may be "%Y-%m-%d" strings, datetimes or UNIX timestamps. Pass a
+    `requests.Session` as `http` to reuse connections across calls.
     """
     try:
         logger.info("Loading OpenWeather API key from environment...")
@@ -21,11 +38,12 @@ def get_historical_aqi(lat, lon, start_date, end_date):
         if not API_KEY:
             raise AppException("OpenWeather API key not found. Set it in the .env file.")
 
-        BASE_URL = "https://api.openweathermap.org/data/2.5/air_pollution/history"
+        BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "https://api.openweathermap.org").rstrip("/") + \
+            "/data/2.5/air_pollution/history"
 
         # Convert dates to UNIX timestamps
-        start_timestamp = int(datetime.strptime(start_date, "%Y-%m-%d").timestamp())
-        end_timestamp = int(datetime.strptime(end_date, "%Y-%m-%d").timestamp())
+        start_timestamp = to_unix_timestamp(start_date)
+        end_timestamp = to_unix_timestamp(end_date)
 
         params = {
             "lat": lat,
@@ -37,7 +55,7 @@ def get_historical_aqi(lat, lon, start_date, end_date):
 
         logger.info(f"Fetching AQI data from OpenWeather API for coordinates ({lat}, {lon}) "
                     f"from {start_date} to {end_date}...")
-        response = requests.get(BASE_URL, params=params)
+        response = (http or requests).get(BASE_URL, params=params)
 
         if response.status_code == 200:
             try:
@@ -54,6 +72,7 @@ def get_historical_aqi(lat, lon, start_date, end_date):
         raise AppException("Error occurred during API fetch operation.", e)
 
 
+@timed("ingest_parse")
 def create_dataframe(data):
     """
     Create a DataFrame from the AQI data JSON response.
@@ -79,9 +98,12 @@ def create_dataframe(data):
         raise AppException("Failed to create DataFrame from API data.", e)
 
 
+@timed("ingest_save")
 def save_to_csv(new_data, file_path):
     """
     Save the DataFrame to a CSV file, appending to existing data if the file exists.
+
+    Returns the rows of `new_data` that were not already in the file.
     """
     try:
         if os.path.exists(file_path):
@@ -90,10 +112,12 @@ def save_to_csv(new_data, file_path):
             updated_data = pd.concat([existing_data, new_data]).drop_duplicates(subset=["date"]).reset_index(drop=True)
             updated_data.to_csv(file_path, index=False)
             logger.info("New data appended successfully.")
+            return new_data[~new_data["date"].astype(str).isin(existing_data["date"].astype(str))]
         else:
             logger.info(f"CSV file '{file_path}' not found. Creating a new file...")
             new_data.to_csv(file_path, index=False)
             logger.info("New CSV file created successfully.")
+            return new_data
     except Exception as e:
         logger.error(f"Error while saving data to CSV: {e}")
         raise AppException("Failed to save data to CSV.", e)
@@ -101,9 +125,10 @@ def save_to_csv(new_data, file_path):
 
 if __name__ == "__main__":
     try:
-        logger.info("Fetching historical AQI data for Karachi...")
-        # Coordinates for Karachi
-        lat, lon = 24.8607, 67.0011
+        # Default location from the registry (Karachi)
+        location = default_location()
+        logger.info(f"Fetching historical AQI data for {location.name or location.id}...")
+        lat, lon = location.lat, location.lon
 
         # Fixed start date and dynamic end date
         start_date = "2023-01-01"
@@ -114,7 +139,9 @@ if __name__ == "__main__":
 
         if data:
             df = create_dataframe(data)
-            save_to_csv(df, "historical_aqi.csv")
+            fresh = save_to_csv(df, location.partition_path())
+            # Drift statistics cover exactly the rows the partition gained
+            update_location_stats(location.id, fresh)
             logger.info("Historical AQI data fetching and saving completed successfully.")
         else:
             logger.warning("No data returned from API.")
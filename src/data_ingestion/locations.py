@@ -0,0 +1,64 @@
+import os
+import json
+from dataclasses import dataclass
+from typing import List, Optional
+from src.app.exception import AppException
+from src.app.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_REGISTRY_PATH = os.getenv("AQI_LOCATIONS_FILE", os.path.join("config", "locations.json"))
+DEFAULT_PARTITION_DIR = os.getenv("AQI_PARTITION_DIR", os.path.join("data", "locations"))
+
+
+@dataclass(frozen=True)
+class Location:
+    """
+    A monitored site from the location registry.
+    """
+    id: str
+    lat: float
+    lon: float
+    name: str = ""
+    region: str = ""
+    path: Optional[str] = None
+    default: bool = False
+
+    def partition_path(self, data_dir=DEFAULT_PARTITION_DIR):
+        """
+        CSV partition holding this location's hourly history (historical_aqi.csv schema).
+        """
+        return self.path or os.path.join(data_dir, f"{self.id}.csv")
+
+
+def load_registry(path=DEFAULT_REGISTRY_PATH):
+    """
+    Load the location registry; returns (locations, default_start).
+    """
+    try:
+        with open(path) as file_obj:
+            config = json.load(file_obj)
+        locations = [Location(**entry) for entry in config.get("locations", [])]
+        ids = [location.id for location in locations]
+        if len(ids) != len(set(ids)):
+            raise AppException(f"Duplicate location ids in registry '{path}'.")
+        logger.info(f"Loaded {len(locations)} locations from '{path}'.")
+        return locations, config.get("default_start", "2023-01-01")
+    except AppException:
+        raise
+    except Exception as e:
+        raise AppException(f"Failed to load location registry '{path}'.", e)
+
+
+def load_locations(path=DEFAULT_REGISTRY_PATH) -> List[Location]:
+    return load_registry(path)[0]
+
+
+def default_location(path=DEFAULT_REGISTRY_PATH) -> Location:
+    """
+    The location flagged `"default": true` (the first one if none is flagged).
+    """
+    locations = load_locations(path)
+    if not locations:
+        raise AppException(f"Location registry '{path}' is empty.")
+    return next((location for location in locations if location.default), locations[0])
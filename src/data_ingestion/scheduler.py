@@ -0,0 +1,285 @@
+import os
+import json
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import requests
+from src.data_ingestion.fetch_aqi_data import get_historical_aqi, create_dataframe, save_to_csv
+from src.data_ingestion.locations import load_registry, DEFAULT_REGISTRY_PATH, DEFAULT_PARTITION_DIR
+from src.monitoring.running_stats import update_location_stats
+from src.app.exception import AppException
+from src.app.logger import get_logger
+from src.app.metrics import span, increment
+
+logger = get_logger(__name__)
+
+STATE_FILE = "_state.json"
+REPORT_DIR = "_reports"
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket shared by all workers: `rate` calls per `period` seconds.
+    """
+
+    def __init__(self, rate, period=60.0, burst=None):
+        self.capacity = float(burst or rate)
+        self.fill_rate = rate / period
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.fill_rate
+            time.sleep(wait)
+
+
+class IngestionState:
+    """
+    Per-location watermarks (last ingested hour) persisted next to the partitions.
+
+    The file is rewritten atomically after every successful location, so a crashed or partially
+    failed run resumes from the last hour each location actually stored.
+    """
+
+    def __init__(self, data_dir):
+        self.path = os.path.join(data_dir, STATE_FILE)
+        self.lock = threading.Lock()
+        self.watermarks = {}
+        if os.path.exists(self.path):
+            with open(self.path) as file_obj:
+                self.watermarks = json.load(file_obj).get("watermarks", {})
+
+    def get(self, location):
+        value = self.watermarks.get(location.id)
+        if value is not None:
+            return pd.Timestamp(value)
+        # No recorded state: fall back to the newest row already in the partition
+        partition = location.partition_path(os.path.dirname(self.path))
+        if os.path.exists(partition):
+            dates = pd.read_csv(partition, usecols=["date"])["date"]
+            if len(dates):
+                return pd.Timestamp(dates.max())
+        return None
+
+    def update(self, location_id, watermark):
+        with self.lock:
+            self.watermarks[location_id] = watermark.strftime("%Y-%m-%d %H:%M:%S")
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as file_obj:
+                json.dump({"watermarks": self.watermarks}, file_obj, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+def append_partition(new_data, file_path, watermark):
+    """
+    Append only rows newer than `watermark`; O(new rows) instead of re-reading the partition.
+
+    Returns the rows that were new to the partition.
+    """
+    if watermark is None or not os.path.exists(file_path):
+        return save_to_csv(new_data, file_path)
+    fresh = new_data[pd.to_datetime(new_data["date"]) > watermark]
+    if not fresh.empty:
+        fresh.to_csv(file_path, mode="a", header=False, index=False)
+    return fresh
+
+
+def record_stats(location_id, rows, data_dir):
+    """
+    Fold appended rows into the location's drift statistics; a failure is logged, never retried,
+    since the rows are already stored and the watermark advanced.
+    """
+    try:
+        with span("scheduler_stats"):
+            update_location_stats(location_id, rows, data_dir)
+    except Exception as e:
+        increment("scheduler_stats_failed")
+        logger.warning(f"Statistics update for '{location_id}' failed: {e}")
+
+
+def publish_readings(publisher, location, rows):
+    """
+    Stream appended rows to the feature-state topic; a failure is logged, never retried, since
+    the rows are already stored and the watermark advanced.
+    """
+    try:
+        with span("scheduler_publish"):
+            publisher(location, rows)
+    except Exception as e:
+        increment("scheduler_publish_failed")
+        logger.warning(f"Publishing readings of '{location.id}' failed: {e}")
+
+
+def plan_ingestion(locations, state, default_start, now):
+    """
+    Return [(gap_hours, location, start, watermark)] ordered by the largest gap first.
+    """
+    plan = []
+    for location in locations:
+        watermark = state.get(location)
+        start = watermark + timedelta(hours=1) if watermark is not None else pd.Timestamp(default_start)
+        gap_hours = (now - start) / timedelta(hours=1)
+        if gap_hours >= 1:
+            plan.append((gap_hours, location, start, watermark))
+    plan.sort(key=lambda item: item[0], reverse=True)
+    return plan
+
+
+_thread_local = threading.local()
+
+
+def _http_session():
+    # One keep-alive connection pool per worker thread
+    if not hasattr(_thread_local, "session"):
+        _thread_local.session = requests.Session()
+    return _thread_local.session
+
+
+def ingest_location(location, start, end, watermark, data_dir, limiter, state, retries=2, backoff=2.0,
+                    publisher=None):
+    """
+    Fetch, parse and append one location's missing hours; returns a per-location report entry.
+
+    With a `publisher`, the appended readings are also streamed to the feature-state topic.
+    """
+    started = time.perf_counter()
+    for attempt in range(retries + 1):
+        try:
+            limiter.acquire()
+            with span("scheduler_location"):
+                # Naive pandas Timestamps are UTC, matching the partition dates
+                data = get_historical_aqi(location.lat, location.lon, start, end, http=_http_session())
+                df = create_dataframe(data)
+                rows = 0
+                if not df.empty:
+                    fresh = append_partition(df, location.partition_path(data_dir), watermark)
+                    rows = len(fresh)
+                    # Advance the watermark as soon as the rows are stored, so a retry never re-appends them
+                    watermark = pd.Timestamp(df["date"].max())
+                    state.update(location.id, watermark)
+                    if rows:
+                        if publisher is not None:
+                            publish_readings(publisher, location, fresh)
+                        record_stats(location.id, fresh, data_dir)
+            increment("scheduler_location_ok")
+            return {"id": location.id, "status": "ok", "rows": rows, "attempts": attempt + 1,
+                    "seconds": round(time.perf_counter() - started, 3)}
+        except Exception as e:
+            increment("scheduler_location_retry")
+            logger.warning(f"Ingestion of '{location.id}' failed (attempt {attempt + 1}/{retries + 1}): {e}")
+            if attempt < retries:
+                time.sleep(backoff * 2 ** attempt)
+            error = str(e)
+    increment("scheduler_location_failed")
+    return {"id": location.id, "status": "failed", "rows": 0, "attempts": retries + 1, "error": error,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+def run_ingestion(locations, data_dir=DEFAULT_PARTITION_DIR, default_start="2023-01-01", max_workers=8,
+                  calls_per_minute=60, retries=2, backoff=2.0, now=None, publisher=None):
+    """
+    Refresh every location concurrently under a global API rate budget and return a run report.
+    """
+    try:
+        os.makedirs(data_dir, exist_ok=True)
+        now = pd.Timestamp(now or datetime.utcnow()).floor("H")
+        state = IngestionState(data_dir)
+        # The bucket starts full, so its size must stay within the per-minute quota
+        limiter = RateLimiter(calls_per_minute, period=60.0, burst=max(1, min(max_workers, calls_per_minute)))
+        plan = plan_ingestion(locations, state, default_start, now)
+        logger.info(f"Ingestion plan: {len(plan)} of {len(locations)} locations need data "
+                    f"({max_workers} workers, {calls_per_minute} calls/min).")
+
+        started = time.perf_counter()
+        results = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Submission order is the priority order: largest gaps are fetched first
+            futures = [
+                executor.submit(ingest_location, location, start, now, watermark, data_dir, limiter, state,
+                                retries, backoff, publisher)
+                for _, location, start, watermark in plan
+            ]
+            for future in as_completed(futures):
+                results.append(future.result())
+        if publisher is not None:
+            publisher.flush()
+        elapsed = time.perf_counter() - started
+
+        failed = [result["id"] for result in results if result["status"] != "ok"]
+        report = {
+            "started_at": (datetime.utcnow() - timedelta(seconds=elapsed)).isoformat(timespec="seconds"),
+            "until": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "locations_total": len(locations),
+            "locations_planned": len(plan),
+            "locations_ok": len(results) - len(failed),
+            "locations_failed": failed,
+            "rows_written": sum(result["rows"] for result in results),
+            "seconds": round(elapsed, 3),
+            "locations_per_minute": round(len(results) / elapsed * 60, 2) if elapsed > 0 else None,
+            "settings": {"max_workers": max_workers, "calls_per_minute": calls_per_minute, "retries": retries},
+            "locations": sorted(results, key=lambda result: result["id"]),
+        }
+        logger.info(f"Ingestion finished: {report['locations_ok']} ok, {len(failed)} failed, "
+                    f"{report['rows_written']} rows, {report['locations_per_minute']} locations/min.")
+        return report
+    except Exception as e:
+        raise AppException("Multi-location ingestion run failed.", e)
+
+
+def write_report(report, data_dir=DEFAULT_PARTITION_DIR):
+    report_dir = os.path.join(data_dir, REPORT_DIR)
+    os.makedirs(report_dir, exist_ok=True)
+    path = os.path.join(report_dir, f"run_{datetime.utcnow():%Y%m%d_%H%M%S}.json")
+    with open(path, "w") as file_obj:
+        json.dump(report, file_obj, indent=2)
+    return path
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh AQI history for every registered location.")
+    parser.add_argument("--registry", default=DEFAULT_REGISTRY_PATH, help="location registry JSON")
+    parser.add_argument("--data-dir", default=DEFAULT_PARTITION_DIR, help="per-location partition directory")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--calls-per-minute", type=float, default=60, help="global OpenWeather call budget")
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--publish", action="store_true",
+                        help="stream new readings to the feature-state Kafka topic (needs KAFKA_BOOTSTRAP_SERVERS)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        args = parse_args()
+        locations, default_start = load_registry(args.registry)
+        publisher = None
+        if args.publish:
+            # The in-process broker dies with this process, so publishing there would lose every reading
+            if not os.getenv("KAFKA_BOOTSTRAP_SERVERS"):
+                raise AppException("--publish needs KAFKA_BOOTSTRAP_SERVERS to point at a Kafka cluster.")
+            from src.streaming.producer import ReadingPublisher
+            publisher = ReadingPublisher()
+        report = run_ingestion(locations, data_dir=args.data_dir, default_start=default_start,
+                               max_workers=args.workers, calls_per_minute=args.calls_per_minute,
+                               retries=args.retries, publisher=publisher)
+        report_path = write_report(report, args.data_dir)
+        logger.info(f"Run report written to {report_path}")
+        print(f"Ingested {report['locations_ok']}/{report['locations_planned']} locations "
+              f"({report['locations_per_minute']} locations/min); report: {report_path}")
+        if report["locations_failed"]:
+            raise SystemExit(1)
+    except AppException as e:
+        logger.error(f"Application-level exception encountered: {e}")
+        raise SystemExit(1)
@@ -1,74 +1,118 @@
 import os
+import json
+import argparse
 import pandas as pd
-import hopsworks
-from dotenv import load_dotenv
+from src.data_ingestion.locations import load_locations, DEFAULT_REGISTRY_PATH, DEFAULT_PARTITION_DIR
+from src.feature_store.hopsworks_session import get_session
 from src.app.exception import AppException
 from src.app.logger import get_logger
+from src.app.metrics import timed
 
 # Initialize logger
 logger = get_logger(__name__)
 
-def upload_to_hopsworks(file_path, feature_group_name):
+# Rows of different locations share timestamps, so the location is part of the key
+PRIMARY_KEY = ["location", "date"]
+# Per-location last uploaded hour, kept beside the partitions (and their ingestion watermarks)
+UPLOAD_STATE_FILE = "_uploaded.json"
+
+
+def load_upload_watermarks(data_dir=DEFAULT_PARTITION_DIR):
+    """
+    {location id: last uploaded hour}; empty before the first upload.
+    """
+    path = os.path.join(data_dir, UPLOAD_STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as file_obj:
+            return {location_id: pd.Timestamp(value)
+                    for location_id, value in json.load(file_obj).get("watermarks", {}).items()}
+    except Exception as e:
+        raise AppException(f"Failed to read upload watermarks '{path}'.", e)
+
+
+def save_upload_watermarks(watermarks, data_dir=DEFAULT_PARTITION_DIR):
+    path = os.path.join(data_dir, UPLOAD_STATE_FILE)
+    try:
+        os.makedirs(data_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as file_obj:
+            json.dump({"watermarks": {location_id: value.strftime("%Y-%m-%d %H:%M:%S")
+                                      for location_id, value in sorted(watermarks.items())}},
+                      file_obj, indent=2)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        raise AppException(f"Failed to write upload watermarks '{path}'.", e)
+
+
+def load_partitions(data_dir=DEFAULT_PARTITION_DIR, registry_path=DEFAULT_REGISTRY_PATH, location_ids=None,
+                    since=None):
+    """
+    Every registered location's partition (or just `location_ids`) as one frame with a `location` column.
+
+    With `since` ({location id: hour}), only rows after that location's hour are returned.
+    """
+    since = since or {}
+    frames = []
+    for location in load_locations(registry_path):
+        if location_ids and location.id not in location_ids:
+            continue
+        path = location.partition_path(data_dir)
+        if not os.path.exists(path):
+            logger.warning(f"No partition for location '{location.id}' at '{path}'; skipping it.")
+            continue
+        logger.info(f"Reading data from file: {path}")
+        frame = pd.read_csv(path)
+        if since.get(location.id) is not None:
+            frame = frame[pd.to_datetime(frame["date"]) > since[location.id]]
+        frames.append(frame.assign(location=location.id))
+    if not frames:
+        raise AppException(f"No location partitions found under '{data_dir}'.")
+    return pd.concat(frames, ignore_index=True)
+
+
+def location_keyed_version(feature_group_name):
     """
-    Upload a dataset from a CSV file to a Hopsworks feature group.
+    Latest version of the feature group if it is keyed on location, else 0 (a new version is needed).
+    """
+    session = get_session()
+    latest_version = session.latest_feature_group_version(feature_group_name)
+    if not latest_version:
+        return 0
+    primary_key = session.feature_group(feature_group_name, version=latest_version).primary_key or []
+    return latest_version if "location" in primary_key else 0
+
+
+@timed("upload")
+def upload_to_hopsworks(data_df, feature_group_name):
+    """
+    Upload location-tagged AQI rows to a Hopsworks feature group keyed on (location, date).
     """
     try:
-        logger.info("Loading Hopsworks API key from environment...")
-        load_dotenv()
-        api_key = os.getenv("HOPSWORKS_API_KEY")
-
-        # Attempt to log in with cached credentials first
-        try:
-            logger.info("Attempting to log in with cached credentials...")
-            project = hopsworks.login()
-            logger.info("Successfully logged in using cached credentials.")
-        except Exception as cached_login_error:
-            logger.warning("Cached credentials not found. Falling back to API key login.")
-
-            # If no API key is found in the environment, raise an exception
-            if not api_key:
-                raise AppException("Hopsworks API key not found. Set it in the .env file.")
-
-            # Login using the API key
-            try:
-                project = hopsworks.login(api_key=api_key)
-                logger.info("Successfully logged in using API key.")
-            except Exception as api_login_error:
-                logger.error(f"Login failed using API key: {api_login_error}")
-                raise AppException("Failed to authenticate with Hopsworks. Please check your API key or credentials.")
-
-        fs = project.get_feature_store()
-
-        # Verify the file exists
-        if not os.path.exists(file_path):
-            raise AppException(f"The file '{file_path}' does not exist.")
-
-        # Load the data
-        logger.info(f"Reading data from file: {file_path}")
-        data_df = pd.read_csv(file_path)
-
-        # Retrieve existing feature groups to determine the latest version
+        session = get_session()
+
+        if "location" not in data_df.columns:
+            raise AppException("Data to upload has no 'location' column.")
+
+        # Versions keyed on date alone cannot hold several locations, so they are superseded
         logger.info(f"Checking for existing feature groups named '{feature_group_name}'...")
-        existing_versions = [
-            fg.version for fg in fs.get_feature_groups(name=feature_group_name)
-        ]
-        latest_version = max(existing_versions, default=0)
-
-        # Attempt to fetch the existing feature group
-        try:
-            logger.info(f"Fetching existing feature group '{feature_group_name}' (version {latest_version})...")
-            feature_group = fs.get_feature_group(feature_group_name, version=latest_version)
+        latest_version = session.latest_feature_group_version(feature_group_name)
+        keyed_version = location_keyed_version(feature_group_name)
+
+        if keyed_version:
+            logger.info(f"Fetching existing feature group '{feature_group_name}' (version {keyed_version})...")
+            feature_group = session.feature_group(feature_group_name, version=keyed_version)
             feature_group.insert(data_df, overwrite=False)
-            logger.info(f"Data successfully appended to feature group '{feature_group_name}' (version {latest_version}).")
-        except hopsworks.client.exceptions.RestAPIError:
-            # If the feature group does not exist, create a new one
+            logger.info(f"Data successfully appended to feature group '{feature_group_name}' (version {keyed_version}).")
+        else:
             new_version = latest_version + 1
-            logger.info(f"Feature group not found. Creating new feature group '{feature_group_name}' (version {new_version})...")
-            feature_group = fs.create_feature_group(
-                name=feature_group_name,
-                version=new_version,
-                description="Air Quality Index data",
-                primary_key=["date"],  # Adjust the primary key column(s) based on your data
+            logger.info(f"Creating feature group '{feature_group_name}' (version {new_version})...")
+            feature_group = session.create_feature_group(
+                feature_group_name,
+                new_version,
+                description="Air Quality Index data per location",
+                primary_key=PRIMARY_KEY,
                 time_travel_format="NONE"  # Change based on requirements (e.g., "HUDI" or "NONE")
             )
             feature_group.insert(data_df)
@@ -82,18 +126,42 @@ def upload_to_hopsworks(file_path, feature_group_name):
         raise AppException("Failed to upload data to Hopsworks.", e)
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Upload every location partition to a Hopsworks feature group.")
+    parser.add_argument("--data-dir", default=DEFAULT_PARTITION_DIR, help="directory of the location partitions")
+    parser.add_argument("--registry", default=DEFAULT_REGISTRY_PATH, help="location registry JSON")
+    parser.add_argument("--location", action="append", dest="locations", help="only upload this location (repeatable)")
+    parser.add_argument("--file", help="upload this CSV instead, tagged with --location (a single one)")
+    parser.add_argument("--full", action="store_true", help="upload whole partitions, ignoring the upload watermarks")
+    parser.add_argument("--feature-group", default="historical_aqi_data", help="target feature group")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
     try:
+        args = parse_args()
         logger.info("Starting data upload to Hopsworks...")
 
-        # File path to the AQI CSV file
-        file_path = "historical_aqi.csv"
-
-        # Feature group details
-        feature_group_name = "historical_aqi_data"
-
-        # Upload data to Hopsworks
-        upload_to_hopsworks(file_path, feature_group_name)
+        if args.file:
+            if not args.locations or len(args.locations) != 1:
+                raise AppException("--file needs exactly one --location to tag its rows with.")
+            if not os.path.exists(args.file):
+                raise AppException(f"The file '{args.file}' does not exist.")
+            data_df = pd.read_csv(args.file).assign(location=args.locations[0])
+            upload_to_hopsworks(data_df, args.feature_group)
+        else:
+            # Only rows past each location's upload watermark, unless a new version needs the full history
+            watermarks = load_upload_watermarks(args.data_dir)
+            incremental = not args.full and location_keyed_version(args.feature_group)
+            data_df = load_partitions(args.data_dir, args.registry, args.locations,
+                                      since=watermarks if incremental else None)
+            if data_df.empty:
+                logger.info("No rows past the upload watermarks; nothing to upload.")
+            else:
+                upload_to_hopsworks(data_df, args.feature_group)
+                uploaded = pd.to_datetime(data_df["date"]).groupby(data_df["location"]).max()
+                watermarks.update(uploaded.to_dict())
+                save_upload_watermarks(watermarks, args.data_dir)
         logger.info("Data upload to Hopsworks completed successfully.")
 
     except AppException as e:
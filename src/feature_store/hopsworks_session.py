@@ -0,0 +1,211 @@
+import os
+import time
+import threading
+from dotenv import load_dotenv
+from src.app.exception import AppException
+from src.app.logger import get_logger
+from src.app.metrics import span, increment
+
+logger = get_logger(__name__)
+
+# Seconds a resolved feature-group / model version stays cached before it is looked up again
+DEFAULT_VERSION_TTL = float(os.getenv("AQI_HOPSWORKS_VERSION_TTL", "300"))
+
+
+def _login_hopsworks(**options):
+    """
+    Log in to Hopsworks, preferring cached credentials and falling back to HOPSWORKS_API_KEY.
+    """
+    import hopsworks
+
+    load_dotenv()
+    api_key = options.get("api_key") or os.getenv("HOPSWORKS_API_KEY")
+    try:
+        logger.info("Attempting to log in with cached credentials...")
+        project = hopsworks.login()
+        logger.info("Successfully logged in using cached credentials.")
+        return project
+    except Exception:
+        logger.warning("Cached credentials not found. Falling back to API key login.")
+
+    if not api_key:
+        raise AppException("HOPSWORKS_API_KEY not found in the environment file!")
+    try:
+        project = hopsworks.login(api_key=api_key)
+        logger.info("Successfully logged in using API key.")
+        return project
+    except Exception as api_login_error:
+        logger.error(f"Login failed using API key: {api_login_error}")
+        raise AppException("Failed to authenticate with Hopsworks. Please check your API key or credentials.")
+
+
+def _open_local_store(**options):
+    from src.feature_store.local_backend import LocalProject, DEFAULT_LOCAL_STORE
+
+    root = options.get("root") or DEFAULT_LOCAL_STORE
+    logger.info(f"Using local feature store at '{root}'.")
+    return LocalProject(root)
+
+
+# Backend name -> factory(**options) returning a project-like object
+_BACKENDS = {
+    "hopsworks": _login_hopsworks,
+    "local": _open_local_store,
+}
+
+
+def register_backend(name, factory):
+    """
+    Make a project factory available under `name` (selected via AQI_HOPSWORKS_BACKEND or configure()).
+    """
+    _BACKENDS[name] = factory
+
+
+class HopsworksSession:
+    """
+    Process-wide Hopsworks connection with cached store/registry handles and version lookups.
+    """
+
+    def __init__(self, backend=None, version_ttl=DEFAULT_VERSION_TTL, **options):
+        self.backend = backend or os.getenv("AQI_HOPSWORKS_BACKEND", "hopsworks")
+        self.version_ttl = version_ttl
+        self.options = options
+        self._lock = threading.RLock()
+        self._project = None
+        self._feature_store = None
+        self._model_registry = None
+        self._versions = {}
+        self._feature_groups = {}
+
+    def project(self):
+        with self._lock:
+            if self._project is None:
+                if self.backend not in _BACKENDS:
+                    raise AppException(f"Unknown Hopsworks backend '{self.backend}'.")
+                with span("hopsworks_login"):
+                    self._project = _BACKENDS[self.backend](**self.options)
+                increment("hopsworks_login")
+            else:
+                increment("hopsworks_session_reuse")
+            return self._project
+
+    def feature_store(self):
+        with self._lock:
+            if self._feature_store is None:
+                self._feature_store = self.project().get_feature_store()
+            return self._feature_store
+
+    def model_registry(self):
+        with self._lock:
+            if self._model_registry is None:
+                self._model_registry = self.project().get_model_registry()
+            return self._model_registry
+
+    def _cached_version(self, key, resolve, refresh):
+        with self._lock:
+            cached = self._versions.get(key)
+            if cached is not None and not refresh and time.monotonic() - cached[1] < self.version_ttl:
+                increment("hopsworks_version_cache_hit")
+                return cached[0]
+            increment("hopsworks_version_cache_miss")
+            version = resolve()
+            self._versions[key] = (version, time.monotonic())
+            return version
+
+    def latest_feature_group_version(self, name, refresh=False):
+        """
+        Highest existing version of a feature group, or 0 if it does not exist yet.
+        """
+        def resolve():
+            return max((fg.version for fg in self.feature_store().get_feature_groups(name=name) or []), default=0)
+        return self._cached_version(("feature_group", name), resolve, refresh)
+
+    def feature_group(self, name, version=None):
+        """
+        Cached feature group handle; `version=None` means the latest version.
+        """
+        version = version or self.latest_feature_group_version(name)
+        if not version:
+            raise AppException(f"Feature group '{name}' does not exist.")
+        with self._lock:
+            handle = self._feature_groups.get((name, version))
+            if handle is None:
+                handle = self.feature_store().get_feature_group(name=name, version=version)
+                self._feature_groups[(name, version)] = handle
+            return handle
+
+    def create_feature_group(self, name, version, **kwargs):
+        with self._lock:
+            handle = self.feature_store().create_feature_group(name=name, version=version, **kwargs)
+            self._feature_groups[(name, version)] = handle
+            self._versions[("feature_group", name)] = (version, time.monotonic())
+            return handle
+
+    def latest_model_version(self, name, refresh=False):
+        """
+        Highest registered version of a model, or 0 if none exists.
+        """
+        def resolve():
+            return max((model.version for model in self.model_registry().get_models(name=name) or []), default=0)
+        return self._cached_version(("model", name), resolve, refresh)
+
+    def invalidate(self, name=None):
+        """
+        Forget cached versions and handles (for `name` only, or everything).
+        """
+        with self._lock:
+            if name is None:
+                self._versions.clear()
+                self._feature_groups.clear()
+                return
+            self._versions = {k: v for k, v in self._versions.items() if k[1] != name}
+            self._feature_groups = {k: v for k, v in self._feature_groups.items() if k[0] != name}
+
+    def close(self):
+        """
+        Drop the connection and every cached handle; the next call logs in again.
+        """
+        with self._lock:
+            self._project = None
+            self._feature_store = None
+            self._model_registry = None
+            self.invalidate()
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Return the process-wide session, creating it on first use.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = HopsworksSession()
+        return _session
+
+
+def configure(backend=None, **options):
+    """
+    Replace the process-wide session, e.g. configure("local", root="/tmp/store") for offline runs.
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = HopsworksSession(backend=backend, **options)
+        return _session
+
+
+def get_project():
+    return get_session().project()
+
+
+def get_feature_store():
+    return get_session().feature_store()
+
+
+def get_model_registry():
+    return get_session().model_registry()
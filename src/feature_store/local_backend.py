@@ -0,0 +1,159 @@
+import os
+import json
+import shutil
+import threading
+from datetime import datetime
+
+import pandas as pd
+from src.app.exception import AppException
+from src.app.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_LOCAL_STORE = os.getenv("AQI_LOCAL_STORE", ".local_hopsworks")
+
+
+class LocalFeatureGroup:
+    """
+    Feature group persisted as one CSV file per version.
+    """
+
+    def __init__(self, root, name, version, primary_key=None, description=""):
+        self.name = name
+        self.version = version
+        self.primary_key = primary_key or []
+        self.description = description
+        self.path = os.path.join(root, f"v{version}.csv")
+        self._lock = threading.Lock()
+
+    def read(self):
+        if not os.path.exists(self.path):
+            return pd.DataFrame()
+        return pd.read_csv(self.path)
+
+    def insert(self, data_df, overwrite=False, **kwargs):
+        """
+        Append (or replace) rows; like Hopsworks, rows sharing the primary key are upserted.
+        """
+        with self._lock:
+            if overwrite or not os.path.exists(self.path):
+                updated = data_df
+            else:
+                updated = pd.concat([self.read(), data_df], ignore_index=True)
+            if self.primary_key:
+                updated = updated.drop_duplicates(subset=self.primary_key, keep="last")
+            updated.to_csv(self.path, index=False)
+        logger.info(f"Inserted {len(data_df)} rows into local feature group '{self.name}' (version {self.version}).")
+
+
+class LocalFeatureStore:
+    def __init__(self, root):
+        self.root = os.path.join(root, "feature_groups")
+
+    def _group_dir(self, name):
+        return os.path.join(self.root, name)
+
+    def _load(self, name, version):
+        group_dir = self._group_dir(name)
+        meta_path = os.path.join(group_dir, f"v{version}.json")
+        if not os.path.exists(meta_path):
+            raise AppException(f"Feature group '{name}' (version {version}) does not exist in the local store.")
+        with open(meta_path) as file_obj:
+            meta = json.load(file_obj)
+        return LocalFeatureGroup(group_dir, name, version, meta.get("primary_key"), meta.get("description", ""))
+
+    def get_feature_groups(self, name):
+        group_dir = self._group_dir(name)
+        if not os.path.isdir(group_dir):
+            return []
+        versions = sorted(int(f[1:-5]) for f in os.listdir(group_dir) if f.startswith("v") and f.endswith(".json"))
+        return [self._load(name, version) for version in versions]
+
+    def get_feature_group(self, name, version=None):
+        if version is None:
+            version = max((fg.version for fg in self.get_feature_groups(name)), default=None)
+        return self._load(name, version)
+
+    def create_feature_group(self, name, version, description="", primary_key=None, **kwargs):
+        group_dir = self._group_dir(name)
+        os.makedirs(group_dir, exist_ok=True)
+        with open(os.path.join(group_dir, f"v{version}.json"), "w") as file_obj:
+            json.dump({"description": description, "primary_key": primary_key or []}, file_obj)
+        return LocalFeatureGroup(group_dir, name, version, primary_key, description)
+
+
+class LocalModel:
+    """
+    Registered model version stored as a directory of files.
+    """
+
+    def __init__(self, root, name, version, description=""):
+        self.name = name
+        self.version = version
+        self.description = description
+        self.model_dir = os.path.join(root, name, str(version))
+
+    def download(self):
+        return self.model_dir
+
+    def save(self, path):
+        os.makedirs(self.model_dir, exist_ok=True)
+        if os.path.isdir(path):
+            shutil.copytree(path, self.model_dir, dirs_exist_ok=True)
+        else:
+            shutil.copy(path, self.model_dir)
+        with open(os.path.join(self.model_dir, ".model.json"), "w") as file_obj:
+            json.dump({"description": self.description, "created_at": datetime.utcnow().isoformat()}, file_obj)
+        logger.info(f"Saved local model '{self.name}' (version {self.version}).")
+        return self
+
+
+class _LocalPythonModelApi:
+    def __init__(self, registry):
+        self._registry = registry
+
+    def create_model(self, name, description="", **kwargs):
+        version = max((model.version for model in self._registry.get_models(name)), default=0) + 1
+        return LocalModel(self._registry.root, name, version, description)
+
+
+class LocalModelRegistry:
+    def __init__(self, root):
+        self.root = os.path.join(root, "models")
+        self.python = _LocalPythonModelApi(self)
+
+    def get_models(self, name):
+        model_root = os.path.join(self.root, name)
+        if not os.path.isdir(model_root):
+            return []
+        return [
+            LocalModel(self.root, name, int(version))
+            for version in sorted(os.listdir(model_root), key=lambda v: int(v) if v.isdigit() else -1)
+            if version.isdigit() and os.path.exists(os.path.join(model_root, version, ".model.json"))
+        ]
+
+    def get_model(self, name, version=None):
+        models = {model.version: model for model in self.get_models(name)}
+        if version is None and models:
+            version = max(models)
+        if version not in models:
+            raise AppException(f"Model '{name}' (version {version}) does not exist in the local registry.")
+        return models[version]
+
+
+class LocalProject:
+    """
+    Offline stand-in for a Hopsworks project: feature groups and models on the local filesystem.
+    """
+
+    def __init__(self, root=DEFAULT_LOCAL_STORE):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._feature_store = LocalFeatureStore(root)
+        self._model_registry = LocalModelRegistry(root)
+
+    def get_feature_store(self):
+        return self._feature_store
+
+    def get_model_registry(self):
+        return self._model_registry
@@ -0,0 +1,234 @@
+import os
+import sys
+import json
+import argparse
+from datetime import datetime, timedelta
+
+import numpy as np
+from src.monitoring.running_stats import SeriesStats, load_all_stats, monthly_series_stats
+from src.data_ingestion.locations import DEFAULT_PARTITION_DIR, default_location
+from src.app.exception import AppException
+from src.app.logger import get_logger
+
+logger = get_logger(__name__)
+
+BASELINE_FILE = "drift_baseline.json"
+DEFAULT_WINDOW_DAYS = 14
+# PSI above 0.2 is the usual "significant shift" line; mean shift is in baseline standard deviations
+DEFAULT_PSI_THRESHOLD = 0.2
+DEFAULT_SHIFT_THRESHOLD = 0.5
+MIN_WINDOW_ROWS = 24
+# Equal-share bin groups the PSI is computed over
+PSI_GROUPS = 10
+# Exit status of the CLI when drift is detected (0: stable, 1: error)
+EXIT_DRIFT = 3
+
+
+def population_stability_index(expected, actual, groups=PSI_GROUPS, epsilon=1e-4):
+    """
+    PSI between two histograms over the same bins: sum((a - e) * ln(a / e)) of the bin shares.
+
+    Adjacent bins are first pooled into at most `groups` groups of roughly equal expected share
+    (the usual decile PSI), so a window of a few hundred rows is not flagged for the sampling
+    noise of thirty sparse bins.
+    """
+    expected = np.asarray(expected, dtype=np.float64)
+    actual = np.asarray(actual, dtype=np.float64)
+    if groups and len(expected) > groups and expected.sum() > 0:
+        shares = expected / expected.sum()
+        # Each bin joins the group its cumulative-share midpoint falls in
+        group = np.minimum(((np.cumsum(shares) - shares / 2) * groups).astype(np.int64), groups - 1)
+        expected = np.bincount(group, weights=expected, minlength=groups)
+        actual = np.bincount(group, weights=actual, minlength=groups)
+    # Empty bins are floored so a bin seen on one side only adds a large but finite term
+    expected = np.maximum(expected / max(expected.sum(), 1), epsilon)
+    actual = np.maximum(actual / max(actual.sum(), 1), epsilon)
+    return float(((actual - expected) * np.log(actual / expected)).sum())
+
+
+def compare(baseline, current, psi_threshold=DEFAULT_PSI_THRESHOLD, shift_threshold=DEFAULT_SHIFT_THRESHOLD,
+            min_rows=MIN_WINDOW_ROWS):
+    """
+    Per-column PSI and mean shift of `current` against `baseline` (both SeriesStats).
+
+    Columns with fewer than `min_rows` values in the window are reported but never flagged.
+    """
+    columns = {}
+    for col, reference in baseline.columns.items():
+        window = current.columns.get(col)
+        if window is None:
+            continue
+        entry = {
+            "baseline_mean": reference.mean, "baseline_std": reference.std,
+            "window_mean": window.mean, "window_rows": window.count,
+            "window_min": window.min if window.count else None, "window_max": window.max if window.count else None,
+        }
+        if window.count < min_rows or reference.count < min_rows:
+            entry.update(psi=None, mean_shift=None, drifted=False, reason="insufficient data")
+        else:
+            psi = population_stability_index(reference.histogram, window.histogram)
+            shift = (window.mean - reference.mean) / reference.std if reference.std > 0 else 0.0
+            entry.update(psi=psi, mean_shift=shift,
+                         drifted=bool(psi > psi_threshold or abs(shift) > shift_threshold))
+        columns[col] = entry
+    return {
+        "columns": columns,
+        "drifted": [col for col, entry in columns.items() if entry["drifted"]],
+        "missing_hour_rate": {"baseline": baseline.missing_hour_rate, "window": current.missing_hour_rate},
+        "thresholds": {"psi": psi_threshold, "mean_shift": shift_threshold, "min_rows": min_rows},
+    }
+
+
+def drift_baseline(data_df):
+    """
+    The drift_baseline.json payload of a training frame: SeriesStats per location and calendar month.
+    """
+    return {"locations": {location_id: {"months": {month: stats.to_dict() for month, stats in months.items()}}
+                          for location_id, months in monthly_series_stats(data_df).items()}}
+
+
+def load_baseline(path=None, model_name="XGB_Model"):
+    """
+    Training-time {location id: {month: SeriesStats}} from `path`, or from the latest registered
+    version of `model_name`.
+
+    Baselines written without a monthly breakdown load under the month None (all months); one
+    written before statistics were kept per location summarises the default location.
+    """
+    try:
+        if path is None:
+            from src.feature_store.hopsworks_session import get_session
+
+            session = get_session()
+            version = session.latest_model_version(model_name)
+            if not version:
+                raise AppException(f"No models found for name {model_name}.")
+            model_dir = session.model_registry().get_model(name=model_name, version=version).download()
+            path = os.path.join(model_dir, BASELINE_FILE)
+            if not os.path.exists(path):
+                raise AppException(f"Model {model_name} version {version} has no drift baseline.")
+        with open(path) as file_obj:
+            payload = json.load(file_obj)
+        if "locations" not in payload:
+            return {default_location().id: {None: SeriesStats.from_dict(payload)}}
+        baselines = {}
+        for location_id, entry in payload["locations"].items():
+            if "months" in entry:
+                baselines[location_id] = {month: SeriesStats.from_dict(stats)
+                                          for month, stats in entry["months"].items()}
+            else:
+                baselines[location_id] = {None: SeriesStats.from_dict(entry)}
+        return baselines
+    except AppException:
+        raise
+    except Exception as e:
+        raise AppException(f"Error occurred while loading the drift baseline: {e}", e)
+
+
+def window_months(days, now):
+    """
+    Calendar months ("01".."12") touched by the last `days` days up to `now`.
+    """
+    return sorted({(now - timedelta(days=offset)).strftime("%m") for offset in range(days)})
+
+
+def seasonal_baseline(months_stats, months):
+    """
+    A location's baseline for a window covering `months`: the merged statistics of those
+    calendar months, so seasonal swings are not reported as drift.
+    """
+    if None in months_stats:
+        return months_stats[None]
+    merged = SeriesStats()
+    for month in months:
+        if month in months_stats:
+            merged.merge(months_stats[month])
+    return merged
+
+
+def check_drift(baselines, data_dir=DEFAULT_PARTITION_DIR, days=DEFAULT_WINDOW_DAYS, location_ids=None, now=None,
+                **thresholds):
+    """
+    Compare each location's last `days` of ingested statistics against that location's baseline
+    for the same calendar months.
+
+    `baselines` is load_baseline output. Locations without a baseline are listed as skipped,
+    never compared against another location's; months the training data did not cover are
+    reported as insufficient data. Reads only the persisted running statistics, so the cost is
+    independent of history length.
+    """
+    now = now or datetime.utcnow()
+    months = window_months(days, now)
+    stats = load_all_stats(data_dir, location_ids)
+    if not stats:
+        raise AppException(f"No ingestion statistics found under '{data_dir}'.")
+    locations = {}
+    for location_id, location_stats in sorted(stats.items()):
+        if location_id in baselines:
+            reference = seasonal_baseline(baselines[location_id], months)
+            locations[location_id] = compare(reference, location_stats.window(days, now), **thresholds)
+    skipped = sorted(set(stats) - set(locations))
+    if not locations:
+        raise AppException(f"None of the locations {', '.join(skipped)} has a drift baseline.")
+    if skipped:
+        logger.warning(f"No drift baseline for locations {', '.join(skipped)}; they are not checked.")
+    return {
+        "locations": locations,
+        "drifted": {location_id: report["drifted"] for location_id, report in locations.items() if report["drifted"]},
+        "skipped_locations": skipped,
+        "thresholds": next(iter(locations.values()))["thresholds"],
+        "window_days": days,
+        "baseline_months": months,
+        "checked_at": now.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Check recent ingested data against the model's training baseline.")
+    parser.add_argument("--baseline", help=f"baseline JSON (default: {BASELINE_FILE} of the registered model)")
+    parser.add_argument("--model-name", default="XGB_Model")
+    parser.add_argument("--data-dir", default=DEFAULT_PARTITION_DIR, help="partition directory holding _stats/")
+    parser.add_argument("--days", type=int, default=DEFAULT_WINDOW_DAYS, help="window of recent days to check")
+    parser.add_argument("--location", action="append", dest="locations", help="restrict to a location (repeatable)")
+    parser.add_argument("--psi-threshold", type=float, default=DEFAULT_PSI_THRESHOLD)
+    parser.add_argument("--shift-threshold", type=float, default=DEFAULT_SHIFT_THRESHOLD,
+                        help="allowed |mean shift| in baseline standard deviations")
+    parser.add_argument("--output", help="write the drift report JSON here")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        args = parse_args()
+        baselines = load_baseline(args.baseline, args.model_name)
+        report = check_drift(baselines, args.data_dir, args.days, args.locations,
+                             psi_threshold=args.psi_threshold, shift_threshold=args.shift_threshold)
+        if args.output:
+            with open(args.output, "w") as file_obj:
+                json.dump(report, file_obj, indent=2)
+        for location_id, location_report in report["locations"].items():
+            print(f"[{location_id}]")
+            for col, entry in location_report["columns"].items():
+                psi = "n/a" if entry["psi"] is None else f"{entry['psi']:.3f}"
+                shift = "n/a" if entry["mean_shift"] is None else f"{entry['mean_shift']:+.2f}"
+                print(f"  {col:<6} PSI {psi:>6}  mean shift {shift:>6} sd  rows {entry['window_rows']:>6}"
+                      f"{'  DRIFT' if entry['drifted'] else ''}")
+            rates = location_report["missing_hour_rate"]
+            print(f"  Missing hours: {rates['window']:.1%} in the window, {rates['baseline']:.1%} at training")
+        if report["skipped_locations"]:
+            print(f"No baseline (not checked): {', '.join(report['skipped_locations'])}")
+        if report["drifted"]:
+            drifted = "; ".join(f"{location_id}: {', '.join(columns)}"
+                                for location_id, columns in report["drifted"].items())
+            logger.warning(f"Input drift detected over the last {args.days} days in {drifted}.")
+            print(f"Drift detected in {drifted}")
+            sys.exit(EXIT_DRIFT)
+        logger.info(f"No input drift over the last {args.days} days.")
+        print("No drift detected.")
+    except AppException as e:
+        logger.error(f"Application Error: {e}")
+        print(f"Application Error: {e}")
+        raise SystemExit(1)
@@ -0,0 +1,331 @@
+import os
+import json
+import glob
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from src.data_ingestion.locations import DEFAULT_PARTITION_DIR
+from src.training.feature_spec import LAGGED_COLUMNS
+from src.app.exception import AppException
+from src.app.logger import get_logger
+
+logger = get_logger(__name__)
+
+STATS_DIR = "_stats"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+DAY_FORMAT = "%Y-%m-%d"
+# Daily buckets kept per location; drift windows are merged from these
+DAILY_RETENTION_DAYS = int(os.getenv("AQI_STATS_RETENTION_DAYS", "30"))
+
+
+def histogram_edges(column):
+    """
+    Fixed bin edges per column, identical for every location and run, so histograms merge by addition.
+
+    AQI gets one bin per category; pollutant concentrations get four log-spaced bins per decade
+    from 0.01 to 1e5, plus bins for zero/negative readings and overflow.
+    """
+    if column == "aqi":
+        inner = np.arange(0.5, 6.0, 1.0)
+    else:
+        inner = np.concatenate(([0.0], np.logspace(-2, 5, 29)))
+    return np.concatenate(([-np.inf], inner, [np.inf]))
+
+
+class ColumnStats:
+    """
+    Mergeable summary of one column: count/mean/M2 (Welford, merged with Chan et al.'s parallel
+    update), min, max, missing values and a fixed-bin histogram sketch.
+    """
+
+    def __init__(self, column):
+        self.column = column
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.missing = 0
+        self.histogram = np.zeros(len(histogram_edges(column)) - 1, dtype=np.int64)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.variance))
+
+    def _combine(self, count, mean, m2):
+        # Chan et al.: exact mean and M2 of the union from the two partial summaries
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    def update(self, values):
+        """
+        Fold a batch of values in; O(len(values)).
+        """
+        values = np.asarray(values, dtype=np.float64)
+        present = values[~np.isnan(values)]
+        self.missing += len(values) - len(present)
+        if not len(present):
+            return self
+        batch_mean = float(present.mean())
+        self._combine(len(present), batch_mean, float(((present - batch_mean) ** 2).sum()))
+        self.min = min(self.min, float(present.min()))
+        self.max = max(self.max, float(present.max()))
+        self.histogram += np.histogram(present, bins=histogram_edges(self.column))[0]
+        return self
+
+    def merge(self, other):
+        if other.count:
+            self._combine(other.count, other.mean, other.m2)
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self.histogram += other.histogram
+        self.missing += other.missing
+        return self
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "missing": self.missing,
+            "histogram": self.histogram.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, column, payload):
+        stats = cls(column)
+        stats.count = payload["count"]
+        stats.mean = payload["mean"]
+        stats.m2 = payload["m2"]
+        stats.min = payload["min"] if payload["min"] is not None else np.inf
+        stats.max = payload["max"] if payload["max"] is not None else -np.inf
+        stats.missing = payload["missing"]
+        histogram = np.asarray(payload["histogram"], dtype=np.int64)
+        if len(histogram) != len(stats.histogram):
+            raise AppException(f"Histogram of '{column}' has {len(histogram)} bins; expected {len(stats.histogram)}.")
+        stats.histogram = histogram
+        return stats
+
+
+class SeriesStats:
+    """
+    ColumnStats for aqi and every pollutant of an hourly series, plus its row and missing-hour counts.
+    """
+
+    def __init__(self, columns=LAGGED_COLUMNS):
+        self.columns = {col: ColumnStats(col) for col in columns}
+        self.rows = 0
+        self.missing_hours = 0
+        self.first = None
+        self.last = None
+
+    def update(self, frame, gaps=None):
+        """
+        Fold in a batch of rows; `gaps` holds the missing hours preceding each row (default: none).
+        """
+        for col, stats in self.columns.items():
+            if col in frame.columns:
+                stats.update(frame[col].to_numpy(dtype=np.float64, na_value=np.nan))
+            else:
+                stats.missing += len(frame)
+        self.rows += len(frame)
+        self.missing_hours += int(gaps.sum()) if gaps is not None else 0
+        if len(frame):
+            dates = pd.to_datetime(frame["date"])
+            self._extend(dates.min(), dates.max())
+        return self
+
+    def _extend(self, first, last):
+        self.first = first if self.first is None else min(self.first, first)
+        self.last = last if self.last is None else max(self.last, last)
+
+    def merge(self, other):
+        for col, stats in self.columns.items():
+            if col in other.columns:
+                stats.merge(other.columns[col])
+        self.rows += other.rows
+        self.missing_hours += other.missing_hours
+        if other.rows:
+            self._extend(other.first, other.last)
+        return self
+
+    @property
+    def missing_hour_rate(self):
+        expected = self.rows + self.missing_hours
+        return self.missing_hours / expected if expected else 0.0
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "missing_hours": self.missing_hours,
+            "first": self.first.strftime(DATE_FORMAT) if self.first is not None else None,
+            "last": self.last.strftime(DATE_FORMAT) if self.last is not None else None,
+            "columns": {col: stats.to_dict() for col, stats in self.columns.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, payload):
+        stats = cls(list(payload["columns"]))
+        stats.columns = {col: ColumnStats.from_dict(col, entry) for col, entry in payload["columns"].items()}
+        stats.rows = payload["rows"]
+        stats.missing_hours = payload["missing_hours"]
+        stats.first = pd.Timestamp(payload["first"]) if payload["first"] else None
+        stats.last = pd.Timestamp(payload["last"]) if payload["last"] else None
+        return stats
+
+
+def missing_hours_before(dates, previous=None):
+    """
+    Missing hourly readings before each of the sorted `dates`, counting from `previous`.
+    """
+    hours = pd.Series(dates).diff().dt.total_seconds().to_numpy() / 3600
+    if len(hours):
+        hours[0] = (dates.iloc[0] - previous).total_seconds() / 3600 if previous is not None else 1
+    return np.clip(np.round(hours) - 1, 0, None).astype(np.int64)
+
+
+class LocationStats:
+    """
+    Running statistics of one location's ingested history: all-time totals plus daily buckets.
+
+    Each ingestion batch costs O(new rows); a drift window over the last N days merges N buckets
+    and never rereads the partition.
+    """
+
+    def __init__(self, location_id):
+        self.location_id = location_id
+        self.total = SeriesStats()
+        self.daily = {}
+
+    def update(self, frame):
+        if frame is None or frame.empty:
+            return self
+        frame = frame.assign(date=pd.to_datetime(frame["date"])).sort_values("date", kind="mergesort")
+        gaps = missing_hours_before(frame["date"].reset_index(drop=True), self.total.last)
+        days = frame["date"].dt.strftime(DAY_FORMAT).to_numpy()
+        for day in np.unique(days):
+            in_day = days == day
+            self.daily.setdefault(day, SeriesStats()).update(frame[in_day], gaps[in_day])
+        self.total.update(frame, gaps)
+        return self
+
+    def prune(self, keep_days=DAILY_RETENTION_DAYS, now=None):
+        cutoff = ((now or datetime.utcnow()) - timedelta(days=keep_days)).strftime(DAY_FORMAT)
+        self.daily = {day: stats for day, stats in self.daily.items() if day >= cutoff}
+        return self
+
+    def window(self, days, now=None):
+        """
+        Merged daily buckets of the last `days` days up to `now` (today included).
+        """
+        now = now or datetime.utcnow()
+        start = (now - timedelta(days=days - 1)).strftime(DAY_FORMAT)
+        end = now.strftime(DAY_FORMAT)
+        merged = SeriesStats()
+        for day, stats in self.daily.items():
+            if start <= day <= end:
+                merged.merge(stats)
+        return merged
+
+    def to_dict(self):
+        return {"location": self.location_id, "total": self.total.to_dict(),
+                "daily": {day: stats.to_dict() for day, stats in sorted(self.daily.items())}}
+
+    @classmethod
+    def from_dict(cls, payload):
+        stats = cls(payload["location"])
+        stats.total = SeriesStats.from_dict(payload["total"])
+        stats.daily = {day: SeriesStats.from_dict(entry) for day, entry in payload["daily"].items()}
+        return stats
+
+
+def stats_path(location_id, data_dir=DEFAULT_PARTITION_DIR):
+    return os.path.join(data_dir, STATS_DIR, f"{location_id}.json")
+
+
+def load_location_stats(location_id, data_dir=DEFAULT_PARTITION_DIR):
+    """
+    A location's persisted statistics; empty ones when none were recorded yet.
+    """
+    path = stats_path(location_id, data_dir)
+    if not os.path.exists(path):
+        return LocationStats(location_id)
+    try:
+        with open(path) as file_obj:
+            return LocationStats.from_dict(json.load(file_obj))
+    except Exception as e:
+        raise AppException(f"Error occurred while reading statistics '{path}': {e}", e)
+
+
+def save_location_stats(stats, data_dir=DEFAULT_PARTITION_DIR):
+    """
+    Write a location's statistics atomically (temp file + rename) beside its partition.
+    """
+    path = stats_path(stats.location_id, data_dir)
+    try:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".stats_", suffix=".tmp")
+        with os.fdopen(fd, "w") as file_obj:
+            json.dump(stats.to_dict(), file_obj)
+        os.replace(tmp_path, path)
+        return path
+    except Exception as e:
+        raise AppException(f"Error occurred while writing statistics '{path}': {e}", e)
+
+
+def update_location_stats(location_id, rows, data_dir=DEFAULT_PARTITION_DIR, now=None):
+    """
+    Fold newly appended rows into a location's persisted statistics; O(new rows + retained days).
+    """
+    stats = load_location_stats(location_id, data_dir).update(rows).prune(now=now)
+    save_location_stats(stats, data_dir)
+    return stats
+
+
+def load_all_stats(data_dir=DEFAULT_PARTITION_DIR, location_ids=None):
+    """
+    {location id: LocationStats} for every location with persisted statistics (or just `location_ids`).
+    """
+    if location_ids is None:
+        paths = sorted(glob.glob(os.path.join(data_dir, STATS_DIR, "*.json")))
+        location_ids = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    return {location_id: load_location_stats(location_id, data_dir) for location_id in location_ids}
+
+
+def monthly_series_stats(data_df, default_location_id=None):
+    """
+    {location id: {month ("01".."12"): SeriesStats}} of a full history frame (e.g. the training data).
+
+    A frame without a `location` column is one location's history: `default_location_id`, or
+    the registry's default location. Missing hours are counted over the whole series, so a gap
+    spanning a month boundary is attributed to the month of the row that ends it.
+    """
+    data_df = data_df.assign(date=pd.to_datetime(data_df["date"]))
+    if "location" in data_df.columns:
+        groups = data_df.groupby("location", sort=True)
+    else:
+        if default_location_id is None:
+            from src.data_ingestion.locations import default_location
+
+            default_location_id = default_location().id
+        groups = [(default_location_id, data_df)]
+    stats = {}
+    for location_id, group in groups:
+        group = group.sort_values("date", kind="mergesort").reset_index(drop=True)
+        gaps = missing_hours_before(group["date"])
+        months = group["date"].dt.strftime("%m").to_numpy()
+        stats[location_id] = {month: SeriesStats().update(group[months == month], gaps[months == month])
+                              for month in np.unique(months)}
+    return stats
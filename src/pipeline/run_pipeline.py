@@ -0,0 +1,233 @@
+import argparse
+from datetime import datetime
+
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from dotenv import load_dotenv
+from src.pipeline.stage_cache import StageCache, DEFAULT_CACHE_DIR, code_fingerprint
+from src.training.preprocess import remove_outliers, add_features, preprocess_data_with_lags
+from src.training.grouped_features import remove_outliers_grouped, add_features_grouped, sort_series
+from src.training.train_model import train_xgb, evaluate_model, register_model
+from src.training.export_model import export_model
+from src.training.feature_spec import FeatureSpec
+from src.training.feature_selection import (select_features, rank_features, load_feature_list,
+                                            IMPORTANCE_METHODS)
+from src.monitoring.running_stats import monthly_series_stats, SeriesStats, ColumnStats, histogram_edges
+from src.monitoring.drift import drift_baseline
+from src.feature_store.fetch_hopsworks_data import fetch_data_from_hopsworks
+from src.app.exception import AppException
+from src.app.logger import get_logger
+from src.app.metrics import span, increment
+
+logger = get_logger(__name__)
+
+POLLUTANT_COLUMNS = ['co', 'no', 'no2', 'o3', 'so2', 'pm2_5', 'pm10', 'nh3']
+STAGE_NAMES = ["fetch", "clean", "features", "matrix", "train", "select", "baseline", "register"]
+
+
+class Stage:
+    """
+    A pipeline step: `func(*upstream_outputs, **params)` whose output is cached under a hash of
+    the upstream output fingerprints, `params` and the source of `code`.
+    """
+
+    def __init__(self, name, func, inputs=(), params=None, code=()):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.params = params or {}
+        self.code_version = code_fingerprint(func, *code)
+
+
+class _Artifact:
+    """
+    Stage output that is only read back from the cache when a downstream stage actually runs.
+    """
+
+    def __init__(self, fingerprint, value=None, loader=None):
+        self.fingerprint = fingerprint
+        self._value = value
+        self._loader = loader
+
+    def value(self):
+        if self._value is None and self._loader is not None:
+            self._value = self._loader()
+        return self._value
+
+
+def fetch_stage(feature_group, snapshot):
+    # `snapshot` only feeds the cache key: one fetch per snapshot (default: per UTC day)
+    data_df = fetch_data_from_hopsworks()
+    if data_df is None or data_df.empty:
+        raise AppException(f"Fetched data from feature group '{feature_group}' is empty or None.")
+    return data_df
+
+
+def clean_stage(data_df, columns, factor):
+    data_df = data_df.copy()
+    data_df['date'] = pd.to_datetime(data_df['date'])
+    if 'location' in data_df.columns:
+        # Multi-location history: per-location bounds, computed for all series at once
+        return remove_outliers_grouped(sort_series(data_df), columns, factor=factor)
+    return remove_outliers(data_df, columns, factor=factor)
+
+
+def features_stage(data_df, features=None):
+    if 'location' in data_df.columns:
+        data_df = add_features_grouped(data_df.copy(), features=features)
+        return data_df.dropna().reset_index(drop=True)
+    data_df = add_features(data_df.copy(), features=features)
+    return data_df.dropna().sort_values(by='date').reset_index(drop=True)
+
+
+def matrix_stage(data_df, test_size, random_state, features=None):
+    # The global model does not use the location id as a feature
+    X, y, scaler = preprocess_data_with_lags(data_df.drop(columns=['location'], errors='ignore'), features)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+    return {"X_train": X_train, "X_test": X_test, "y_train": y_train, "y_test": y_test, "scaler": scaler}
+
+
+def train_stage(matrix):
+    model = train_xgb(matrix["X_train"], matrix["y_train"], matrix["X_test"], matrix["y_test"])
+    evaluate_model(model, matrix["X_test"], matrix["y_test"], name="XGBoost")
+    return model
+
+
+def select_stage(model, matrix, budget, method):
+    model, features, report = select_features(model, matrix["X_train"], matrix["y_train"], matrix["X_test"],
+                                              matrix["y_test"], budget=budget, method=method)
+    return {"model": model, "features": features, "report": report}
+
+
+def baseline_stage(data_df):
+    # Raw fetched values per location, the same inputs the ingestion statistics summarise
+    return drift_baseline(data_df)
+
+
+def register_stage(model, baseline, model_path, model_name):
+    metadata = None
+    if isinstance(model, dict):
+        # Output of the select stage: register the pruned model with its selection report
+        metadata = {"feature_selection": model["report"]}
+        model = model["model"]
+    registered = register_model(model, model_path=model_path, model_name=model_name, metadata=metadata,
+                                baseline=baseline)
+    return {"model_name": model_name, "version": getattr(registered, "version", None)}
+
+
+def build_stages(snapshot, model_path="xgb_model.pkl", model_name="XGB_Model", features=None,
+                 feature_budget=None, importance="gain"):
+    """
+    The daily training pipeline: fetch -> clean -> features -> matrix -> train -> [select] -> register,
+    with the drift baseline computed from the fetched data and registered alongside the model.
+
+    `features` restricts feature building and the matrix to a recorded feature list; with a
+    `feature_budget` the select stage prunes features within that relative MSE budget.
+    """
+    import sklearn
+    import xgboost
+
+    stages = [
+        Stage("fetch", fetch_stage,
+              params={"feature_group": "historical_aqi_data", "snapshot": snapshot}),
+        Stage("clean", clean_stage, inputs=["fetch"],
+              params={"columns": POLLUTANT_COLUMNS, "factor": 1.5},
+              code=[remove_outliers, remove_outliers_grouped, sort_series]),
+        Stage("features", features_stage, inputs=["clean"], params={"features": features},
+              code=[add_features, add_features_grouped, FeatureSpec]),
+        Stage("matrix", matrix_stage, inputs=["features"],
+              params={"test_size": 0.2, "random_state": 42, "features": features},
+              code=[preprocess_data_with_lags, f"scikit-learn=={sklearn.__version__}"]),
+        Stage("train", train_stage, inputs=["matrix"],
+              code=[train_xgb, evaluate_model, f"xgboost=={xgboost.__version__}"]),
+    ]
+    if feature_budget is not None:
+        stages.append(Stage("select", select_stage, inputs=["train", "matrix"],
+                            params={"budget": feature_budget, "method": importance},
+                            code=[select_features, rank_features]))
+    model_stage = stages[-1].name
+    # Training-data statistics registered with the model as the drift baseline
+    stages.append(Stage("baseline", baseline_stage, inputs=["fetch"],
+                        code=[drift_baseline, monthly_series_stats, SeriesStats, ColumnStats, histogram_edges]))
+    # Keyed by the trained model's fingerprint: an identical model is never registered twice
+    stages.append(Stage("register", register_stage, inputs=[model_stage, "baseline"],
+                        params={"model_path": model_path, "model_name": model_name},
+                        code=[register_model, export_model]))
+    return stages
+
+
+def run_pipeline(stages, cache, force=()):
+    """
+    Run `stages` in order, skipping every stage whose cache key is already stored.
+
+    Returns {stage name: "cached" | "ran"}.
+    """
+    artifacts = {}
+    status = {}
+    for stage in stages:
+        upstream = [artifacts[name] for name in stage.inputs]
+        key = cache.stage_key(stage.name, [artifact.fingerprint for artifact in upstream],
+                              stage.params, stage.code_version)
+        manifest = None if stage.name in force else cache.manifest(stage.name, key)
+
+        if manifest is not None:
+            logger.info(f"Stage '{stage.name}' is up to date ({key[:12]}); using cached artifact.")
+            increment("pipeline_cache_hit")
+            cache.touch(stage.name, key)
+            artifacts[stage.name] = _Artifact(
+                manifest["fingerprint"],
+                loader=lambda name=stage.name, key=key: cache.load(name, key),
+            )
+            status[stage.name] = "cached"
+            continue
+
+        increment("pipeline_cache_miss")
+        logger.info(f"Running stage '{stage.name}' ({key[:12]})...")
+        inputs = [artifact.value() for artifact in upstream]
+        with span(f"pipeline_{stage.name}"):
+            output = stage.func(*inputs, **stage.params)
+        manifest = cache.save(stage.name, key, output, meta={"inputs": list(stage.inputs), "params": stage.params})
+        artifacts[stage.name] = _Artifact(manifest["fingerprint"], value=output)
+        status[stage.name] = "ran"
+    return status
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the cached daily training pipeline.")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="where stage artifacts are stored")
+    parser.add_argument("--snapshot", default=datetime.utcnow().strftime("%Y-%m-%d"),
+                        help="fetch snapshot token; a new value forces a fresh fetch (default: today, UTC)")
+    parser.add_argument("--force", default="", help=f"comma-separated stages to rerun ({', '.join(STAGE_NAMES)})")
+    parser.add_argument("--until", choices=STAGE_NAMES, default="register", help="last stage to run")
+    parser.add_argument("--keep", type=int, default=3, help="cached entries kept per stage")
+    parser.add_argument("--feature-budget", type=float,
+                        help="enable the select stage: allowed relative MSE increase from pruning features")
+    parser.add_argument("--importance", choices=IMPORTANCE_METHODS, default="gain", help="feature ranking for select")
+    parser.add_argument("--features-file",
+                        help="only build and train on the features listed here (a JSON list or model metadata.json)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        load_dotenv()
+        args = parse_args()
+        features = load_feature_list(args.features_file) if args.features_file else None
+        stages = build_stages(args.snapshot, features=features, feature_budget=args.feature_budget,
+                              importance=args.importance)
+        stages = [stage for stage in stages if STAGE_NAMES.index(stage.name) <= STAGE_NAMES.index(args.until)]
+        force = {name.strip() for name in args.force.split(",") if name.strip()}
+
+        status = run_pipeline(stages, StageCache(args.cache_dir, keep=args.keep), force=force)
+
+        summary = ", ".join(f"{name}={state}" for name, state in status.items())
+        logger.info(f"Training pipeline completed: {summary}")
+        print(f"Training pipeline completed: {summary}")
+    except AppException as e:
+        logger.error(f"Application Error: {e}")
+        print(f"Application Error: {e}")
+        raise SystemExit(1)
+    except Exception as e:
+        logger.error(f"Unexpected Error: {e}")
+        print(f"Unexpected Error: {e}")
+        raise SystemExit(1)
@@ -0,0 +1,152 @@
+import os
+import io
+import json
+import pickle
+import shutil
+import hashlib
+import inspect
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+from src.app.exception import AppException
+from src.app.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_CACHE_DIR = os.getenv("AQI_PIPELINE_CACHE", ".pipeline_cache")
+
+
+def _sha256(*chunks):
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk if isinstance(chunk, bytes) else str(chunk).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def fingerprint(obj):
+    """
+    Content hash of a stage output (DataFrame, ndarray, dict/list/tuple of those, or any picklable object).
+    """
+    if isinstance(obj, pd.DataFrame):
+        row_hashes = pd.util.hash_pandas_object(obj, index=True).values
+        return _sha256(b"frame", repr(list(obj.columns)), repr([str(t) for t in obj.dtypes]), row_hashes.tobytes())
+    if isinstance(obj, pd.Series):
+        return _sha256(b"series", str(obj.name), pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+    if isinstance(obj, np.ndarray):
+        return _sha256(b"array", str(obj.dtype), repr(obj.shape), np.ascontiguousarray(obj).tobytes())
+    if isinstance(obj, dict):
+        return _sha256(b"dict", *(f"{key}={fingerprint(obj[key])};" for key in sorted(obj)))
+    if isinstance(obj, (list, tuple)):
+        return _sha256(b"seq", *(f"{fingerprint(item)};" for item in obj))
+    buffer = io.BytesIO()
+    pickle.dump(obj, buffer, protocol=4)
+    return _sha256(b"pickle", buffer.getvalue())
+
+
+def code_fingerprint(*objects):
+    """
+    Hash the source of the functions/classes a stage depends on, so editing them invalidates the stage.
+    Plain strings (e.g. "xgboost==2.0.3") are hashed as-is.
+    """
+    parts = []
+    for obj in objects:
+        if isinstance(obj, str):
+            parts.append(obj)
+            continue
+        try:
+            parts.append(inspect.getsource(obj))
+        except (OSError, TypeError):
+            parts.append(f"{getattr(obj, '__module__', '')}.{getattr(obj, '__qualname__', repr(obj))}")
+    return _sha256(*parts)
+
+
+class StageCache:
+    """
+    Local artifact store keyed by a hash of each stage's inputs, code version and parameters.
+
+    Layout: <root>/<stage>/<key>/artifact.joblib plus manifest.json describing the entry.
+    """
+
+    def __init__(self, root=DEFAULT_CACHE_DIR, keep=3):
+        self.root = root
+        self.keep = keep
+
+    def stage_key(self, stage, input_fingerprints, params, code_version):
+        return _sha256(stage, json.dumps(input_fingerprints, sort_keys=True),
+                       json.dumps(params, sort_keys=True, default=str), code_version)
+
+    def _entry_dir(self, stage, key):
+        return os.path.join(self.root, stage, key)
+
+    def manifest(self, stage, key):
+        """
+        Return the manifest of a cached entry, or None on a miss.
+        """
+        manifest_path = os.path.join(self._entry_dir(stage, key), "manifest.json")
+        if not os.path.exists(manifest_path):
+            return None
+        try:
+            with open(manifest_path) as file_obj:
+                return json.load(file_obj)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache manifest {manifest_path}: {e}")
+            return None
+
+    def touch(self, stage, key):
+        """
+        Mark an entry as recently used so pruning keeps it.
+        """
+        try:
+            os.utime(self._entry_dir(stage, key))
+        except OSError:
+            pass
+
+    def load(self, stage, key):
+        try:
+            return joblib.load(os.path.join(self._entry_dir(stage, key), "artifact.joblib"))
+        except Exception as e:
+            raise AppException(f"Failed to load cached artifact for stage '{stage}' ({key[:12]}).", e)
+
+    def save(self, stage, key, artifact, meta=None):
+        """
+        Persist a stage output and return its manifest. Writes go to a temp dir first so a crash
+        never leaves a half-written entry that looks valid.
+        """
+        try:
+            entry_dir = self._entry_dir(stage, key)
+            tmp_dir = f"{entry_dir}.tmp-{os.getpid()}"
+            os.makedirs(tmp_dir, exist_ok=True)
+            joblib.dump(artifact, os.path.join(tmp_dir, "artifact.joblib"))
+            manifest = {
+                "stage": stage,
+                "key": key,
+                "fingerprint": fingerprint(artifact),
+                "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+                **(meta or {}),
+            }
+            with open(os.path.join(tmp_dir, "manifest.json"), "w") as file_obj:
+                json.dump(manifest, file_obj, indent=2, default=str)
+            if os.path.exists(entry_dir):
+                shutil.rmtree(entry_dir)
+            os.replace(tmp_dir, entry_dir)
+            self.prune(stage)
+            return manifest
+        except Exception as e:
+            raise AppException(f"Failed to cache artifact for stage '{stage}'.", e)
+
+    def prune(self, stage):
+        """
+        Keep only the `keep` most recently written entries of a stage.
+        """
+        stage_dir = os.path.join(self.root, stage)
+        if not self.keep or not os.path.isdir(stage_dir):
+            return
+        entries = sorted(
+            (os.path.join(stage_dir, name) for name in os.listdir(stage_dir) if ".tmp-" not in name),
+            key=os.path.getmtime,
+            reverse=True,
+        )
+        for stale in entries[self.keep:]:
+            shutil.rmtree(stale, ignore_errors=True)
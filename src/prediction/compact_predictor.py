@@ -0,0 +1,87 @@
+import os
+import numpy as np
+from src.app.exception import AppException
+from src.app.logger import get_logger
+
+logger = get_logger(__name__)
+
+COMPACT_SUFFIX = ".npz"
+
+
+class CompactPredictor:
+    """
+    Evaluates an exported XGBoost tree ensemble with NumPy alone (no xgboost or sklearn import).
+
+    Every (row, tree) pair walks down one level per step for `max_depth` steps; leaves point at
+    themselves, so all walks finish together. Splits follow XGBoost: go left when the float32
+    feature value is below the threshold, and take the node's default direction when it is missing.
+    """
+
+    def __init__(self, arrays):
+        self.feature_names_in_ = np.asarray(arrays["feature_names"], dtype=object)
+        self.base_score = np.float32(arrays["base_score"])
+        self.max_depth = int(arrays["max_depth"])
+        self.roots = arrays["roots"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.feature = arrays["feature"]
+        self.value = arrays["value"].astype(np.float32)
+        self.default_left = arrays["default_left"]
+        self.n_features_in_ = len(self.feature_names_in_)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with np.load(path, allow_pickle=False) as arrays:
+                return cls({name: arrays[name] for name in arrays.files})
+        except Exception as e:
+            raise AppException(f"Error occurred while loading compact model '{path}': {e}", e)
+
+    def _matrix(self, X):
+        if hasattr(X, "columns"):
+            missing = [name for name in self.feature_names_in_ if name not in X.columns]
+            if missing:
+                raise AppException(f"Input is missing model features: {missing}")
+            X = X[list(self.feature_names_in_)].to_numpy(dtype=np.float32)
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise AppException(f"Expected {self.n_features_in_} features, got input of shape {X.shape}.")
+        return X
+
+    def predict(self, X, chunk_size=8192):
+        X = self._matrix(X)
+        predictions = np.empty(len(X), dtype=np.float32)
+        # Chunked so the (rows, trees) node matrix stays small for large batches
+        for start in range(0, len(X), chunk_size):
+            chunk = X[start:start + chunk_size]
+            rows = np.arange(len(chunk))[:, None]
+            nodes = np.broadcast_to(self.roots, (len(chunk), len(self.roots))).copy()
+            for _ in range(self.max_depth):
+                x = chunk[rows, self.feature[nodes]]
+                go_left = np.where(np.isnan(x), self.default_left[nodes], x < self.value[nodes])
+                nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+            predictions[start:start + chunk_size] = self.value[nodes].sum(axis=1, dtype=np.float32) + self.base_score
+        return predictions
+
+
+def find_model_file(model_dir):
+    """
+    Preferred model file in a downloaded model directory: the compact artifact, else the pickle.
+    """
+    files = sorted(os.listdir(model_dir))
+    for suffix in (COMPACT_SUFFIX, ".pkl"):
+        matches = [name for name in files if name.endswith(suffix)]
+        if matches:
+            return os.path.join(model_dir, matches[0])
+    raise AppException(f"No model artifact found in {model_dir}.")
+
+
+def load_model(path):
+    """
+    Load a compact `.npz` artifact as a CompactPredictor, or anything else with joblib.
+    """
+    if path.endswith(COMPACT_SUFFIX):
+        return CompactPredictor.load(path)
+    import joblib
+
+    return joblib.load(path)
@@ -0,0 +1,130 @@
+import os
+import json
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from src.prediction.compact_predictor import load_model
+from src.app.exception import AppException
+from src.app.logger import get_logger
+from src.app.metrics import span, increment
+
+logger = get_logger(__name__)
+
+INDEX_FILE = "index.json"
+DEFAULT_MAX_LOADED = int(os.getenv("AQI_MAX_LOADED_SHARDS", "32"))
+
+
+class ModelRouter:
+    """
+    Routes a location to its shard of a model set and keeps at most `max_loaded` shards in memory.
+
+    Shards are loaded on first use and evicted least-recently-used, so serving memory is bounded
+    by `max_loaded` whatever the number of shards in the set.
+    """
+
+    def __init__(self, model_dir, max_loaded=DEFAULT_MAX_LOADED, version=None):
+        try:
+            self.model_dir = model_dir
+            self.version = version
+            self.max_loaded = max(1, max_loaded)
+            with open(os.path.join(model_dir, INDEX_FILE)) as file_obj:
+                self.index = json.load(file_obj)
+            self.feature_names = self.index.get("feature_names")
+            self._loaded = OrderedDict()
+            self._lock = threading.Lock()
+
+            # Coordinates of every routed location, for nearest-location routing; entries without
+            # coordinates (model sets trained before they were required) are only routed by id
+            located = [(location_id, entry["lat"], entry["lon"])
+                       for location_id, entry in self.index["locations"].items()
+                       if entry.get("lat") is not None and entry.get("lon") is not None]
+            self._location_ids = [item[0] for item in located]
+            self._coords = np.radians(np.array([item[1:] for item in located], dtype=float).reshape(-1, 2))
+            unlocated = len(self.index["locations"]) - len(located)
+            if unlocated:
+                logger.warning(f"{unlocated} routed locations have no coordinates; they are only matched by id.")
+            logger.info(f"Model set with {len(self.index['shards'])} shards loaded from {model_dir} "
+                        f"(at most {self.max_loaded} in memory).")
+        except Exception as e:
+            raise AppException(f"Error occurred while reading the model set index in {model_dir}: {e}", e)
+
+    def nearest_location(self, lat, lon):
+        """
+        Routed location with coordinates closest to (lat, lon) by great-circle distance.
+        """
+        if not self._location_ids:
+            return None
+        lat, lon = math.radians(lat), math.radians(lon)
+        dlat = self._coords[:, 0] - lat
+        dlon = self._coords[:, 1] - lon
+        haversine = np.sin(dlat / 2) ** 2 + np.cos(lat) * np.cos(self._coords[:, 0]) * np.sin(dlon / 2) ** 2
+        return self._location_ids[int(np.argmin(haversine))]
+
+    def route(self, lat=None, lon=None, location=None):
+        """
+        Shard id for a location id, falling back to the nearest routed location's shard.
+        """
+        entry = self.index["locations"].get(location) if location else None
+        if entry is None and lat is not None and lon is not None:
+            nearest = self.nearest_location(lat, lon)
+            entry = self.index["locations"].get(nearest) if nearest else None
+        if entry is None:
+            reason = "" if self._location_ids else " (no routed location has coordinates)"
+            raise AppException(f"No shard in the model set for location={location!r}, lat={lat}, lon={lon}{reason}.")
+        return entry["shard"]
+
+    def get(self, shard_id):
+        """
+        Model of one shard, loading it (and evicting the least recently used shard) if needed.
+        """
+        with self._lock:
+            model = self._loaded.get(shard_id)
+            if model is not None:
+                self._loaded.move_to_end(shard_id)
+                increment("model_shard_hit")
+                return model
+        try:
+            with span("model_shard_load"):
+                entry = self.index["shards"][shard_id]
+                model = load_model(os.path.join(self.model_dir, entry.get("compact") or entry["file"]))
+        except Exception as e:
+            raise AppException(f"Error occurred while loading model shard '{shard_id}': {e}", e)
+        increment("model_shard_miss")
+        with self._lock:
+            self._loaded[shard_id] = model
+            self._loaded.move_to_end(shard_id)
+            while len(self._loaded) > self.max_loaded:
+                evicted, _ = self._loaded.popitem(last=False)
+                increment("model_shard_evicted")
+                logger.info(f"Evicted model shard '{evicted}'.")
+        return model
+
+    def model_for(self, lat=None, lon=None, location=None):
+        return self.get(self.route(lat, lon, location))
+
+    def loaded_shards(self):
+        with self._lock:
+            return list(self._loaded)
+
+
+def load_model_router(model_name, session=None, max_loaded=DEFAULT_MAX_LOADED):
+    """
+    Download the latest version of a registered model set and return its router.
+    """
+    try:
+        if session is None:
+            from src.feature_store.hopsworks_session import get_session
+            session = get_session()
+        version = session.latest_model_version(model_name)
+        if not version:
+            raise AppException(f"No models found for name {model_name}.")
+        with span("model_load"):
+            model_dir = session.model_registry().get_model(name=model_name, version=version).download()
+        logger.info(f"Model set {model_name} (version {version}) downloaded.")
+        return ModelRouter(model_dir, max_loaded=max_loaded, version=version)
+    except AppException:
+        raise
+    except Exception as e:
+        raise AppException(f"Error occurred while loading model set {model_name}: {e}", e)
@@ -1,12 +1,20 @@
 import os
+import json
+import argparse
+import threading
 import requests
-import hopsworks
-import joblib
 import pandas as pd
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from src.app.logger import get_logger
 from src.app.exception import AppException
+from src.app.metrics import span, timed, increment
+from src.feature_store.hopsworks_session import get_session
+from src.streaming.feature_state import serving_recent_data
+from src.prediction.model_router import load_model_router
+from src.prediction.compact_predictor import find_model_file, load_model
+from src.training.feature_spec import (FeatureSpec, POLLUTANT_COLUMNS, LAGGED_COLUMNS, SEASON_FEATURES,
+                                       INTERACTIONS)
 
 # Initialize logger
 logger = get_logger(__name__)
@@ -16,61 +24,79 @@ logger.info("Loading environment variables...")
 load_dotenv()
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
 
-# Function to check if Hopsworks login requires an API key
-def connect_to_hopsworks():
-    """
-    Connect to Hopsworks, handling both API key and keyless login.
+# Registered model set (e.g. XGB_Model_Set) to serve per-location shards instead of the global model
+MODEL_SET_NAME = os.getenv("AQI_MODEL_SET")
+MODEL_NAME = "XGB_Model"
+model_router = None
+xgb_model = None
+# "<registered name>:<version>" of the loaded model, e.g. for response ETags
+model_version = None
+_model_lock = threading.Lock()
+
+
+def load_serving_model():
     """
-    try:
-        logger.info("Attempting to log in to Hopsworks...")
-        HOPSWORKS_API_KEY = os.getenv("HOPSWORKS_API_KEY")
+    Load the registered model (or model set) on first use and keep it for the process.
 
-        # Try logging in without API key
+    Deferred from import time so importing this module, e.g. for `aqi --help` or the dashboard's
+    first render, does not open a Hopsworks session.
+    """
+    global model_router, xgb_model, model_version
+    with _model_lock:
+        if model_router is not None or xgb_model is not None:
+            return
         try:
-            project = hopsworks.login()
-            logger.info("Logged in to Hopsworks without API key.")
-        except TypeError as e:
-            if HOPSWORKS_API_KEY:
-                # Retry logging in with API key if supported
-                logger.info("Retrying Hopsworks login with API key...")
-                project = hopsworks.login(api_key=HOPSWORKS_API_KEY)
-                logger.info("Logged in to Hopsworks using API key.")
-            else:
-                logger.error("HOPSWORKS_API_KEY not found in environment variables!")
-                raise AppException("HOPSWORKS_API_KEY is required but not provided!") from e
-
-        return project
+            # Access the model registry through the shared Hopsworks session
+            session = get_session()
+            if MODEL_SET_NAME:
+                model_router = load_model_router(MODEL_SET_NAME, session=session)
+                model_version = f"{MODEL_SET_NAME}:{model_router.version}"
+                increment("model_load")
+                return
+
+            # Retrieve the model by name and version
+            latest_version = session.latest_model_version(MODEL_NAME)
+            if not latest_version:
+                logger.error(f"No models found for name {MODEL_NAME}.")
+                raise AppException(f"No models found for name {MODEL_NAME}.")
+
+            with span("model_load"):
+                registered = session.model_registry().get_model(name=MODEL_NAME, version=latest_version)
+                model_dir = registered.download()
+
+                # Find and load the model (the compact NumPy artifact when the version has one)
+                model_path = find_model_file(model_dir)
+                xgb_model = load_model(model_path)
+            model_version = f"{MODEL_NAME}:{latest_version}"
+            increment("model_load")
+            logger.info(f"Model {MODEL_NAME} (version {latest_version}) loaded successfully from {model_path}.")
+        except Exception as e:
+            logger.exception("Failed to load model from Hopsworks.")
+            raise AppException("Error in model loading process", e)
+
+
+def serving_model_version():
+    """
+    `model_version` of the model that serves (or will serve) this process, without loading it.
+
+    Before the first load this is the latest registered version, resolved through the session's
+    version cache, which is the version load_serving_model will download.
+    """
+    if model_version is not None:
+        return model_version
+    try:
+        name = MODEL_SET_NAME or MODEL_NAME
+        latest_version = get_session().latest_model_version(name)
+        if not latest_version:
+            raise AppException(f"No models found for name {name}.")
+        return f"{name}:{latest_version}"
+    except AppException:
+        raise
     except Exception as e:
-        logger.exception("Failed to log in to Hopsworks.")
-        raise AppException("Error in Hopsworks login process", e)
-
-
-# Step 1: Connect to Hopsworks and access the model registry
-try:
-    project = connect_to_hopsworks()
-    model_registry = project.get_model_registry()
-
-    # Retrieve the model by name and version
-    model_name = "XGB_Model"
-    model_metadata = model_registry.get_models(name=model_name)
-    if not model_metadata:
-        logger.error(f"No models found for name {model_name}.")
-        raise AppException(f"No models found for name {model_name}.")
-    
-    latest_version = max(model_metadata, key=lambda x: x.version).version
-    model_version = model_registry.get_model(name=model_name, version=latest_version)
-    model_dir = model_version.download()
-
-    # Find and load the model
-    model_file = [f for f in os.listdir(model_dir) if f.endswith('.pkl')][0]
-    model_path = os.path.join(model_dir, model_file)
-    xgb_model = joblib.load(model_path)
-    logger.info(f"Model {model_name} (version {latest_version}) loaded successfully.")
-except Exception as e:
-    logger.exception("Failed to load model from Hopsworks.")
-    raise AppException("Error in model loading process", e)
+        raise AppException("Error occurred while resolving the serving model version", e)
 
 
+@timed("predict_fetch")
 def get_historical_aqi(lat, lon, start_date, end_date):
     """
     Fetch historical AQI data from OpenWeather API.
@@ -99,6 +125,7 @@ def get_historical_aqi(lat, lon, start_date, end_date):
         raise AppException("Failed to fetch historical AQI data", e)
 
 
+@timed("predict_parse")
 def create_dataframe(data):
     """
     Create a DataFrame from historical AQI data.
@@ -128,109 +155,154 @@ def create_dataframe(data):
         raise AppException("Failed to create DataFrame from AQI data", e)
 
 
-def predict_next_three_days_aqi(lat, lon):
+def build_forecast_input(recent_data, feature_names, today=None):
     """
-    Predict AQI for the next three days based on historical data.
+    Build the model input for the next three days from the latest reading and its lags.
+
+    `recent_data` maps the current pollutant values, `{col}_lag_{n}` for lags 1-6 and the reading's
+    hour; precomputed `{col}_3hr_avg` / `{col}_6hr_avg` (e.g. from streamed running sums) are used
+    as-is, otherwise they are averaged from the lags. Only the columns in `feature_names` are built.
     """
-    try:
-        end_date = datetime.now().strftime("%Y-%m-%d")
-        start_date = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
+    today = today or datetime.today()
+    next_three_days = [today + timedelta(days=i) for i in range(1, 4)]
+    spec = FeatureSpec(feature_names)
+
+    columns = {
+        'month': [date.month for date in next_three_days],
+        'day': [date.day for date in next_three_days],
+        'day_of_week': [date.weekday() for date in next_three_days]
+    }
+    columns['hour'] = recent_data['hour']
+
+    for col in recent_data.keys():
+        if 'lag' in col and spec.needs(col):
+            columns[col] = recent_data[col]
+
+    columns['is_weekend'] = [1 if x >= 5 else 0 for x in columns['day_of_week']]
+
+    # Add rolling averages
+    for col in spec.rolling(3):
+        average = recent_data.get(f'{col}_3hr_avg')
+        columns[f'{col}_3hr_avg'] = average if average is not None else \
+            sum(recent_data[f'{col}_lag_{lag}'] for lag in range(1, 4)) / 3
+    for col in spec.rolling(6):
+        average = recent_data.get(f'{col}_6hr_avg')
+        columns[f'{col}_6hr_avg'] = average if average is not None else \
+            sum(recent_data[f'{col}_lag_{lag}'] for lag in range(1, 7)) / 6
+
+    def get_season(month):
+        if month in [12, 1, 2]:
+            return 'Winter'
+        elif month in [3, 4, 5]:
+            return 'Spring'
+        elif month in [6, 7, 8]:
+            return 'Summer'
+        else:
+            return 'Autumn'
+
+    if spec.needs_season():
+        seasons = [f'season_{get_season(month)}' for month in columns['month']]
+        for season in SEASON_FEATURES:
+            columns[season] = [int(name == season) for name in seasons]
+
+    for name in spec.interactions():
+        left, right = INTERACTIONS[name]
+        columns[name] = recent_data[f'{left}_lag_1'] * recent_data[f'{right}_lag_1']
+    for col in POLLUTANT_COLUMNS:
+        if spec.needs(col):
+            columns[col] = recent_data[col]
+
+    # One constructor call in model order instead of growing the frame column by column
+    input_data = pd.DataFrame({name: columns[name] for name in feature_names}, index=range(len(next_three_days)))
+    return input_data, next_three_days
+
+
+def fetch_recent_data(lat, lon, spec=None):
+    """
+    Latest complete reading with the lags `spec` needs (lags 1-6 of everything by default),
+    computed from seven days of fetched history.
+    """
+    spec = spec or FeatureSpec()
+    end_date = datetime.now().strftime("%Y-%m-%d")
+    start_date = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
 
-        historical_aqi = get_historical_aqi(lat, lon, start_date, end_date)
+    historical_aqi = get_historical_aqi(lat, lon, start_date, end_date)
 
-        if not historical_aqi:
-            logger.error("Failed to fetch historical AQI data.")
-            return None
+    if not historical_aqi:
+        logger.error("Failed to fetch historical AQI data.")
+        return None
 
-        # Create DataFrame and process data
-        pollutants_data = create_dataframe(historical_aqi)
+    # Create DataFrame and process data
+    pollutants_data = create_dataframe(historical_aqi)
+    with span("predict_lags"):
         pollutants_data['date'] = pd.to_datetime(pollutants_data['date'])
         pollutants_data.sort_values('date', inplace=True)
 
         # Generate lagged features
-        for lag in range(1, 4):
-            for col in ['aqi', 'co', 'no', 'no2', 'o3', 'so2', 'pm2_5', 'pm10', 'nh3']:
+        for col in LAGGED_COLUMNS:
+            for lag in range(1, spec.serving_lags(col) + 1):
                 pollutants_data[f'{col}_lag_{lag}'] = pollutants_data[col].shift(lag)
 
         recent_data = pollutants_data.dropna().iloc[-1]
         recent_data['hour'] = recent_data['date'].hour
+    return recent_data
+
+
+@timed("predict_total")
+def predict_next_three_days_aqi(lat, lon, location=None):
+    """
+    Predict AQI for the next three days based on historical data.
 
-        # Prepare input for the next three days
-        today = datetime.today()
-        next_three_days = [today + timedelta(days=i) for i in range(1, 4)]
-
-        input_data = pd.DataFrame({
-            'month': [date.month for date in next_three_days],
-            'day': [date.day for date in next_three_days],
-            'day_of_week': [date.weekday() for date in next_three_days]
-        })
-        input_data['hour'] = recent_data['hour']
-
-        for col in recent_data.index:
-            if 'lag' in col:
-                input_data[col] = recent_data[col]
-
-        input_data['is_weekend'] = input_data['day_of_week'].apply(lambda x: 1 if x >= 5 else 0)
-
-        # Add rolling averages
-        for col in ['co', 'no', 'no2', 'o3', 'so2', 'pm2_5', 'pm10', 'nh3']:
-            input_data[f'{col}_3hr_avg'] = (recent_data[f'{col}_lag_1'] + recent_data[f'{col}_lag_2'] + recent_data[f'{col}_lag_3']) / 3
-            input_data[f'{col}_6hr_avg'] = (
-                recent_data[f'{col}_lag_1'] + recent_data[f'{col}_lag_2'] +
-                recent_data[f'{col}_lag_3'] + recent_data.get(f'{col}_lag_4', 0) +
-                recent_data.get(f'{col}_lag_5', 0) + recent_data.get(f'{col}_lag_6', 0)
-            ) / 6
-
-
-        def get_season(month):
-            if month in [12, 1, 2]:
-                return 'Winter'
-            elif month in [3, 4, 5]:
-                return 'Spring'
-            elif month in [6, 7, 8]:
-                return 'Summer'
-            else:
-                return 'Autumn'
-
-        input_data['season'] = input_data['month'].apply(get_season)
-        season_dummies = pd.get_dummies(input_data['season'], prefix='season')
-        for season in ['season_Spring', 'season_Summer', 'season_Autumn', 'season_Winter']:
-            if season not in season_dummies.columns:
-                season_dummies[season] = 0
-        input_data = pd.concat([input_data, season_dummies], axis=1)
-        input_data.drop(columns=['season'], inplace=True)
-
-
-        input_data['co_pm2_5'] = input_data['co_lag_1'] * input_data['pm2_5_lag_1']
-        input_data['no_no2'] = input_data['no_lag_1'] * input_data['no2_lag_1']
-        input_data['o3_pm10'] = input_data['o3_lag_1'] * input_data['pm10_lag_1']
-        input_data['so2_nh3'] = input_data['so2_lag_1'] * input_data['nh3_lag_1']
-        for col in ['co', 'no', 'no2', 'o3', 'so2', 'pm2_5', 'pm10', 'nh3']:
-            input_data[col] = recent_data[col]
-
-        input_data = input_data[xgb_model.feature_names_in_]
+    Streamed feature state is used when it is fresh for the location; otherwise the recent
+    history is fetched from OpenWeather.
+    """
+    try:
+        load_serving_model()
+        model = model_router.model_for(lat, lon, location) if model_router is not None else xgb_model
+
+        recent_data = serving_recent_data(lat, lon, location)
+        if recent_data is not None:
+            increment("predict_state_hit")
+        else:
+            increment("predict_state_miss")
+            recent_data = fetch_recent_data(lat, lon, FeatureSpec.from_model(model))
+            if recent_data is None:
+                return None
+
+        with span("predict_features"):
+            input_data, next_three_days = build_forecast_input(recent_data, model.feature_names_in_)
 
         # Predict AQI
-        predicted_aqi = xgb_model.predict(input_data)
+        with span("predict_inference"):
+            predicted_aqi = model.predict(input_data)
 
         logger.info("AQI predictions generated successfully for the next three days.")
-        return pd.DataFrame({
-            'Date': [date.strftime('%Y-%m-%d') for date in next_three_days],
-            'Predicted_AQI': predicted_aqi.round()
-        }).to_dict(orient="records")
+        # Records straight from the prediction array; no intermediate DataFrame
+        return [{'Date': date.strftime('%Y-%m-%d'), 'Predicted_AQI': float(value)}
+                for date, value in zip(next_three_days, predicted_aqi.round())]
     except Exception as e:
         logger.exception("Error occurred while predicting AQI.")
         raise AppException("Failed to predict AQI", e)
 
 
-# For Testing
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Forecast the AQI for the next three days at a location.")
+    parser.add_argument("--lat", type=float, default=24.8607, help="latitude (default: Karachi)")
+    parser.add_argument("--lon", type=float, default=67.0011, help="longitude (default: Karachi)")
+    parser.add_argument("--location", help="registry location id, used to pick streamed state and model shard")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    lat, lon = 24.8607, 67.0011  # Coordinates for Karachi
     try:
-        predictions = predict_next_three_days_aqi(lat, lon)
-        if predictions:
-            logger.info("\nPredicted AQI for the next three days:")
-            for pred in predictions:
-                logger.info(f"Date: {pred['Date']}, Predicted AQI: {pred['Predicted_AQI']}")
+        args = parse_args()
+        predictions = predict_next_three_days_aqi(args.lat, args.lon, args.location)
+        if not predictions:
+            raise AppException("Failed to fetch AQI predictions!")
+        for pred in predictions:
+            logger.info(f"Date: {pred['Date']}, Predicted AQI: {pred['Predicted_AQI']}")
+        print(json.dumps(predictions, indent=2))
     except AppException as e:
         logger.error(f"Application error: {e}")
+        print(f"Application error: {e}")
+        raise SystemExit(1)
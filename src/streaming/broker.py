@@ -0,0 +1,201 @@
+import os
+import threading
+from collections import namedtuple
+from src.app.exception import AppException
+from src.app.logger import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_TOPIC = os.getenv("AQI_READINGS_TOPIC", "aqi-hourly-readings")
+
+# Broker-independent view of a consumed record
+Message = namedtuple("Message", ["topic", "partition", "offset", "key", "value"])
+
+
+class InProcessBroker:
+    """
+    Minimal in-memory stand-in for a Kafka cluster: single-partition topics with offsets.
+
+    Lets the producer, the feature-state consumer and the tests run in one process without Kafka.
+    """
+
+    def __init__(self):
+        self._topics = {}
+        self._committed = {}
+        self._condition = threading.Condition()
+
+    def append(self, topic, key, value):
+        with self._condition:
+            log = self._topics.setdefault(topic, [])
+            log.append((key, value))
+            self._condition.notify_all()
+            return len(log) - 1
+
+    def read(self, topic, offset, timeout):
+        with self._condition:
+            log = self._topics.setdefault(topic, [])
+            if offset >= len(log) and timeout:
+                self._condition.wait_for(lambda: offset < len(log), timeout=timeout)
+            if offset < len(log):
+                key, value = log[offset]
+                return Message(topic, 0, offset, key, value)
+            return None
+
+    def end_offset(self, topic):
+        with self._condition:
+            return len(self._topics.get(topic, []))
+
+    def commit(self, group_id, topic, offset):
+        with self._condition:
+            self._committed[(group_id, topic)] = offset
+
+    def committed(self, group_id, topic):
+        with self._condition:
+            return self._committed.get((group_id, topic), 0)
+
+
+_default_broker = InProcessBroker()
+
+
+def get_in_process_broker():
+    return _default_broker
+
+
+class InProcessProducer:
+    def __init__(self, broker=None):
+        self.broker = broker or _default_broker
+
+    def publish(self, topic, key, value):
+        self.broker.append(topic, key, value)
+
+    def flush(self, timeout=None):
+        return 0
+
+
+class InProcessConsumer:
+    def __init__(self, topic, group_id, broker=None):
+        self.broker = broker or _default_broker
+        self.topic = topic
+        self.group_id = group_id
+        self.position = self.broker.committed(group_id, topic)
+
+    def assign(self, offsets):
+        """
+        Start from `offsets[(topic, 0)]`, or the group's committed offset when it has none.
+        """
+        self.position = offsets.get((self.topic, 0), self.broker.committed(self.group_id, self.topic))
+
+    def poll(self, timeout=1.0):
+        message = self.broker.read(self.topic, self.position, timeout)
+        if message is not None:
+            self.position = message.offset + 1
+        return message
+
+    def commit(self, offsets=None):
+        offset = (offsets or {}).get((self.topic, 0), self.position)
+        self.broker.commit(self.group_id, self.topic, offset)
+
+    def close(self):
+        self.commit()
+
+
+class KafkaProducer:
+    """
+    confluent-kafka producer behind the same publish/flush interface.
+    """
+
+    def __init__(self, bootstrap_servers, **config):
+        from confluent_kafka import Producer
+
+        self._producer = Producer({"bootstrap.servers": bootstrap_servers, "linger.ms": 50, **config})
+
+    def publish(self, topic, key, value):
+        self._producer.produce(topic, key=key, value=value)
+        self._producer.poll(0)
+
+    def flush(self, timeout=10.0):
+        return self._producer.flush(timeout)
+
+
+class KafkaConsumer:
+    """
+    confluent-kafka consumer with manual commits, so offsets advance only with checkpoints.
+
+    Partitions are assigned explicitly (no group subscription): every partition of the topic is
+    read, each from its checkpointed offset or else the group's committed one. Partitions added
+    to the topic later are picked up on the next start.
+    """
+
+    def __init__(self, topic, group_id, bootstrap_servers, **config):
+        from confluent_kafka import Consumer
+
+        self.topic = topic
+        self._consumer = Consumer({
+            "bootstrap.servers": bootstrap_servers,
+            "group.id": group_id,
+            "enable.auto.commit": False,
+            "auto.offset.reset": "earliest",
+            **config,
+        })
+        self.assign({})
+
+    def partitions(self, timeout=10.0):
+        metadata = self._consumer.list_topics(self.topic, timeout=timeout).topics.get(self.topic)
+        if metadata is None or metadata.error is not None or not metadata.partitions:
+            error = metadata.error if metadata is not None else "unknown topic"
+            raise AppException(f"Cannot read the partitions of Kafka topic '{self.topic}': {error}")
+        return sorted(metadata.partitions)
+
+    def assign(self, offsets):
+        """
+        Assign every partition of the topic, starting at `offsets[(topic, partition)]` where given.
+        """
+        from confluent_kafka import TopicPartition, OFFSET_STORED
+
+        self._consumer.assign([
+            TopicPartition(self.topic, partition, offsets.get((self.topic, partition), OFFSET_STORED))
+            for partition in self.partitions()
+        ])
+
+    def poll(self, timeout=1.0):
+        record = self._consumer.poll(timeout)
+        if record is None:
+            return None
+        if record.error():
+            raise AppException(f"Kafka consumer error: {record.error()}")
+        key = record.key().decode("utf-8") if record.key() is not None else None
+        return Message(record.topic(), record.partition(), record.offset(), key, record.value())
+
+    def commit(self, offsets=None):
+        """
+        Commit `offsets` ({(topic, partition): next offset}), or the current positions when omitted.
+        """
+        from confluent_kafka import TopicPartition
+
+        if offsets:
+            self._consumer.commit(offsets=[TopicPartition(topic, partition, offset)
+                                           for (topic, partition), offset in offsets.items()], asynchronous=False)
+        else:
+            self._consumer.commit(asynchronous=False)
+
+    def close(self):
+        self._consumer.close()
+
+
+def create_producer(bootstrap_servers=None):
+    """
+    Kafka producer when KAFKA_BOOTSTRAP_SERVERS is set, otherwise the in-process broker.
+    """
+    bootstrap_servers = bootstrap_servers or os.getenv("KAFKA_BOOTSTRAP_SERVERS")
+    if bootstrap_servers:
+        logger.info(f"Publishing readings to Kafka at {bootstrap_servers}.")
+        return KafkaProducer(bootstrap_servers)
+    return InProcessProducer()
+
+
+def create_consumer(topic=DEFAULT_TOPIC, group_id="aqi-feature-state", bootstrap_servers=None):
+    bootstrap_servers = bootstrap_servers or os.getenv("KAFKA_BOOTSTRAP_SERVERS")
+    if bootstrap_servers:
+        logger.info(f"Consuming '{topic}' from Kafka at {bootstrap_servers}.")
+        return KafkaConsumer(topic, group_id, bootstrap_servers)
+    return InProcessConsumer(topic, group_id)
@@ -0,0 +1,102 @@
+import json
+import time
+import argparse
+from src.app.exception import AppException
+from src.app.logger import get_logger
+from src.app.metrics import increment
+from src.streaming.broker import DEFAULT_TOPIC, create_consumer
+from src.streaming.feature_state import FeatureStateStore, DEFAULT_CHECKPOINT
+
+logger = get_logger(__name__)
+
+
+class FeatureStateConsumer:
+    """
+    Folds hourly readings from the topic into per-location feature state.
+
+    State and the next offset of every partition are checkpointed together every `checkpoint_every` messages (and
+    on `checkpoint_interval` seconds of inactivity), and the broker offset is committed only after
+    the checkpoint is on disk, so a restart resumes every partition from exactly its checkpointed offset.
+    """
+
+    def __init__(self, consumer=None, store=None, checkpoint_path=DEFAULT_CHECKPOINT, checkpoint_every=500,
+                 checkpoint_interval=30.0, topic=DEFAULT_TOPIC):
+        self.checkpoint_path = checkpoint_path
+        self.store = store or FeatureStateStore.restore(checkpoint_path)
+        self.consumer = consumer or create_consumer(topic)
+        self.consumer.assign(self.store.offsets)
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_interval = checkpoint_interval
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+
+    def handle(self, message):
+        try:
+            reading = json.loads(message.value)
+            applied = self.store.apply(reading, topic=message.topic, partition=message.partition,
+                                       offset=message.offset)
+            increment("stream_readings_applied" if applied else "stream_readings_skipped")
+            self._since_checkpoint += 1
+        except AppException:
+            raise
+        except Exception as e:
+            # A malformed message must not stall the partition; skip it and move the offset on
+            increment("stream_readings_invalid")
+            self.store.advance(message.topic, message.partition, message.offset)
+            logger.warning(f"Skipping malformed reading at partition {message.partition}, offset {message.offset}: {e}")
+
+    def checkpoint(self):
+        self.store.checkpoint(self.checkpoint_path)
+        self.consumer.commit(dict(self.store.offsets))
+        self._since_checkpoint = 0
+        self._last_checkpoint = time.monotonic()
+
+    def run(self, max_messages=None, idle_timeout=None, poll_timeout=1.0):
+        """
+        Consume until `max_messages` are handled or nothing arrives for `idle_timeout` seconds.
+        """
+        handled = 0
+        idle_since = time.monotonic()
+        try:
+            while max_messages is None or handled < max_messages:
+                message = self.consumer.poll(poll_timeout)
+                now = time.monotonic()
+                if message is None:
+                    if self._since_checkpoint and now - self._last_checkpoint >= self.checkpoint_interval:
+                        self.checkpoint()
+                    if idle_timeout is not None and now - idle_since >= idle_timeout:
+                        break
+                    continue
+                idle_since = now
+                self.handle(message)
+                handled += 1
+                if self._since_checkpoint >= self.checkpoint_every:
+                    self.checkpoint()
+            return handled
+        finally:
+            if self._since_checkpoint:
+                self.checkpoint()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain streamed AQI feature state from the readings topic.")
+    parser.add_argument("--topic", default=DEFAULT_TOPIC)
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="feature state checkpoint file")
+    parser.add_argument("--checkpoint-every", type=int, default=500, help="messages between checkpoints")
+    parser.add_argument("--max-messages", type=int, help="stop after this many messages")
+    parser.add_argument("--idle-timeout", type=float, help="stop after this many idle seconds")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        args = parse_args()
+        consumer = FeatureStateConsumer(checkpoint_path=args.checkpoint, checkpoint_every=args.checkpoint_every,
+                                        topic=args.topic)
+        handled = consumer.run(max_messages=args.max_messages, idle_timeout=args.idle_timeout)
+        logger.info(f"Consumed {handled} readings; state for {len(consumer.store.states)} locations.")
+    except AppException as e:
+        logger.error(f"Application-level exception encountered: {e}")
+        raise SystemExit(1)
+    except KeyboardInterrupt:
+        logger.info("Feature state consumer stopped.")
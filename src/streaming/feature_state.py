@@ -0,0 +1,320 @@
+import os
+import json
+import math
+import tempfile
+import threading
+from datetime import datetime, timedelta
+import numpy as np
+from src.app.exception import AppException
+from src.app.logger import get_logger
+from src.streaming.broker import DEFAULT_TOPIC
+
+logger = get_logger(__name__)
+
+# Columns lagged by the prediction path, in feature order
+STATE_COLUMNS = ['aqi', 'co', 'no', 'no2', 'o3', 'so2', 'pm2_5', 'pm10', 'nh3']
+AVERAGED_COLUMNS = STATE_COLUMNS[1:]
+MAX_LAG = 6
+SHORT_WINDOW = 3
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+DEFAULT_CHECKPOINT = os.getenv("AQI_FEATURE_STATE", os.path.join("data", "feature_state.json"))
+DEFAULT_MAX_AGE = timedelta(hours=float(os.getenv("AQI_FEATURE_STATE_MAX_AGE_HOURS", "2")))
+
+
+class LocationFeatureState:
+    """
+    Ring buffer of the current reading and its six hourly lags for one location.
+
+    Running sums over lags 1-3 and 1-6 are updated in O(1) per reading: the value leaving
+    each window is subtracted and the one entering it added. Missing hours are stored as NaN
+    and counted separately, so a gap never poisons the sums once it has left the window.
+    """
+
+    def __init__(self, location, lat=None, lon=None):
+        self.location = location
+        self.lat = lat
+        self.lon = lon
+        self.buffer = np.full((MAX_LAG + 1, len(STATE_COLUMNS)), np.nan)
+        self.head = -1
+        self.last_date = None
+        self.updates = 0
+        self._reset_sums()
+
+    def _reset_sums(self):
+        width = len(STATE_COLUMNS)
+        self.sum_short = np.zeros(width)
+        self.sum_long = np.zeros(width)
+        # An empty buffer has every lag missing
+        self.missing_short = np.full(width, SHORT_WINDOW, dtype=np.int64)
+        self.missing_long = np.full(width, MAX_LAG, dtype=np.int64)
+
+    def _row(self, lag):
+        """
+        Buffer row holding the reading `lag` hours before the current one.
+        """
+        return self.buffer[(self.head - lag) % (MAX_LAG + 1)]
+
+    def _slide(self, values):
+        """
+        Advance the buffer one hour; O(1) in the window length.
+        """
+        current = self._row(0)
+        leaving_short = self._row(SHORT_WINDOW)
+        leaving_long = self._row(MAX_LAG)
+        # The current reading becomes lag 1 of both windows
+        self.sum_short += np.nan_to_num(current) - np.nan_to_num(leaving_short)
+        self.sum_long += np.nan_to_num(current) - np.nan_to_num(leaving_long)
+        self.missing_short += np.isnan(current).astype(np.int64) - np.isnan(leaving_short)
+        self.missing_long += np.isnan(current).astype(np.int64) - np.isnan(leaving_long)
+        self.head = (self.head + 1) % (MAX_LAG + 1)
+        self.buffer[self.head] = values
+
+    def update(self, date, values):
+        """
+        Apply one hourly reading. Returns False for duplicates and out-of-order readings.
+        """
+        values = np.asarray(values, dtype=float)
+        if self.last_date is None:
+            self.head = 0
+            self.buffer[0] = values
+        else:
+            gap = int((date - self.last_date) / timedelta(hours=1))
+            if gap <= 0:
+                return False
+            if gap > MAX_LAG:
+                # Nothing in the window survives a long gap
+                self.buffer[:] = np.nan
+                self._reset_sums()
+                self.head = 0
+                self.buffer[0] = values
+            else:
+                for _ in range(gap - 1):
+                    self._slide(np.full(len(STATE_COLUMNS), np.nan))
+                self._slide(values)
+        self.last_date = date
+        self.updates += 1
+        return True
+
+    def resync(self):
+        """
+        Recompute the running sums from the buffer, dropping accumulated rounding error.
+        """
+        lags_short = np.stack([self._row(lag) for lag in range(1, SHORT_WINDOW + 1)])
+        lags_long = np.stack([self._row(lag) for lag in range(1, MAX_LAG + 1)])
+        self.sum_short = np.nansum(lags_short, axis=0)
+        self.sum_long = np.nansum(lags_long, axis=0)
+        self.missing_short = np.isnan(lags_short).sum(axis=0)
+        self.missing_long = np.isnan(lags_long).sum(axis=0)
+
+    def is_ready(self):
+        """
+        True once the current reading and all six lags are present, as the fetch path requires.
+        """
+        return self.last_date is not None and not self.missing_long.any() and \
+            not np.isnan(self._row(0)).any()
+
+    def recent_data(self):
+        """
+        Latest reading with its lags and window averages, keyed like the fetch path's recent row.
+        """
+        recent = {'date': self.last_date, 'hour': self.last_date.hour}
+        current = self._row(0)
+        for i, col in enumerate(STATE_COLUMNS):
+            recent[col] = current[i]
+        for lag in range(1, MAX_LAG + 1):
+            row = self._row(lag)
+            for i, col in enumerate(STATE_COLUMNS):
+                recent[f'{col}_lag_{lag}'] = row[i]
+        for i, col in enumerate(STATE_COLUMNS):
+            if col not in AVERAGED_COLUMNS:
+                continue
+            recent[f'{col}_3hr_avg'] = self.sum_short[i] / SHORT_WINDOW if not self.missing_short[i] else np.nan
+            recent[f'{col}_6hr_avg'] = self.sum_long[i] / MAX_LAG if not self.missing_long[i] else np.nan
+        return recent
+
+    def to_dict(self):
+        ordered = [self._row(lag) for lag in range(MAX_LAG + 1)] if self.last_date is not None else []
+        return {
+            "location": self.location,
+            "lat": self.lat,
+            "lon": self.lon,
+            "last_date": self.last_date.strftime(DATE_FORMAT) if self.last_date is not None else None,
+            "updates": self.updates,
+            # Newest first; NaN is written as null to keep the checkpoint valid JSON
+            "readings": [[None if math.isnan(v) else v for v in row] for row in ordered],
+        }
+
+    @classmethod
+    def from_dict(cls, payload):
+        state = cls(payload["location"], payload.get("lat"), payload.get("lon"))
+        state.updates = payload.get("updates", 0)
+        if payload.get("last_date"):
+            state.last_date = datetime.strptime(payload["last_date"], DATE_FORMAT)
+            readings = np.array([[np.nan if v is None else v for v in row] for row in payload["readings"]],
+                                dtype=float)
+            state.head = 0
+            for lag, row in enumerate(readings):
+                state.buffer[(-lag) % (MAX_LAG + 1)] = row
+            state.resync()
+        return state
+
+
+class FeatureStateStore:
+    """
+    Per-location feature state plus the consumer offsets it reflects, checkpointed atomically.
+
+    `offsets` maps (topic, partition) to the next offset to consume on that partition.
+    """
+
+    def __init__(self):
+        self.states = {}
+        self.offsets = {}
+        self._lock = threading.Lock()
+
+    def apply(self, reading, topic=DEFAULT_TOPIC, partition=0, offset=None):
+        """
+        Update the state of the reading's location. `reading` is a decoded topic message read
+        from `offset` of (`topic`, `partition`).
+        """
+        try:
+            with self._lock:
+                location = reading["location"]
+                state = self.states.get(location)
+                if state is None:
+                    state = self.states[location] = LocationFeatureState(location, reading.get("lat"),
+                                                                         reading.get("lon"))
+                date = datetime.strptime(reading["date"], DATE_FORMAT)
+                values = [np.nan if reading.get(col) is None else reading[col] for col in STATE_COLUMNS]
+                applied = state.update(date, values)
+                if offset is not None:
+                    self.offsets[(topic, partition)] = offset + 1
+                return applied
+        except Exception as e:
+            raise AppException(f"Error occurred while applying reading to feature state: {e}", e)
+
+    def advance(self, topic, partition, offset):
+        """
+        Move past `offset` of (`topic`, `partition`) without applying it (e.g. a malformed message).
+        """
+        with self._lock:
+            self.offsets[(topic, partition)] = offset + 1
+
+    def get(self, location):
+        with self._lock:
+            return self.states.get(location)
+
+    def nearest(self, lat, lon, tolerance=0.05):
+        """
+        State of the location closest to (lat, lon), if one lies within `tolerance` degrees.
+        """
+        with self._lock:
+            best, best_distance = None, tolerance
+            for state in self.states.values():
+                if state.lat is None or state.lon is None:
+                    continue
+                distance = max(abs(state.lat - lat), abs(state.lon - lon))
+                if distance <= best_distance:
+                    best, best_distance = state, distance
+            return best
+
+    def checkpoint(self, path=DEFAULT_CHECKPOINT):
+        """
+        Write state and offsets to `path` atomically (temp file + rename).
+        """
+        try:
+            with self._lock:
+                payload = {
+                    "offsets": [{"topic": topic, "partition": partition, "offset": offset}
+                                for (topic, partition), offset in sorted(self.offsets.items())],
+                    "written_at": datetime.utcnow().strftime(DATE_FORMAT),
+                    "locations": [state.to_dict() for state in self.states.values()],
+                }
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".feature_state_", suffix=".tmp")
+            with os.fdopen(fd, "w") as file_obj:
+                json.dump(payload, file_obj)
+            os.replace(tmp_path, path)
+            logger.info(f"Checkpointed feature state for {len(payload['locations'])} locations "
+                        f"at {len(payload['offsets'])} partition offsets to {path}.")
+        except Exception as e:
+            raise AppException(f"Error occurred while checkpointing feature state: {e}", e)
+
+    @classmethod
+    def restore(cls, path=DEFAULT_CHECKPOINT):
+        """
+        Load a checkpoint; an empty store when none exists yet.
+
+        A checkpoint with a single `offset` (written before offsets were kept per partition) is
+        read as partition 0 of the default topic.
+        """
+        try:
+            store = cls()
+            if not os.path.exists(path):
+                return store
+            with open(path) as file_obj:
+                payload = json.load(file_obj)
+            for entry in payload.get("offsets", []):
+                store.offsets[(entry["topic"], entry["partition"])] = entry["offset"]
+            if "offset" in payload:
+                store.offsets[(DEFAULT_TOPIC, 0)] = payload["offset"]
+            for item in payload.get("locations", []):
+                state = LocationFeatureState.from_dict(item)
+                store.states[state.location] = state
+            logger.info(f"Restored feature state for {len(store.states)} locations at offsets {store.offsets}.")
+            return store
+        except Exception as e:
+            raise AppException(f"Error occurred while restoring feature state: {e}", e)
+
+
+_serving_store = None
+_serving_mtime = None
+_live_store = None
+_serving_lock = threading.Lock()
+
+
+def serving_store(path=DEFAULT_CHECKPOINT):
+    """
+    Checkpointed store for the prediction path, reloaded only when the checkpoint file changes.
+    """
+    global _serving_store, _serving_mtime
+    with _serving_lock:
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        if _serving_store is None or mtime != _serving_mtime:
+            _serving_store = FeatureStateStore.restore(path)
+            _serving_mtime = mtime
+        return _serving_store
+
+
+def set_serving_store(store):
+    """
+    Serve a live in-process store (e.g. one fed by a consumer thread) instead of the checkpoint.
+    """
+    global _live_store
+    with _serving_lock:
+        _live_store = store
+
+
+def serving_recent_data(lat, lon, location=None, now=None, max_age=DEFAULT_MAX_AGE, path=DEFAULT_CHECKPOINT):
+    """
+    Recent feature row for a location from streamed state, or None when missing, incomplete or stale.
+    """
+    try:
+        store = _live_store or serving_store(path)
+        if store is None:
+            return None
+        state = store.get(location) if location else store.nearest(lat, lon)
+        if state is None or not state.is_ready():
+            return None
+        now = now or datetime.utcnow()
+        if now - state.last_date > max_age:
+            logger.info(f"Feature state for {state.location} is stale (last reading {state.last_date}).")
+            return None
+        return state.recent_data()
+    except Exception as e:
+        logger.warning(f"Feature state unavailable, falling back to fetching history: {e}")
+        return None
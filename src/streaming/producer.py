@@ -0,0 +1,51 @@
+import json
+import pandas as pd
+from src.app.exception import AppException
+from src.app.logger import get_logger
+from src.app.metrics import increment
+from src.streaming.broker import DEFAULT_TOPIC, create_producer
+from src.streaming.feature_state import STATE_COLUMNS, DATE_FORMAT
+
+logger = get_logger(__name__)
+
+
+def encode_reading(location, row):
+    """
+    Serialize one hourly reading as the JSON message value published to the readings topic.
+    """
+    message = {
+        "location": location.id,
+        "lat": location.lat,
+        "lon": location.lon,
+        "date": pd.Timestamp(row["date"]).strftime(DATE_FORMAT),
+    }
+    for col in STATE_COLUMNS:
+        value = row.get(col)
+        message[col] = None if pd.isna(value) else float(value)
+    return json.dumps(message).encode("utf-8")
+
+
+class ReadingPublisher:
+    """
+    Publishes newly ingested hourly readings, keyed by location so each location stays ordered.
+    """
+
+    def __init__(self, producer=None, topic=DEFAULT_TOPIC):
+        self.producer = producer or create_producer()
+        self.topic = topic
+
+    def __call__(self, location, readings):
+        try:
+            readings = readings.sort_values("date")
+            for row in readings.to_dict(orient="records"):
+                self.producer.publish(self.topic, location.id, encode_reading(location, row))
+            increment("stream_readings_published", len(readings))
+            return len(readings)
+        except Exception as e:
+            raise AppException(f"Error occurred while publishing readings for '{location.id}': {e}", e)
+
+    def flush(self):
+        remaining = self.producer.flush()
+        if remaining:
+            logger.warning(f"{remaining} readings were still queued after flushing the producer.")
+        return remaining
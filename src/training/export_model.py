@@ -0,0 +1,150 @@
+import os
+import re
+import json
+import argparse
+
+import numpy as np
+from src.app.exception import AppException
+from src.app.logger import get_logger
+
+logger = get_logger(__name__)
+
+COMPACT_FORMAT_VERSION = 1
+# Objectives whose prediction is the raw margin (identity link)
+IDENTITY_OBJECTIVES = {"reg:squarederror", "reg:absoluteerror", "reg:pseudohubererror", "reg:quantileerror"}
+
+
+def _parse_base_score(value):
+    # Stored as a string, either "0.5" or a bracketed vector such as "[5E-1]"
+    numbers = re.findall(r"[-+]?\d*\.?\d+(?:[eE][-+]?\d+)?", str(value))
+    if len(numbers) != 1:
+        raise AppException(f"Unsupported base_score '{value}': only single-target models can be exported.")
+    return float(numbers[0])
+
+
+def _booster_of(model):
+    return model.get_booster() if hasattr(model, "get_booster") else model
+
+
+def flatten_booster(model, feature_names=None):
+    """
+    Flatten an XGBoost model into one array-of-nodes layout covering all of its trees.
+
+    Child indices are global (offset into the concatenated node arrays) and leaves point at
+    themselves, so evaluation can step every (row, tree) pair a fixed number of times.
+    """
+    try:
+        booster = _booster_of(model)
+        learner = json.loads(booster.save_raw("json"))["learner"]
+        objective = learner["objective"]["name"]
+        if objective not in IDENTITY_OBJECTIVES:
+            raise AppException(f"Objective '{objective}' is not supported by the compact predictor.")
+        gradient_booster = learner["gradient_booster"]
+        if gradient_booster["name"] != "gbtree":
+            raise AppException(f"Booster '{gradient_booster['name']}' is not supported by the compact predictor.")
+
+        trees = gradient_booster["model"]["trees"]
+        # Honour early stopping the way XGBRegressor.predict does
+        best_iteration = learner.get("attributes", {}).get("best_iteration")
+        if best_iteration is not None:
+            indptr = gradient_booster["model"]["iteration_indptr"]
+            trees = trees[:indptr[int(best_iteration) + 1]]
+
+        left, right, feature, threshold, default_left, roots = [], [], [], [], [], []
+        depth = 0
+        offset = 0
+        for tree in trees:
+            if any(int(kind) != 0 for kind in tree.get("split_type", [])):
+                raise AppException("Categorical splits are not supported by the compact predictor.")
+            tree_left = np.asarray(tree["left_children"], dtype=np.int64)
+            tree_right = np.asarray(tree["right_children"], dtype=np.int64)
+            nodes = np.arange(len(tree_left))
+            is_leaf = tree_left == -1
+            left.append(np.where(is_leaf, nodes, tree_left) + offset)
+            right.append(np.where(is_leaf, nodes, tree_right) + offset)
+            feature.append(np.where(is_leaf, 0, np.asarray(tree["split_indices"], dtype=np.int64)))
+            threshold.append(np.asarray(tree["split_conditions"], dtype=np.float32))
+            default_left.append(np.asarray(tree["default_left"], dtype=bool))
+            roots.append(offset)
+            depth = max(depth, _tree_depth(tree_left, tree_right))
+            offset += len(tree_left)
+
+        if feature_names is None:
+            feature_names = getattr(model, "feature_names_in_", None)
+        if feature_names is None:
+            feature_names = learner.get("feature_names") or booster.feature_names
+        if feature_names is None or len(feature_names) == 0:
+            raise AppException("The model does not record its feature names.")
+
+        return {
+            "format_version": np.int64(COMPACT_FORMAT_VERSION),
+            "feature_names": np.asarray(list(feature_names), dtype=str),
+            "base_score": np.float32(_parse_base_score(learner["learner_model_param"]["base_score"])),
+            "max_depth": np.int64(depth),
+            "roots": np.asarray(roots, dtype=np.int64),
+            "left": np.concatenate(left) if left else np.zeros(0, dtype=np.int64),
+            "right": np.concatenate(right) if right else np.zeros(0, dtype=np.int64),
+            "feature": np.concatenate(feature) if feature else np.zeros(0, dtype=np.int64),
+            # For leaves split_conditions holds the leaf value
+            "value": np.concatenate(threshold) if threshold else np.zeros(0, dtype=np.float32),
+            "default_left": np.concatenate(default_left) if default_left else np.zeros(0, dtype=bool),
+        }
+    except AppException:
+        raise
+    except Exception as e:
+        raise AppException(f"Error occurred while flattening the XGBoost model: {e}", e)
+
+
+def _tree_depth(left, right):
+    depth = np.zeros(len(left), dtype=np.int64)
+    # Children always have larger ids than their parent in XGBoost's node numbering
+    for node in range(len(left)):
+        if left[node] != -1:
+            depth[left[node]] = depth[right[node]] = depth[node] + 1
+    return int(depth.max(initial=0))
+
+
+def export_model(model, output_path, native=True):
+    """
+    Write the compact `.npz` predictor artifact and, if `native`, XGBoost's own `.ubj` model beside it.
+
+    Returns the list of written files.
+    """
+    try:
+        base, _ = os.path.splitext(output_path)
+        directory = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(directory, exist_ok=True)
+        np.savez_compressed(f"{base}.npz", **flatten_booster(model))
+        written = [f"{base}.npz"]
+        if native:
+            _booster_of(model).save_model(f"{base}.ubj")
+            written.append(f"{base}.ubj")
+        logger.info(f"Exported compact model artifacts: {', '.join(written)}")
+        return written
+    except AppException:
+        raise
+    except Exception as e:
+        raise AppException(f"Error occurred while exporting the model: {e}", e)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Export a pickled XGBoost model to the compact serving format.")
+    parser.add_argument("model_path", help="joblib-pickled model (e.g. xgb_model.pkl)")
+    parser.add_argument("--output", help="artifact base path (default: next to the pickle)")
+    parser.add_argument("--no-native", action="store_true", help="skip the native .ubj model")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        import joblib
+
+        args = parse_args()
+        model = joblib.load(args.model_path)
+        files = export_model(model, args.output or args.model_path, native=not args.no_native)
+        for path in [args.model_path] + files:
+            print(f"{path}: {os.path.getsize(path) / 1024:.1f} KiB")
+    except AppException as e:
+        logger.error(f"Application Error: {e}")
+        print(f"Application Error: {e}")
+        raise SystemExit(1)
@@ -0,0 +1,150 @@
+import json
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+from xgboost import DMatrix, XGBRegressor
+from sklearn.metrics import mean_squared_error
+from src.app.exception import AppException
+from src.app.logger import get_logger
+from src.app.metrics import timed
+
+logger = get_logger(__name__)
+
+IMPORTANCE_METHODS = ["gain", "shap"]
+DEFAULT_BUDGET = 0.02
+DEFAULT_SIZES = (40, 30, 20, 15, 10, 8, 6)
+
+
+def rank_features(model, X, method="gain", sample_size=5000, random_state=42):
+    """
+    Rank features by importance, most important first.
+
+    `shap` is the mean |SHAP value| from the booster's exact TreeSHAP (pred_contribs) on a row
+    sample; `gain` is XGBoost's total split gain. Unused features rank last with importance 0.
+    """
+    try:
+        booster = model.get_booster()
+        if method == "shap":
+            sample = X.sample(n=min(sample_size, len(X)), random_state=random_state) if len(X) > sample_size else X
+            contributions = booster.predict(DMatrix(sample), pred_contribs=True)
+            # The last column is the bias term
+            importance = pd.Series(np.abs(contributions[:, :-1]).mean(axis=0), index=X.columns)
+        elif method == "gain":
+            scores = booster.get_score(importance_type="total_gain")
+            importance = pd.Series([scores.get(col, 0.0) for col in X.columns], index=X.columns)
+        else:
+            raise AppException(f"Unknown importance method '{method}' (expected one of {IMPORTANCE_METHODS}).")
+        return importance.sort_values(ascending=False, kind="mergesort")
+    except AppException:
+        raise
+    except Exception as e:
+        raise AppException(f"Error occurred while ranking features: {e}", e)
+
+
+def _fit(params, X_train, y_train, X_test, y_test):
+    started = time.perf_counter()
+    model = XGBRegressor(**params).fit(X_train, y_train)
+    seconds = time.perf_counter() - started
+    mse = float(mean_squared_error(y_test, model.predict(X_test)))
+    return model, mse, seconds
+
+
+@timed("feature_selection")
+def select_features(model, X_train, y_train, X_test, y_test, budget=DEFAULT_BUDGET, sizes=DEFAULT_SIZES,
+                    method="gain"):
+    """
+    Retrain `model`'s configuration on the top-k ranked features for each k in `sizes` and keep
+    the smallest subset whose test MSE is within `budget` (relative) of the full model.
+
+    Returns (model, selected feature names, report). The full model is returned unchanged when no
+    subset fits the budget.
+    """
+    try:
+        params = model.get_params()
+        baseline_mse = float(mean_squared_error(y_test, model.predict(X_test)))
+        limit = baseline_mse * (1 + budget)
+        ranking = rank_features(model, X_train, method)
+        _, _, baseline_seconds = _fit(params, X_train, y_train, X_test, y_test)
+
+        report = {
+            "method": method,
+            "budget": budget,
+            "baseline": {"features": X_train.shape[1], "mse": baseline_mse, "fit_seconds": baseline_seconds},
+            "ranking": {name: float(value) for name, value in ranking.items()},
+            "candidates": [],
+        }
+        best_model, best_features = model, list(X_train.columns)
+        # Test MSE is not monotonic in the subset size, so every size is tried
+        for size in sorted({k for k in sizes if 0 < k < X_train.shape[1]}, reverse=True):
+            features = list(ranking.index[:size])
+            candidate, mse, seconds = _fit(params, X_train[features], y_train, X_test[features], y_test)
+            within = mse <= limit
+            report["candidates"].append({"features": size, "mse": mse, "fit_seconds": seconds,
+                                         "within_budget": within})
+            logger.info(f"Top {size} features: MSE {mse:.4f} (baseline {baseline_mse:.4f}), fit {seconds:.2f}s")
+            if within:
+                best_model, best_features = candidate, features
+
+        report["selected"] = best_features
+        logger.info(f"Selected {len(best_features)} of {X_train.shape[1]} features within a {budget:.1%} MSE budget.")
+        return best_model, best_features, report
+    except AppException:
+        raise
+    except Exception as e:
+        raise AppException(f"Error occurred while selecting features: {e}", e)
+
+
+def load_feature_list(path):
+    """
+    Feature list from a JSON file: a plain list, or a selection report / model metadata with `selected`.
+    """
+    try:
+        with open(path) as file_obj:
+            payload = json.load(file_obj)
+        if isinstance(payload, dict):
+            payload = payload.get("feature_selection", payload).get("selected")
+        if not payload:
+            raise AppException(f"No feature list found in '{path}'.")
+        return [str(name) for name in payload]
+    except AppException:
+        raise
+    except Exception as e:
+        raise AppException(f"Error occurred while reading the feature list '{path}': {e}", e)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rank features of the registered training data and prune them.")
+    parser.add_argument("--method", choices=IMPORTANCE_METHODS, default="gain")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="allowed relative MSE increase")
+    parser.add_argument("--sizes", default=",".join(str(k) for k in DEFAULT_SIZES), help="subset sizes to try")
+    parser.add_argument("--output", help="write the selection report JSON here")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        from dotenv import load_dotenv
+        from sklearn.model_selection import train_test_split
+        from src.feature_store.fetch_hopsworks_data import fetch_data_from_hopsworks
+        from src.pipeline.run_pipeline import POLLUTANT_COLUMNS, clean_stage, features_stage
+        from src.training.preprocess import preprocess_data_with_lags
+        from src.training.train_model import train_xgb
+
+        load_dotenv()
+        args = parse_args()
+        data_df = features_stage(clean_stage(fetch_data_from_hopsworks(), POLLUTANT_COLUMNS, 1.5))
+        X, y, _ = preprocess_data_with_lags(data_df.drop(columns=['location'], errors='ignore'))
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        model = train_xgb(X_train, y_train, X_test, y_test)
+        sizes = [int(k) for k in args.sizes.split(",") if k.strip()]
+        _, selected, report = select_features(model, X_train, y_train, X_test, y_test, args.budget, sizes, args.method)
+        if args.output:
+            with open(args.output, "w") as file_obj:
+                json.dump(report, file_obj, indent=2)
+        print(f"Selected {len(selected)} features: {', '.join(selected)}")
+    except AppException as e:
+        logger.error(f"Application Error: {e}")
+        print(f"Application Error: {e}")
+        raise SystemExit(1)
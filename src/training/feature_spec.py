@@ -0,0 +1,62 @@
+POLLUTANT_COLUMNS = ['co', 'no', 'no2', 'o3', 'so2', 'pm2_5', 'pm10', 'nh3']
+LAGGED_COLUMNS = ['aqi'] + POLLUTANT_COLUMNS
+DATE_FEATURES = ['month', 'day', 'day_of_week', 'hour']
+SEASON_FEATURES = ['season_Autumn', 'season_Spring', 'season_Summer', 'season_Winter']
+# Interaction feature -> the two pollutants it multiplies
+INTERACTIONS = {'co_pm2_5': ('co', 'pm2_5'), 'no_no2': ('no', 'no2'), 'o3_pm10': ('o3', 'pm10'),
+                'so2_nh3': ('so2', 'nh3')}
+TRAINING_LAGS = range(1, 4)
+
+
+class FeatureSpec:
+    """
+    Which engineered columns a model consumes, so feature builders can skip everything else.
+
+    `features=None` means every feature (the behaviour before feature selection). The spec is
+    derived from the model's recorded feature order, so it always matches the deployed artifact.
+    """
+
+    def __init__(self, features=None):
+        self.features = None if features is None else list(features)
+        self._wanted = None if features is None else set(self.features)
+
+    @classmethod
+    def from_model(cls, model):
+        names = getattr(model, "feature_names_in_", None)
+        return cls(None if names is None else list(names))
+
+    @property
+    def complete(self):
+        return self._wanted is None
+
+    def needs(self, name):
+        return self._wanted is None or name in self._wanted
+
+    def rolling(self, window):
+        """
+        Pollutants whose `{col}_{window}hr_avg` is needed.
+        """
+        return [col for col in POLLUTANT_COLUMNS if self.needs(f'{col}_{window}hr_avg')]
+
+    def lags(self, col, lags=TRAINING_LAGS):
+        return [lag for lag in lags if self.needs(f'{col}_lag_{lag}')]
+
+    def interactions(self):
+        return [name for name in INTERACTIONS if self.needs(name)]
+
+    def needs_season(self):
+        return any(self.needs(name) for name in SEASON_FEATURES)
+
+    def serving_lags(self, col):
+        """
+        Largest lag of `col` the prediction path needs, counting the lags its averages and
+        interactions are built from (3h/6h averages use lags 1-3/1-6, interactions lag 1).
+        """
+        needed = self.lags(col, range(1, 7))
+        if col in self.rolling(6):
+            needed.append(6)
+        if col in self.rolling(3):
+            needed.append(3)
+        if any(col in pair for name, pair in INTERACTIONS.items() if self.needs(name)):
+            needed.append(1)
+        return max(needed, default=0)
@@ -0,0 +1,201 @@
+import numpy as np
+import pandas as pd
+from pandas.api.indexers import BaseIndexer
+from src.app.exception import AppException
+from src.app.logger import get_logger
+from src.app.metrics import timed
+from src.training.feature_spec import FeatureSpec, POLLUTANT_COLUMNS, INTERACTIONS
+
+logger = get_logger(__name__)
+
+# Month number (1-12) -> season name, same mapping as add_features' get_season
+_SEASON_BY_MONTH = np.array([None, 'Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer',
+                             'Summer', 'Summer', 'Autumn', 'Autumn', 'Autumn', 'Winter'], dtype=object)
+
+
+def sort_series(data, key='location'):
+    """
+    Stable sort by (key, date) so every series is a contiguous, time-ordered segment.
+    """
+    return data.sort_values([key, 'date'], kind='mergesort').reset_index(drop=True)
+
+
+def segment_positions(keys):
+    """
+    Position of each row inside its contiguous segment of equal keys (0 at each segment start).
+    """
+    keys = np.asarray(keys)
+    n = len(keys)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    starts = np.empty(n, dtype=bool)
+    starts[0] = True
+    np.not_equal(keys[1:], keys[:-1], out=starts[1:])
+    start_index = np.flatnonzero(starts)
+    segment_id = np.cumsum(starts) - 1
+    return np.arange(n) - start_index[segment_id]
+
+
+def segmented_shift(values, positions, lag):
+    """
+    Shift a 2-D array down by `lag` rows within segments; rows without a predecessor become NaN.
+    """
+    shifted = np.full(values.shape, np.nan)
+    if lag < len(values):
+        shifted[lag:] = values[:-lag] if lag else values
+    shifted[positions < lag] = np.nan
+    return shifted
+
+
+class SegmentedWindowIndexer(BaseIndexer):
+    """
+    Trailing fixed-size windows that stop at segment boundaries.
+
+    pandas' rolling kernels restart their running sums whenever a window does not overlap the
+    previous one, which is exactly what happens at each segment start, so a single rolling call
+    over all segments is bit-identical to rolling every series on its own.
+    """
+
+    def __init__(self, positions, window_size):
+        super().__init__(window_size=window_size)
+        self.positions = positions
+
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        end = np.arange(1, num_values + 1, dtype=np.int64)
+        start = end - 1 - np.minimum(self.positions[:num_values], self.window_size - 1)
+        return start, end
+
+
+def segmented_rolling_mean(frame, positions, window):
+    """
+    Trailing rolling(window, min_periods=1).mean() of every column, computed within segments.
+    """
+    return frame.rolling(SegmentedWindowIndexer(positions, window), min_periods=1).mean().to_numpy()
+
+
+def segmented_quantiles(values, codes, n_groups, quantiles):
+    """
+    Per-segment linear-interpolated quantiles of each column of a 2-D array, ignoring NaNs.
+
+    Rows are scattered into a (column, segment, position) block padded with NaN and ordered along
+    the position axis in one call. The interpolation follows numpy's percentile formula (the one
+    Series.quantile uses), so the bounds are bit-identical to per-series quantiles.
+    Returns one (n_groups, n_columns) array per requested quantile.
+    """
+    sizes = np.bincount(codes, minlength=n_groups)
+    order = np.argsort(codes, kind='stable')
+    positions = np.empty(len(codes), dtype=np.int64)
+    positions[order] = np.arange(len(codes)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+
+    block = np.full((values.shape[1], n_groups, max(int(sizes.max(initial=0)), 1)), np.nan)
+    block[:, codes, positions] = values.T
+
+    counts = (~np.isnan(block)).sum(axis=-1)
+    upper = np.maximum(counts - 1, 0)
+    indexes = []
+    for q in quantiles:
+        virtual = (counts - 1) * q
+        previous = np.floor(virtual)
+        previous_index = np.clip(previous, 0, upper).astype(np.int64)
+        next_index = np.clip(previous + 1, 0, upper).astype(np.int64)
+        indexes.append((virtual - previous, previous_index, next_index))
+
+    # NaNs (padding and missing readings) order last in both sort and partition. Series of equal
+    # length share a handful of order statistics, so a partition is enough (as in np.percentile).
+    kth = np.unique(np.concatenate([np.concatenate([p.ravel(), n.ravel()]) for _, p, n in indexes]))
+    if len(kth) <= 32:
+        block.partition(kth, axis=-1)
+    else:
+        block.sort(axis=-1)
+
+    results = []
+    for gamma, previous_index, next_index in indexes:
+        a = np.take_along_axis(block, previous_index[..., None], axis=-1)[..., 0]
+        b = np.take_along_axis(block, next_index[..., None], axis=-1)[..., 0]
+        diff = b - a
+        result = np.where(gamma >= 0.5, b - diff * (1 - gamma), a + diff * gamma)
+        results.append(np.where(counts > 0, result, np.nan).T)
+    return results
+
+
+@timed("remove_outliers_grouped")
+def remove_outliers_grouped(df, columns, key='location', factor=1.5):
+    """
+    Clip each column to its per-location IQR bounds (remove_outliers applied to every series at once).
+    """
+    try:
+        codes, uniques = pd.factorize(df[key])
+        values = df[columns].to_numpy(dtype=float)
+        Q1, Q3 = segmented_quantiles(values, codes, len(uniques), (0.25, 0.75))
+        IQR = Q3 - Q1
+        lower_bound = Q1 - factor * IQR
+        upper_bound = Q3 + factor * IQR
+        clipped = np.clip(values, lower_bound[codes], upper_bound[codes])
+        for i, col in enumerate(columns):
+            df[col] = clipped[:, i]
+        return df
+    except Exception as e:
+        raise AppException(f"Error occurred while removing outliers per location: {e}", e)
+
+
+@timed("add_features_grouped")
+def add_features_grouped(data, key='location', presorted=False, features=None):
+    """
+    add_features for many series in one pass: lags and rolling windows never cross a location boundary.
+
+    Rows are returned sorted by (key, date); each location's rows and columns match
+    add_features run on that location alone (with the same `features` subset).
+    """
+    try:
+        if not presorted:
+            data = sort_series(data, key)
+        spec = FeatureSpec(features)
+        positions = segment_positions(data[key].to_numpy())
+        dates = data['date'].dt
+
+        # Adding season and weekend flags
+        month = dates.month.to_numpy()
+        if spec.needs_season():
+            data['season'] = _SEASON_BY_MONTH[month]
+        if spec.needs('is_weekend'):
+            data['is_weekend'] = dates.dayofweek.isin([5, 6]).astype(int)
+
+        # Rolling averages
+        rolling_3 = dict(zip(spec.rolling(3), segmented_rolling_mean(data[spec.rolling(3)], positions, 3).T)) \
+            if spec.rolling(3) else {}
+        rolling_6 = dict(zip(spec.rolling(6), segmented_rolling_mean(data[spec.rolling(6)], positions, 6).T)) \
+            if spec.rolling(6) else {}
+        for col in POLLUTANT_COLUMNS:
+            if col in rolling_3:
+                data[f'{col}_3hr_avg'] = rolling_3[col]
+            if col in rolling_6:
+                data[f'{col}_6hr_avg'] = rolling_6[col]
+        del rolling_3, rolling_6
+
+        # Date-related features
+        if spec.needs('month'):
+            data['month'] = month
+        if spec.needs('day'):
+            data['day'] = dates.day
+        if spec.needs('day_of_week'):
+            data['day_of_week'] = dates.dayofweek
+        if spec.needs('hour'):
+            data['hour'] = dates.hour
+
+        # Feature interactions
+        for name in spec.interactions():
+            left, right = INTERACTIONS[name]
+            data[name] = data[left] * data[right]
+
+        # Lags
+        lagged = [col for col in POLLUTANT_COLUMNS if spec.lags(col)]
+        if lagged:
+            values = data[lagged].to_numpy(dtype=float)
+            max_lag = max(max(spec.lags(col)) for col in lagged)
+            lags = {lag: segmented_shift(values, positions, lag) for lag in range(1, max_lag + 1)}
+            for i, col in enumerate(lagged):
+                for lag in spec.lags(col):
+                    data[f'{col}_lag_{lag}'] = lags[lag][:, i]
+        return data
+    except Exception as e:
+        raise AppException(f"Error occurred while adding grouped features: {e}", e)
@@ -4,9 +4,12 @@ import numpy as np
 from src.feature_store.fetch_hopsworks_data import fetch_data_from_hopsworks
 from src.app.exception import AppException 
 from src.app.logger import get_logger 
+from src.app.metrics import timed
+from src.training.feature_spec import FeatureSpec, POLLUTANT_COLUMNS, INTERACTIONS, SEASON_FEATURES
 
 logger = get_logger(__name__)
 
+@timed("remove_outliers")
 def remove_outliers(df, columns, factor=1.5):
     """
     Remove outliers from specified columns using the IQR method.
@@ -23,9 +26,12 @@ def remove_outliers(df, columns, factor=1.5):
     except Exception as e:
         raise AppException(f"Error occurred while removing outliers: {e}", e)
 
-def add_features(data):
+@timed("add_features")
+def add_features(data, features=None):
     """
     Add new features for AQI prediction, including rolling averages, lags, and interactions.
+
+    With `features` (e.g. a pruned model's feature list) only the columns it needs are computed.
     """
     try:
         def get_season(month):
@@ -38,49 +44,80 @@ def add_features(data):
             else:
                 return 'Autumn'
 
-        pollutant_columns = ['co', 'no', 'no2', 'o3', 'so2', 'pm2_5', 'pm10', 'nh3']
+        spec = FeatureSpec(features)
 
         # Adding season and weekend flags
-        data['season'] = data['date'].dt.month.apply(get_season)
-        data['is_weekend'] = data['date'].dt.dayofweek.isin([5, 6]).astype(int)
+        if spec.needs_season():
+            data['season'] = data['date'].dt.month.apply(get_season)
+        if spec.needs('is_weekend'):
+            data['is_weekend'] = data['date'].dt.dayofweek.isin([5, 6]).astype(int)
 
         # Rolling averages
-        for col in pollutant_columns:
-            data[f'{col}_3hr_avg'] = data[col].rolling(window=3, min_periods=1).mean()
-            data[f'{col}_6hr_avg'] = data[col].rolling(window=6, min_periods=1).mean()
+        for col in POLLUTANT_COLUMNS:
+            if col in spec.rolling(3):
+                data[f'{col}_3hr_avg'] = data[col].rolling(window=3, min_periods=1).mean()
+            if col in spec.rolling(6):
+                data[f'{col}_6hr_avg'] = data[col].rolling(window=6, min_periods=1).mean()
 
         # Date-related features
-        data['month'] = data['date'].dt.month
-        data['day'] = data['date'].dt.day
-        data['day_of_week'] = data['date'].dt.dayofweek
-        data['hour'] = data['date'].dt.hour
+        if spec.needs('month'):
+            data['month'] = data['date'].dt.month
+        if spec.needs('day'):
+            data['day'] = data['date'].dt.day
+        if spec.needs('day_of_week'):
+            data['day_of_week'] = data['date'].dt.dayofweek
+        if spec.needs('hour'):
+            data['hour'] = data['date'].dt.hour
 
         # Feature interactions
-        data['co_pm2_5'] = data['co'] * data['pm2_5']
-        data['no_no2'] = data['no'] * data['no2']
-        data['o3_pm10'] = data['o3'] * data['pm10']
-        data['so2_nh3'] = data['so2'] * data['nh3']
+        for name in spec.interactions():
+            left, right = INTERACTIONS[name]
+            data[name] = data[left] * data[right]
 
         # Lags
-        for col in pollutant_columns:
-            for lag in range(1, 4):
+        for col in POLLUTANT_COLUMNS:
+            for lag in spec.lags(col):
                 data[f'{col}_lag_{lag}'] = data[col].shift(lag)
 
         return data
     except Exception as e:
         raise AppException(f"Error occurred while adding features: {e}", e)
 
-def preprocess_data_with_lags(data):
+def feature_columns(data):
+    """
+    Columns of the feature matrix preprocess_data_with_lags builds from `data` when every
+    season occurs in it; pass them as `features` so partial-year data gets the same matrix.
+    """
+    columns = [col for col in data.columns if col not in ('date', 'aqi', 'season')]
+    return columns + (SEASON_FEATURES if 'season' in data.columns else [])
+
+@timed("preprocess")
+def preprocess_data_with_lags(data, features=None):
     """
     Preprocess the data by encoding, scaling, and splitting features/target.
+
+    With `features`, the feature matrix holds exactly those columns, in that order; only season
+    dummies may be absent (no row of that season) and are zero-filled.
     """
     try:
-        one_hot = pd.get_dummies(data['season'], prefix='season')
-        data_encoded = pd.concat([data.drop(columns=['season', 'date']), one_hot], axis=1)
+        if 'season' in data.columns:
+            one_hot = pd.get_dummies(data['season'], prefix='season')
+            data_encoded = pd.concat([data.drop(columns=['season', 'date']), one_hot], axis=1)
+        else:
+            data_encoded = data.drop(columns=['date'])
+        feature_frame = data_encoded.drop(columns=['aqi'])
+        if features is not None:
+            unknown = [name for name in features
+                       if name not in feature_frame.columns and name not in SEASON_FEATURES]
+            if unknown:
+                raise AppException(f"Unknown features {unknown}; the data has no such columns.")
+            feature_frame = feature_frame.reindex(columns=list(features), fill_value=0)
         scaler = MinMaxScaler()
-        features = scaler.fit_transform(data_encoded.drop(columns=['aqi']))
+        scaled = scaler.fit_transform(feature_frame)
         target = data_encoded['aqi'].values
-        return pd.DataFrame(features, columns=data_encoded.drop(columns=['aqi']).columns), target, scaler
+        return pd.DataFrame(scaled, columns=feature_frame.columns), target, scaler
+    except AppException:
+        raise
     except Exception as e:
         raise AppException(f"Error occurred while preprocessing data with lags: {e}", e)
 
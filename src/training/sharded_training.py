@@ -0,0 +1,250 @@
+import os
+import re
+import hashlib
+import json
+import shutil
+import argparse
+import tempfile
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import joblib
+import numpy as np
+from sklearn.metrics import mean_squared_error
+from sklearn.model_selection import train_test_split
+from dotenv import load_dotenv
+from src.training.preprocess import preprocess_data_with_lags, feature_columns
+from src.training.train_model import train_xgb
+from src.training.export_model import export_model
+from src.data_ingestion.locations import load_locations, DEFAULT_REGISTRY_PATH
+from src.feature_store.hopsworks_session import get_session
+from src.app.exception import AppException
+from src.app.logger import get_logger
+from src.app.metrics import span, increment
+
+logger = get_logger(__name__)
+
+MODEL_SET_NAME = "XGB_Model_Set"
+INDEX_FILE = "index.json"
+SHARD_DIR = "shards"
+SHARD_STRATEGIES = ["location", "region", "cluster"]
+
+
+def shard_file_name(shard_id):
+    """
+    Filesystem-safe, collision-free file name for a shard id.
+    """
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", str(shard_id))
+    if safe == str(shard_id):
+        return f"{safe}.pkl"
+    return f"{safe}-{hashlib.sha1(str(shard_id).encode('utf-8')).hexdigest()[:8]}.pkl"
+
+
+def assign_shards(location_ids, locations, by="location", n_clusters=8, seed=42):
+    """
+    Map each location id to a shard id.
+
+    `location` gives every location its own model; `region` groups locations by their registry
+    region; `cluster` groups them with k-means on coordinates. Locations missing from the registry
+    keep a model of their own.
+    """
+    try:
+        if by not in SHARD_STRATEGIES:
+            raise AppException(f"Unknown shard strategy '{by}' (expected one of {', '.join(SHARD_STRATEGIES)}).")
+        registry = {location.id: location for location in locations}
+        shards = {location_id: location_id for location_id in location_ids}
+        known = [location_id for location_id in location_ids if location_id in registry]
+        if by == "region":
+            for location_id in known:
+                shards[location_id] = registry[location_id].region or location_id
+        elif by == "cluster" and known:
+            from sklearn.cluster import KMeans
+
+            coords = np.array([[registry[i].lat, registry[i].lon] for i in known])
+            k = min(n_clusters, len(known))
+            labels = KMeans(n_clusters=k, n_init=10, random_state=seed).fit_predict(coords)
+            for location_id, label in zip(known, labels):
+                shards[location_id] = f"cluster_{label:03d}"
+        return shards
+    except AppException:
+        raise
+    except Exception as e:
+        raise AppException(f"Error occurred while assigning shards: {e}", e)
+
+
+def location_coordinates(data_df, locations=()):
+    """
+    {location id: (lat, lon)} from the registry, else from the data's own `lat`/`lon` columns.
+    """
+    coordinates = {}
+    if {'lat', 'lon'}.issubset(data_df.columns):
+        first = data_df.dropna(subset=['lat', 'lon']).groupby('location', sort=False)[['lat', 'lon']].first()
+        coordinates.update((location_id, (float(row.lat), float(row.lon))) for location_id, row in first.iterrows())
+    coordinates.update((location.id, (location.lat, location.lon)) for location in locations)
+    return coordinates
+
+
+def train_shard(shard_id, frame, output_dir, features=None, n_jobs=1, test_size=0.2, random_state=42):
+    """
+    Train one shard's model in a worker process and write it under `output_dir`.
+
+    `features` fixes the matrix columns, so a shard whose data misses a season still gets every
+    season dummy (zero-filled) and the same columns as the other shards.
+
+    Only metadata travels back to the parent, so memory there stays flat however many shards run.
+    """
+    try:
+        # Coordinates only route requests; they are constant within a location and not features
+        X, y, _ = preprocess_data_with_lags(frame.drop(columns=['location', 'lat', 'lon'], errors='ignore'), features)
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+        model = train_xgb(X_train, y_train, X_test, y_test, n_jobs=n_jobs)
+        mse = float(mean_squared_error(y_test, model.predict(X_test)))
+
+        file_name = shard_file_name(shard_id)
+        joblib.dump(model, os.path.join(output_dir, SHARD_DIR, file_name))
+        compact_name = export_model(model, os.path.join(output_dir, SHARD_DIR, file_name), native=False)[0]
+        return {"shard": shard_id, "file": f"{SHARD_DIR}/{file_name}",
+                "compact": f"{SHARD_DIR}/{os.path.basename(compact_name)}", "rows": int(len(frame)), "mse": mse,
+                "feature_names": list(X.columns)}
+    except Exception as e:
+        raise AppException(f"Error occurred while training shard '{shard_id}': {e}", e)
+
+
+def train_model_set(data_df, output_dir, locations=(), by="location", n_clusters=8, max_workers=None,
+                    min_rows=200, n_jobs=1):
+    """
+    Train one model per shard of featured multi-location data across a process pool.
+
+    `data_df` is add_features(_grouped) output with a `location` column. Writes the shard models
+    and the routing index to `output_dir` and returns the index.
+    """
+    try:
+        if 'location' not in data_df.columns:
+            raise AppException("Sharded training needs a 'location' column in the feature data.")
+        os.makedirs(os.path.join(output_dir, SHARD_DIR), exist_ok=True)
+        shard_of = assign_shards(list(data_df['location'].unique()), locations, by, n_clusters)
+        shard_ids = data_df['location'].map(shard_of)
+        # Requests are routed by coordinates, so every trained location needs them
+        coordinates = location_coordinates(data_df, locations)
+        unknown = sorted(location_id for location_id in shard_of if location_id not in coordinates)
+        if unknown:
+            raise AppException(f"No coordinates for locations {', '.join(map(str, unknown))}; add them to the "
+                               f"location registry or give the data lat/lon columns.")
+
+        # One column list for every shard, whichever seasons its data covers
+        features = feature_columns(data_df.drop(columns=['location', 'lat', 'lon'], errors='ignore'))
+        jobs = []
+        skipped = []
+        for shard_id, frame in data_df.groupby(shard_ids, sort=True):
+            if len(frame) < min_rows:
+                skipped.append(shard_id)
+                continue
+            jobs.append((shard_id, frame))
+        if not jobs:
+            raise AppException(f"No shard has at least {min_rows} rows to train on.")
+        logger.info(f"Training {len(jobs)} shards by {by} with {max_workers or os.cpu_count()} workers "
+                    f"({len(skipped)} shards below {min_rows} rows skipped).")
+
+        shards = {}
+        with span("shard_training"), ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # Largest shards first so the pool does not end on a long straggler
+            jobs.sort(key=lambda job: len(job[1]), reverse=True)
+            futures = [executor.submit(train_shard, shard_id, frame, output_dir, features, n_jobs)
+                       for shard_id, frame in jobs]
+            for future in as_completed(futures):
+                result = future.result()
+                shards[result.pop("shard")] = result
+                increment("shard_trained")
+
+        feature_names = next(iter(shards.values()))["feature_names"]
+        for entry in shards.values():
+            if entry.pop("feature_names") != feature_names:
+                raise AppException("Shard models were trained on different feature columns.")
+
+        # Locations of skipped shards are left out and served by the nearest trained location
+        routed = {}
+        for location_id, shard_id in sorted(shard_of.items()):
+            if shard_id not in shards:
+                continue
+            lat, lon = coordinates[location_id]
+            routed[location_id] = {"shard": shard_id, "lat": lat, "lon": lon}
+        index = {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+            "by": by,
+            "feature_names": feature_names,
+            "shards": dict(sorted(shards.items())),
+            "locations": routed,
+            "skipped_shards": sorted(skipped),
+        }
+        with open(os.path.join(output_dir, INDEX_FILE), "w") as file_obj:
+            json.dump(index, file_obj, indent=2)
+        logger.info(f"Model set with {len(shards)} shards written to {output_dir}.")
+        return index
+    except AppException:
+        raise
+    except Exception as e:
+        raise AppException(f"Error occurred while training the sharded model set: {e}", e)
+
+
+def register_model_set(model_dir, model_name=MODEL_SET_NAME,
+                       description="Per-location XGBoost models for AQI prediction"):
+    """
+    Register the model set directory (routing index + shards) as a new model version.
+    """
+    try:
+        session = get_session()
+        registered = session.model_registry().python.create_model(name=model_name, description=description)
+        registered.save(model_dir)
+        session.invalidate(model_name)
+        logger.info(f"Model set {model_name} registered successfully.")
+        return registered
+    except Exception as e:
+        raise AppException(f"Error occurred while registering the model set: {e}", e)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train and register per-location / per-region AQI models.")
+    parser.add_argument("--by", choices=SHARD_STRATEGIES, default="location", help="how locations are sharded")
+    parser.add_argument("--clusters", type=int, default=8, help="number of clusters for --by cluster")
+    parser.add_argument("--workers", type=int, help="training processes (default: CPU count)")
+    parser.add_argument("--min-rows", type=int, default=200, help="smallest shard that gets its own model")
+    parser.add_argument("--registry", default=DEFAULT_REGISTRY_PATH, help="location registry JSON")
+    parser.add_argument("--data-dir", help="train on the local location partitions here instead of the feature store")
+    parser.add_argument("--output-dir", help="keep the model set here instead of a temp dir")
+    parser.add_argument("--model-name", default=MODEL_SET_NAME)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        load_dotenv()
+        args = parse_args()
+        from src.pipeline.run_pipeline import POLLUTANT_COLUMNS, clean_stage, features_stage
+
+        if args.data_dir:
+            from src.data_ingestion.upload_hopsworks import load_partitions
+
+            data_df = load_partitions(args.data_dir, args.registry)
+        else:
+            from src.feature_store.fetch_hopsworks_data import fetch_data_from_hopsworks
+
+            data_df = fetch_data_from_hopsworks()
+        if data_df is None or data_df.empty:
+            raise AppException("Training data is empty or None.")
+        if 'location' not in data_df.columns:
+            raise AppException("Training data has no 'location' column to shard by; upload the location "
+                               "partitions with `aqi upload` or pass --data-dir.")
+        data_df = features_stage(clean_stage(data_df, POLLUTANT_COLUMNS, 1.5))
+
+        output_dir = args.output_dir or tempfile.mkdtemp(prefix="aqi_model_set_")
+        index = train_model_set(data_df, output_dir, load_locations(args.registry), by=args.by,
+                                n_clusters=args.clusters, max_workers=args.workers, min_rows=args.min_rows)
+        register_model_set(output_dir, model_name=args.model_name)
+        if not args.output_dir:
+            shutil.rmtree(output_dir, ignore_errors=True)
+        print(f"Registered {args.model_name} with {len(index['shards'])} shards "
+              f"covering {len(index['locations'])} locations.")
+    except AppException as e:
+        logger.error(f"Application Error: {e}")
+        print(f"Application Error: {e}")
+        raise SystemExit(1)
@@ -1,18 +1,25 @@
+import os
+import json
+import shutil
+import tempfile
 import joblib
 from xgboost import XGBRegressor
 from sklearn.metrics import mean_squared_error, r2_score
 from sklearn.model_selection import train_test_split
-import hopsworks
-from dotenv import load_dotenv
-import os
 import pandas as pd
 from src.training.preprocess import remove_outliers, add_features, preprocess_data_with_lags
+from src.training.grouped_features import remove_outliers_grouped, add_features_grouped, sort_series
+from src.training.export_model import export_model
 from src.feature_store.fetch_hopsworks_data import fetch_data_from_hopsworks
+from src.monitoring.drift import drift_baseline
+from src.feature_store.hopsworks_session import get_session
 from src.app.exception import AppException
 from src.app.logger import get_logger
+from src.app.metrics import timed
 
 logger = get_logger(__name__)
 
+@timed("evaluate")
 def evaluate_model(model, X_test, y_test, name="Model"):
     """
     Evaluate the model and print performance metrics.
@@ -27,9 +34,12 @@ def evaluate_model(model, X_test, y_test, name="Model"):
     except Exception as e:
         raise AppException(f"Error occurred while evaluating the model: {e}", e)
 
-def train_xgb(X_train, y_train, X_test, y_test):
+@timed("train")
+def train_xgb(X_train, y_train, X_test, y_test, n_jobs=None):
     """
     Train an XGBoost model and return the best model.
+
+    `n_jobs` caps XGBoost threads, e.g. at 1 when shards are trained in parallel processes.
     """
     try:
         xgb_params = {
@@ -46,7 +56,8 @@ def train_xgb(X_train, y_train, X_test, y_test):
                         n_estimators=n_estimators,
                         max_depth=max_depth,
                         learning_rate=learning_rate,
-                        random_state=42
+                        random_state=42,
+                        n_jobs=n_jobs
                     )
                     model.fit(X_train, y_train)
                     preds = model.predict(X_test)
@@ -59,35 +70,66 @@ def train_xgb(X_train, y_train, X_test, y_test):
     except Exception as e:
         raise AppException(f"Error occurred while training the XGBoost model: {e}", e)
 
-if __name__ == "__main__":
-    try:
-        # Load the API key from the .env file
-        load_dotenv()
-        hopsworks_api_key = os.getenv("HOPSWORKS_API_KEY")
-
-        if not hopsworks_api_key:
-            raise Exception("HOPSWORKS_API_KEY not set in .env or environment.")
+def register_model(model, model_path="xgb_model.pkl", model_name="XGB_Model",
+                   description="XGBoost model for AQI prediction", metadata=None, baseline=None):
+    """
+    Save the model locally and register it in the Hopsworks model registry.
 
-        # Log in to Hopsworks (API key automatically read from environment)
-        project = hopsworks.login()
-        logger.info("Successfully logged into Hopsworks.")
+    The registered version holds the pickle plus the compact NumPy artifact and the native
+    XGBoost model written by export_model; serving prefers the compact artifact. `metadata`
+    (e.g. the feature selection report) is stored beside them as metadata.json, and `baseline`
+    (training-data statistics for drift checks) as drift_baseline.json.
+    """
+    try:
+        session = get_session()
+        joblib.dump(model, model_path)
+
+        artifact_dir = tempfile.mkdtemp(prefix="aqi_model_")
+        try:
+            shutil.copy(model_path, artifact_dir)
+            export_model(model, os.path.join(artifact_dir, os.path.basename(model_path)))
+            if metadata:
+                with open(os.path.join(artifact_dir, "metadata.json"), "w") as file_obj:
+                    json.dump(metadata, file_obj, indent=2)
+            if baseline:
+                with open(os.path.join(artifact_dir, "drift_baseline.json"), "w") as file_obj:
+                    json.dump(baseline, file_obj)
+            registered = session.model_registry().python.create_model(name=model_name, description=description)
+            registered.save(artifact_dir)
+        finally:
+            shutil.rmtree(artifact_dir, ignore_errors=True)
+        session.invalidate(model_name)
+        logger.info(f"Model {model_name} registered successfully.")
+        return registered
+    except Exception as e:
+        raise AppException(f"Error occurred while registering the model: {e}", e)
 
-        # Fetch data from Hopsworks
+if __name__ == "__main__":
+    try:
+        # Fetch data from Hopsworks (the shared session logs in once and is reused for registration)
         data_df = fetch_data_from_hopsworks()
         if data_df is None or data_df.empty:
             raise AppException("Fetched data from Hopsworks is empty or None.")
 
         data_df['date'] = pd.to_datetime(data_df['date'])
+        # Per-location drift baseline over the raw training data
+        baseline = drift_baseline(data_df)
 
-        # Remove outliers
         pollutant_columns = ['co', 'no', 'no2', 'o3', 'so2', 'pm2_5', 'pm10', 'nh3']
-        data_df = remove_outliers(data_df, pollutant_columns)
+        if 'location' in data_df.columns:
+            # Multi-location history: outlier bounds, lags and rolling windows stay within each location
+            data_df = remove_outliers_grouped(sort_series(data_df), pollutant_columns)
+            data_df = add_features_grouped(data_df, presorted=True).dropna().reset_index(drop=True)
+            data_df = data_df.drop(columns=['location'])
+        else:
+            # Remove outliers
+            data_df = remove_outliers(data_df, pollutant_columns)
 
-        # Add features
-        data_df = add_features(data_df)
+            # Add features
+            data_df = add_features(data_df)
 
-        # Drop rows with NaN values
-        data_df = data_df.dropna().sort_values(by='date').reset_index(drop=True)
+            # Drop rows with NaN values
+            data_df = data_df.dropna().sort_values(by='date').reset_index(drop=True)
 
         # Preprocess the data
         X, y, scaler = preprocess_data_with_lags(data_df)
@@ -100,15 +142,7 @@ if __name__ == "__main__":
         evaluate_model(xgb_model, X_test, y_test, name="XGBoost")
 
         # Save the model to Hopsworks
-        model_registry = project.get_model_registry()
-        model_name = "XGB_Model"
-        description = "XGBoost model for AQI prediction"
-
-        model_path = "xgb_model.pkl"
-        joblib.dump(xgb_model, model_path)
-
-        model = model_registry.python.create_model(name=model_name, description=description)
-        model.save(model_path)
+        register_model(xgb_model, baseline=baseline)
 
         logger.info("Model registered successfully.")
         print("Model registered successfully.")
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Keep test runs from writing logs/ into the working tree (read when src.app.logger is imported)
+os.environ.setdefault("AQI_LOG_DIR", tempfile.mkdtemp(prefix="aqi_test_logs_"))
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+from xgboost import XGBRegressor
+from benchmarks.synthetic_data import generate_aqi_history
+from src.prediction.compact_predictor import CompactPredictor, find_model_file, load_model
+from src.training.export_model import export_model
+from src.training.preprocess import add_features, preprocess_data_with_lags
+
+
+def training_matrix():
+    data = generate_aqi_history(n_cities=1, years=0.25, seed=11)
+    data['date'] = pd.to_datetime(data['date'])
+    X, y, _ = preprocess_data_with_lags(add_features(data).dropna().reset_index(drop=True))
+    return X, y
+
+
+@pytest.mark.parametrize("early_stopping", [False, True])
+def test_compact_predictor_matches_xgboost(tmp_path, early_stopping):
+    X, y = training_matrix()
+    split = int(len(X) * 0.8)
+    X_train, y_train, X_test, y_test = X.iloc[:split], y[:split], X.iloc[split:], y[split:]
+    params = dict(n_estimators=150, max_depth=6, learning_rate=0.1, random_state=42, n_jobs=1)
+    if early_stopping:
+        model = XGBRegressor(early_stopping_rounds=5, **params)
+        model.fit(X_train, y_train, eval_set=[(X_test, y_test)], verbose=False)
+        assert model.best_iteration < params["n_estimators"] - 1
+    else:
+        model = XGBRegressor(**params).fit(X_train, y_train)
+
+    export_model(model, str(tmp_path / "model.pkl"), native=False)
+    compact = load_model(find_model_file(str(tmp_path)))
+    assert isinstance(compact, CompactPredictor)
+    assert list(compact.feature_names_in_) == list(X.columns)
+
+    # Missing values take each split's default direction
+    X_eval = X_test.copy()
+    rng = np.random.default_rng(0)
+    X_eval = X_eval.mask(rng.random(X_eval.shape) < 0.05)
+
+    expected = model.predict(X_eval)
+    actual = compact.predict(X_eval, chunk_size=100)
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-4)
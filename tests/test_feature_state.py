@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic_data import generate_aqi_history
+from src.data_ingestion.locations import Location
+from src.pipeline.run_pipeline import POLLUTANT_COLUMNS
+from src.streaming.broker import DEFAULT_TOPIC, Message
+from src.streaming.consumer import FeatureStateConsumer
+from src.streaming.feature_state import MAX_LAG, SHORT_WINDOW, STATE_COLUMNS
+from src.streaming.producer import ReadingPublisher
+from src.training.preprocess import add_features
+
+LOCATIONS = [Location("city_0000", 10.0, 10.0), Location("city_0001", 20.0, 20.0),
+             Location("city_0002", 30.0, 30.0)]
+
+
+class PartitionedLog:
+    """
+    Two-partition topic with the producer and consumer interfaces of the streaming brokers.
+
+    Readings are partitioned by location; the consumer reads the partitions round-robin.
+    """
+
+    def __init__(self, partitions=2):
+        self.partitions = [[] for _ in range(partitions)]
+
+    def partition_of(self, key):
+        return [location.id for location in LOCATIONS].index(key) % len(self.partitions)
+
+    def publish(self, topic, key, value):
+        self.partitions[self.partition_of(key)].append((key, value))
+
+    def flush(self, timeout=None):
+        return 0
+
+    def consumer(self):
+        return PartitionedConsumer(self)
+
+
+class PartitionedConsumer:
+    def __init__(self, log):
+        self.log = log
+        self.positions = [0] * len(log.partitions)
+        self.committed = {}
+        self._next = 0
+
+    def assign(self, offsets):
+        self.positions = [offsets.get((DEFAULT_TOPIC, partition), 0) for partition in range(len(self.positions))]
+
+    def poll(self, timeout=1.0):
+        for _ in range(len(self.positions)):
+            partition = self._next
+            self._next = (self._next + 1) % len(self.positions)
+            offset = self.positions[partition]
+            if offset < len(self.log.partitions[partition]):
+                self.positions[partition] = offset + 1
+                key, value = self.log.partitions[partition][offset]
+                return Message(DEFAULT_TOPIC, partition, offset, key, value)
+        return None
+
+    def commit(self, offsets=None):
+        self.committed.update(offsets or {})
+
+    def close(self):
+        pass
+
+
+def hourly_readings():
+    """
+    Uneven hourly histories per location, with NaN readings and a missing-hour gap near the end.
+    """
+    data = generate_aqi_history(n_cities=3, years=0.01, seed=21)
+    data['date'] = pd.to_datetime(data['date'])
+    histories = {}
+    for location, length in zip(LOCATIONS, (80, 50, 30)):
+        histories[location.id] = data[data['location'] == location.id].drop(columns=['location']) \
+            .iloc[:length].reset_index(drop=True)
+    histories["city_0000"].loc[77, 'pm2_5'] = np.nan
+    histories["city_0000"].loc[60, 'co'] = np.nan
+    # Hours 44 and 45 of city_0001 never arrive
+    histories["city_0001"] = histories["city_0001"].drop(index=[44, 45]).reset_index(drop=True)
+    return histories
+
+
+def publish(histories, log):
+    publisher = ReadingPublisher(producer=log)
+    for location in LOCATIONS:
+        publisher(location, histories[location.id])
+
+
+def expected_recent(readings):
+    """
+    The latest row's lags and window averages from batch add_features on the hourly series.
+    """
+    hourly = readings.set_index('date').asfreq('H').reset_index()
+    batch = add_features(hourly.copy())
+    last = len(batch) - 1
+    expected = {'date': batch['date'].iat[last], 'hour': batch['date'].iat[last].hour}
+    for col in STATE_COLUMNS:
+        expected[col] = batch[col].iat[last]
+        for lag in range(1, MAX_LAG + 1):
+            column = f'{col}_lag_{lag}'
+            expected[column] = batch[column].iat[last] if column in batch else batch[col].iat[last - lag]
+    for col in POLLUTANT_COLUMNS:
+        # The streamed averages cover lags 1..n, i.e. the batch rolling mean of the previous row;
+        # a missing hour in the window leaves them undefined
+        for window, name in ((SHORT_WINDOW, f'{col}_3hr_avg'), (MAX_LAG, f'{col}_6hr_avg')):
+            complete = not batch[col].iloc[last - window:last].isna().any()
+            expected[name] = batch[name].iat[last - 1] if complete else np.nan
+    return expected
+
+
+def assert_state_matches_batch(store, histories):
+    for location in LOCATIONS:
+        recent = store.get(location.id).recent_data()
+        expected = expected_recent(histories[location.id])
+        assert set(recent) == set(expected)
+        assert recent['date'] == expected['date'] and recent['hour'] == expected['hour']
+        for key in expected:
+            if key not in ('date', 'hour'):
+                np.testing.assert_allclose(recent[key], expected[key], rtol=1e-9, err_msg=f"{location.id} {key}")
+
+
+def test_streamed_state_matches_batch_features(tmp_path):
+    histories = hourly_readings()
+    log = PartitionedLog()
+    publish(histories, log)
+
+    consumer = FeatureStateConsumer(consumer=log.consumer(), checkpoint_path=str(tmp_path / "state.json"),
+                                    checkpoint_every=25)
+    assert consumer.run(idle_timeout=0, poll_timeout=0) == sum(len(readings) for readings in histories.values())
+
+    assert_state_matches_batch(consumer.store, histories)
+    assert np.isnan(consumer.store.get("city_0000").recent_data()['pm2_5_3hr_avg'])
+    assert np.isnan(consumer.store.get("city_0001").recent_data()['co_lag_4'])
+    assert consumer.consumer.committed == {(DEFAULT_TOPIC, 0): 110, (DEFAULT_TOPIC, 1): 48}
+
+
+def test_restart_from_checkpoint_resumes_each_partition(tmp_path):
+    histories = hourly_readings()
+    log = PartitionedLog()
+    publish(histories, log)
+    checkpoint_path = str(tmp_path / "state.json")
+
+    first = FeatureStateConsumer(consumer=log.consumer(), checkpoint_path=checkpoint_path, checkpoint_every=25)
+    first.run(max_messages=75, poll_timeout=0)
+    at_checkpoint = {location: state.recent_data() for location, state in first.store.states.items()}
+    # Readings handled after the last checkpoint are lost with the process and must be replayed
+    for _ in range(15):
+        first.handle(first.consumer.poll(0))
+    checkpointed = dict(first.consumer.committed)
+    assert checkpointed[(DEFAULT_TOPIC, 0)] != checkpointed[(DEFAULT_TOPIC, 1)]
+
+    restarted = FeatureStateConsumer(consumer=log.consumer(), checkpoint_path=checkpoint_path, checkpoint_every=25)
+    assert restarted.consumer.positions == [checkpointed[(DEFAULT_TOPIC, 0)], checkpointed[(DEFAULT_TOPIC, 1)]]
+    for location, recent in at_checkpoint.items():
+        restored = restarted.store.get(location).recent_data()
+        assert restored.keys() == recent.keys() and restored['date'] == recent['date']
+        # Restoring resyncs the running sums, which drops their accumulated rounding error
+        np.testing.assert_allclose([restored[key] for key in recent if key != 'date'],
+                                   [recent[key] for key in recent if key != 'date'], rtol=1e-9)
+    handled = restarted.run(idle_timeout=0, poll_timeout=0)
+
+    assert handled == sum(len(partition) for partition in log.partitions) - 75
+    assert_state_matches_batch(restarted.store, histories)
+    assert restarted.store.offsets == {(DEFAULT_TOPIC, 0): 110, (DEFAULT_TOPIC, 1): 48}
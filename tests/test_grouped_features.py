@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic_data import generate_aqi_history
+from src.pipeline.run_pipeline import POLLUTANT_COLUMNS
+from src.training.grouped_features import add_features_grouped
+from src.training.preprocess import add_features
+
+
+def uneven_history():
+    """
+    Three locations with 200, 7 and 1 hourly rows, NaN gaps in the pollutants and shuffled row order.
+    """
+    data = generate_aqi_history(n_cities=3, years=0.03, seed=7)
+    data['date'] = pd.to_datetime(data['date'])
+    lengths = {'city_0000': 200, 'city_0001': 7, 'city_0002': 1}
+    data = pd.concat([data[data['location'] == loc].iloc[:n] for loc, n in lengths.items()], ignore_index=True)
+
+    rng = np.random.default_rng(3)
+    values = data[POLLUTANT_COLUMNS].to_numpy()
+    values[rng.random(values.shape) < 0.1] = np.nan
+    data[POLLUTANT_COLUMNS] = values
+    # A run of missing pm2_5 longer than the 6-hour window
+    data.loc[20:28, 'pm2_5'] = np.nan
+    return data.sample(frac=1.0, random_state=5).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("features", [None, ['pm2_5_lag_1', 'pm2_5_3hr_avg', 'co_6hr_avg', 'season_Winter']])
+def test_grouped_features_match_per_location_add_features(features):
+    data = uneven_history()
+    grouped = add_features_grouped(data.copy(), features=features)
+
+    assert grouped['location'].is_monotonic_increasing
+    for location, rows in grouped.groupby('location', sort=False):
+        single = data[data['location'] == location].sort_values('date').drop(columns=['location'])
+        expected = add_features(single.reset_index(drop=True), features)
+        actual = rows.drop(columns=['location']).reset_index(drop=True)
+
+        assert list(actual.columns) == list(expected.columns)
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
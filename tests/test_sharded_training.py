@@ -0,0 +1,30 @@
+import json
+import os
+
+import pandas as pd
+from benchmarks.synthetic_data import generate_aqi_history
+from src.data_ingestion.locations import Location
+from src.pipeline.run_pipeline import POLLUTANT_COLUMNS, clean_stage, features_stage
+from src.training.feature_spec import SEASON_FEATURES
+from src.training.sharded_training import train_model_set, INDEX_FILE
+
+
+def featured_history(location_id, start, seed):
+    data = generate_aqi_history(n_cities=1, years=0.08, seed=seed, start=start)
+    return data.drop(columns=['location'], errors='ignore').assign(location=location_id)
+
+
+def test_shards_covering_different_seasons_share_feature_columns(tmp_path):
+    # About a month of winter for one city and a month of summer for the other
+    data = pd.concat([featured_history("winter_city", "2023-01-01", seed=1),
+                      featured_history("summer_city", "2023-07-01", seed=2)], ignore_index=True)
+    featured = features_stage(clean_stage(data, POLLUTANT_COLUMNS, 1.5))
+    assert set(featured.groupby('location')['season'].unique().map(tuple)) == {('Winter',), ('Summer',)}
+
+    locations = [Location("winter_city", 10.0, 10.0), Location("summer_city", 20.0, 20.0)]
+    index = train_model_set(featured, str(tmp_path), locations, max_workers=1, min_rows=100)
+
+    assert sorted(index["shards"]) == ["summer_city", "winter_city"]
+    assert index["feature_names"][-len(SEASON_FEATURES):] == SEASON_FEATURES
+    with open(os.path.join(tmp_path, INDEX_FILE)) as file_obj:
+        assert json.load(file_obj)["feature_names"] == index["feature_names"]